@@ -10,6 +10,11 @@ from gas_simulation.ball_collision_animator import (
     MultiBallSimulationAnimatorMain,
 )
 
+from gas_simulation.initial_conditions import (
+    generateRandomPacking,
+    randomPackingSimulation,
+)
+
 from gas_simulation.example_simulation_animations import (
     runSimulation1,
     runSimulation2,
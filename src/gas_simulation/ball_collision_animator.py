@@ -2,12 +2,14 @@
 from typing import (
     Union,
     Tuple,
+    List,
     Set,
     Optional,
 )
 
 from collections import deque
 
+import numpy as np
 import pygame
 
 from pygame.locals import (
@@ -166,12 +168,21 @@ class Ball2DSprite(pygame.sprite.Sprite):
     
     @property
     def r(self):
-        prev = getattr(self, "_r", None)
-        res = self.ball.r
-        if res != prev:
-            self._r = res
+        if getattr(self, "_r_t", None) != self.ball.t:
+            self.r = self.ball.r
+        return self._r
+    
+    @r.setter
+    def r(self, r: Tuple[Real]):
+        # The position is that of the ball at its current time, with
+        # the time recorded so that the getter can detect when the
+        # position has not been set since the ball's time changed.
+        self._r_t = self.ball.t
+        r = tuple(r)
+        if r != getattr(self, "_r", None):
+            self._r = r
             self._r_pixel = None
-        return res
+        return
     
     @property
     def r_pixel(self):
@@ -393,6 +404,23 @@ class MultiBallSimulationAnimatorMain:
                 balls_t_updated=balls_t_updated,\
                 check_overlap=check_overlap)
     
+    def addBalls(
+        self,
+        m: Union[Real, np.ndarray],
+        radius: Union[Real, np.ndarray],
+        r0: np.ndarray,
+        v0: np.ndarray,
+        color: Tuple[int]=named_colors_def["red"],
+        colors: Optional[List[Tuple[int]]]=None,
+        incl_borders: bool=False,
+        balls_t_updated: bool=False,
+        check_overlap: bool=True,
+    ) -> np.ndarray:
+        return self.sim_animator.addBalls(m, radius, r0, v0,\
+                color=color, colors=colors, incl_borders=incl_borders,\
+                balls_t_updated=balls_t_updated,\
+                check_overlap=check_overlap)
+    
     def run(
         self,
         print_mechE: bool=False,
@@ -630,12 +658,46 @@ class MultiBallSimulationAnimatorDisplay(object):
         self.all_sprites.add(ball_sprite)
         self.ball_sprites.add(ball_sprite)
         return True
+    
+    def addBalls(
+        self,
+        m: Union[Real, np.ndarray],
+        radius: Union[Real, np.ndarray],
+        r0: np.ndarray,
+        v0: np.ndarray,
+        color: Tuple[int]=named_colors_def["red"],
+        colors: Optional[List[Tuple[int]]]=None,
+        incl_borders: bool=False,
+        balls_t_updated: bool=False,
+        check_overlap: bool=True,
+    ) -> np.ndarray:
+        r = np.asarray(r0, dtype=float)
+        if incl_borders:
+            r = r + np.array([x[0] for x in self.borders])
+        v = np.asarray(v0, dtype=float) / self.dt_sim_per_sec
+        n_balls = len(self.sim.balls)
+        accepted = self.sim.addBalls(m, radius, r, v,\
+                balls_t_updated=balls_t_updated,\
+                check_overlap=check_overlap)
+        for ball, idx in zip(self.sim.balls[n_balls:],\
+                np.flatnonzero(accepted).tolist()):
+            ball_sprite = Ball2DSprite(self, ball,\
+                    color=color if colors is None else colors[idx])
+            self.all_sprites.add(ball_sprite)
+            self.ball_sprites.add(ball_sprite)
+        return accepted
         
     def run(
         self,
         print_mechE: bool=False,
         check_overlap: bool=True,
     ) -> bool:
+        # The energy printed each simulation cycle is read from the
+        # simulation's ThermodynamicLedger rather than summed over
+        # every ball
+        if print_mechE and self.sim.ledger is None:
+            self.sim.enableLedger()
+        
         # Setup the clock for a consistent framerate
         clock = pygame.time.Clock()
         
@@ -727,7 +789,13 @@ class MultiBallSimulationAnimatorDisplay(object):
         # Load the arena
         self._arena = None
         self.arena
-
+        
+        # Update the positions of the ball sprites from the positions
+        # of all of the balls, calculated together
+        positions = self.sim.ballStatesAtTime()[0].tolist()
+        for sprite in self.ball_sprites:
+            sprite.r = positions[sprite.ball.idx]
+        
         # Draw all sprites
         for sprite in self.all_sprites:
             sprite.draw()
@@ -768,20 +836,24 @@ class MultiBallSimulationAnimatorDisplay(object):
     def calculateTotalKineticEnergy(self) -> Real:
         """
         Calculates the current total kinetic energy of the objects in
-        the simulation.
+        the simulation (read from the simulation's ThermodynamicLedger
+        if it has one).
         
         Returns:
         Real numeric value giving the total kinetic energy of the
         objects in the simulation at the time represented by attribute
         t in terms of the animation's energy units.
         """
-        return self.sim.calculateTotalKineticEnergy() *\
-                self.dt_sim_per_sec_sq
+        ledger = self.sim.ledger
+        energy = ledger.kinetic_energy if ledger is not None else\
+                self.sim.calculateTotalKineticEnergy()
+        return energy * self.dt_sim_per_sec_sq
     
     def calculateTotalPotentialEnergy(self) -> Real:
         """
         Calculates the current total gravitational potential energy of
-        the objects in the simulation.
+        the objects in the simulation (read from the simulation's
+        ThermodynamicLedger if it has one).
         The gravitational potential energy is measured relative to the
         spatial origin of the simulation (i.e. if a point mass is at
         the spatial origin of the simulation, then its gravitational
@@ -792,14 +864,17 @@ class MultiBallSimulationAnimatorDisplay(object):
         energy of the objects in the simulation at the time represented
         by attribute t in terms of the animation's energy units.
         """
-        return self.sim.calculateTotalPotentialEnergy() *\
-                self.dt_sim_per_sec_sq
+        ledger = self.sim.ledger
+        energy = ledger.potential_energy if ledger is not None else\
+                self.sim.calculateTotalPotentialEnergy()
+        return energy * self.dt_sim_per_sec_sq
     
     def calculateTotalMechanicalEnergy(self) -> Real:
         """
         Calculates the current total mechanical energy (the kinetic
         energy plus the gravitational potential energy) of the objects
-        in the simulation.
+        in the simulation (read from the simulation's
+        ThermodynamicLedger if it has one).
         The gravitational potential energy is measured relative to the
         spatial origin of the simulation (i.e. if a point mass is at
         the spatial origin of the simulation, then its gravitational
@@ -810,6 +885,8 @@ class MultiBallSimulationAnimatorDisplay(object):
         objects in the simulation at the time represented by attribute
         t in terms of the animation's energy units.
         """
-        return self.sim.calculateTotalMechanicalEnergy() *\
-                self.dt_sim_per_sec_sq
+        ledger = self.sim.ledger
+        energy = ledger.mechanical_energy if ledger is not None else\
+                self.sim.calculateTotalMechanicalEnergy()
+        return energy * self.dt_sim_per_sec_sq
     
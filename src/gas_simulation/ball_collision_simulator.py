@@ -5,13 +5,50 @@ from typing import (
     Tuple,
     List,
     Set,
+    Optional,
+    Iterable,
+    Generator,
+    Callable,
+    Any,
 )
 
+import bisect
+import collections
 import heapq
-import itertools
 import math
+import operator
+import os
+import pickle
+
+import numpy as np
 
 from gas_simulation.utils import Real
+from gas_simulation.ball_state_arrays import BallStateArrays
+from gas_simulation.broadphase import (
+    UniformCellGrid,
+    HierarchicalCellGrid,
+    SweepAndPrune,
+    OrderedNeighbours,
+    findOverlappingPairs,
+)
+from gas_simulation.event_queues import (
+    BALLS_COLLISION_EVENT,
+    WALL_COLLISION_EVENT,
+    CELL_CROSSING_EVENT,
+    REPREDICT_EVENT,
+    HeapEventQueue,
+    SortedEventQueue,
+    CalendarEventQueue,
+)
+from gas_simulation.instrumentation import SimulationStats
+from gas_simulation.event_log import EventLogWriter
+from gas_simulation.collision_events import CollisionEvent
+from gas_simulation.thermodynamic_ledger import ThermodynamicLedger
+from gas_simulation.trajectory_samples import TrajectoryChunkWriter
+from gas_simulation.kernels import (
+    KinematicKernels,
+    timeToNextWall,
+)
 
 def closestApproachVector(
     r1: Tuple[Real],
@@ -163,6 +200,14 @@ class Ball(object):
                 vectors of the centre of the ball are r0 and v0
                 respectively.
             Default: 0
+        wall_times (bool): If True, the times of the next collisions
+                of the ball with the walls are calculated on creation
+                (using initialiseWallTimes()). If False, these must be
+                calculated separately (e.g. for many Ball objects at
+                once using the method calculateWallTimes() of the
+                simulation's BallStateArrays) before the Ball object is
+                simulated.
+            Default: True
     
     Attributes:
     
@@ -173,6 +218,12 @@ class Ball(object):
                 object is a part, and from which the values for the
                 dimensions of the box and the uniform gravitational
                 field are derived.
+        idx (int): The index of the row of the attribute
+                ball_state_arrays of sim in which the mass, radius and
+                reference state of the ball are stored. For a Ball
+                object added to the simulation using the method
+                addBall() or addBalls() of sim, this is the same as its
+                index in the attribute balls of sim.
         n_dims (strictly positive int): The number of dimensions of
                 the simulation (equal to the corresponding attribute
                 of the attribute sim).
@@ -195,7 +246,9 @@ class Ball(object):
             during the lifetime of the instance):
             
         t (real numeric value): The current time for the ball in terms
-                of the simulation's time measure.
+                of the simulation's time measure. Unless set to a
+                different value, this is the current time of the
+                simulation (attribute t of sim).
         
         Derived (i.e. set at instance creation and updated based on
             calculations made using other attribute values):
@@ -216,7 +269,12 @@ class Ball(object):
                 basis vector and whose index 0 contains the time (in
                 terms of the simulation's time measure) of the next
                 collision with one of the walls normal to that basis
-                vector. The min-heap is arranged based on the time
+                vector. This is constructed on access from the times
+                of the next collisions with the walls stored in the
+                simulation's BallStateArrays (see its attribute
+                t_wall_axes), and is retained for compatibility, with
+                changes to it having no effect.
+                The min-heap is arranged based on the time
                 (with the element at index 0 of the list, assuming
                 the list has any elements, containing a time no
                 greater than any other element of the list).
@@ -233,14 +291,17 @@ class Ball(object):
     Methods:
         (For full description, see documentation of the method itself)
         
-        initialiseNextWallHeap(): Resets the attribute next_wall_heap.
-        updateNextWallHeapSingleDimension(): Calculates the next time
+        initialiseWallTimes(): Calculates the times of the next
+                collisions of the Ball object with the walls normal to
+                every basis vector. Also available under its previous
+                name initialiseNextWallHeap().
+        updateWallTimeSingleDimension(): Calculates the next time
                 (if any) after the current time that the ball would
                 collide with either of the walls normal to a user
                 specified basis vector assuming the Ball object does
                 not collide with any other objects before that time.
-                If such a collision exists, adds the details of this
-                wall collision to the attribute next_wall_heap.
+                Also available under its previous name
+                updateNextWallHeapSingleDimension().
         positionAtTime(): Finds the position vector of the Ball object
                 at a given time assuming the Ball object does not
                 collide with any walls or other objects between the
@@ -267,6 +328,10 @@ class Ball(object):
                 calculates if and when the next collision between the
                 two will occur, assuming neither collide with any other
                 objects or walls before that time.
+        identifyOtherBallsNextCollisions(): Vectorised version of
+                identifyOtherBallNextCollision() which performs the
+                same calculation against many other Ball objects of
+                the simulation at once.
         progressToNextOtherBallCollision(): Increases current time to
                 correspond to the time immediately after next occasion
                 the Ball object another specific Ball object, updating
@@ -289,6 +354,24 @@ class Ball(object):
                 Ball object at the time equal to attribute t (the
                 current time).
     """
+    # As a simulation may contain a very large number of Ball objects,
+    # these have no instance dictionary, with only the attributes below
+    # stored on each instance (their mass, radius and reference state
+    # being stored in the simulation's BallStateArrays)
+    __slots__ = (
+        "_sim",
+        "_kernels",
+        "_state_arrays",
+        "_idx",
+        "_n_dims",
+        "_g",
+        "_centre_ranges",
+        "_t",
+        "_cache_t",
+        "_r",
+        "_v",
+    )
+    
     def __init__(
         self,
         sim: "MultiBallSimulation",
@@ -297,10 +380,80 @@ class Ball(object):
         r0: Tuple[Real],
         v0: Tuple[Real],
         t0: Real=0,
+        wall_times: bool=True,
     ):
+        self._attachToSimulation(sim,\
+                sim.ball_state_arrays.append(m, radius, r0, v0, t0))
+        self.t = t0
+        
+        # The times of the next collisions with the walls are stored in
+        # the row of the simulation's BallStateArrays (see its attributes
+        # t_wall_axes, t_wall and wall_axis)
+        if wall_times:
+            self.initialiseWallTimes()
+    
+    @classmethod
+    def _fromStateArraysRow(
+        cls,
+        sim: "MultiBallSimulation",
+        idx: int,
+    ) -> "Ball":
+        """
+        Creates a Ball object acting as a view of an existing row of
+        the BallStateArrays of the simulation sim, without adding a
+        row (used when restoring a simulation from a checkpoint). The
+        new Ball object follows the current time of the simulation.
+        
+        Args:
+            Required positional:
+            sim (MultiBallSimulation): The simulation to which the Ball
+                    object belongs.
+            idx (int): The index of the row of the BallStateArrays of
+                    sim holding the state of the Ball object.
+        
+        Returns:
+        The new Ball object.
+        """
+        ball = cls.__new__(cls)
+        ball._attachToSimulation(sim, idx)
+        return ball
+    
+    def _attachToSimulation(
+        self,
+        sim: "MultiBallSimulation",
+        idx: int,
+    ) -> None:
+        """
+        Sets the attributes of the Ball object so that it acts as a
+        view of the row with index idx of the BallStateArrays of the
+        simulation sim, following the current time of the simulation.
+        
+        Args:
+            Required positional:
+            sim (MultiBallSimulation): The simulation to which the Ball
+                    object belongs.
+            idx (int): The index of the row of the BallStateArrays of
+                    sim holding the state of the Ball object.
+        
+        Returns:
+        None
+        """
         self._sim = sim
-        self._m = m
-        self._radius = radius
+        # The number of dimensions and gravitational field of the
+        # simulation, which are fixed, are stored directly to avoid
+        # looking them up from sim in every kinematic calculation
+        self._n_dims = sim.n_dims
+        self._g = sim.g
+        # The functions used for the kinematic calculations, chosen by
+        # the simulation for its number of dimensions and gravitational
+        # field (see KinematicKernels)
+        self._kernels = sim.kernels
+        # The mass, radius and reference state of the ball are stored
+        # in the row of the simulation's BallStateArrays with index
+        # _idx, with the Ball object acting as a view of that row.
+        self._state_arrays = sim.ball_state_arrays
+        self._idx = idx
+        self._centre_ranges = None
         
         # The attribute _t0 is the current reference time for the ball,
         # at which time the position and velocity vectors are stored as
@@ -316,36 +469,74 @@ class Ball(object):
         # assumption that the ball does not experience any collisions
         # between times of attributes _t0 and t (i.e. motion in a
         # uniform gravitational field).
-        self._t0 = t0
-        self._r0 = r0
-        self._v0 = v0
         
-        self.t = self._t0
-        
-        self.next_wall_heap = []
-        self.initialiseNextWallHeap()
+        # The attribute _t is the current time for the ball if this
+        # has been set to a value other than the current time of the
+        # simulation, otherwise None (in which case the ball follows
+        # the simulation's time without needing to be updated). The
+        # attributes _r and _v are the position and velocity vectors
+        # at the time _cache_t if these have been calculated (otherwise
+        # None), so that r and v need only be recalculated when the
+        # time or trajectory changes. A value of None for _cache_t
+        # signifies that neither has been calculated.
+        self._t = None
+        self._cache_t = None
+        self._r = None
+        self._v = None
+        return
     
     @property
     def sim(self):
         return self._sim
     
+    @property
+    def idx(self):
+        return self._idx
+    
     @property
     def m(self):
-        return self._m
+        return self._state_arrays._m_arr.item(self._idx)
     
     @property
     def radius(self):
-        return self._radius
+        return self._state_arrays._radius_arr.item(self._idx)
+    
+    @property
+    def _t0(self):
+        return self._state_arrays._t0_arr.item(self._idx)
+    
+    @_t0.setter
+    def _t0(self, t0):
+        self._state_arrays._t0_arr[self._idx] = t0
+        self._cache_t = None
+    
+    @property
+    def _r0(self):
+        return tuple(self._state_arrays._r0_arr[self._idx].tolist())
+    
+    @_r0.setter
+    def _r0(self, r0):
+        self._state_arrays._r0_arr[self._idx] = r0
+        self._cache_t = None
+    
+    @property
+    def _v0(self):
+        return tuple(self._state_arrays._v0_arr[self._idx].tolist())
+    
+    @_v0.setter
+    def _v0(self, v0):
+        self._state_arrays._v0_arr[self._idx] = v0
+        self._cache_t = None
     
     @property
     def n_dims(self):
-        return self.sim.n_dims
+        return self._n_dims
     
     @property
     def centre_ranges(self):
-        res = getattr(self, "_centre_ranges", None)
+        res = self._centre_ranges
         if res is None:
-            box_ranges = self.sim.box_interior_ranges
+            box_ranges = self._sim.box_interior_ranges
             rad = self.radius
             res = tuple((rng[0] + rad, rng[1] - rad)\
                     for rng in box_ranges)
@@ -354,39 +545,52 @@ class Ball(object):
     
     @property
     def g(self):
-        return self.sim.g
+        return self._g
     
     @property
     def t(self):
-        return self._t
+        t = self._t
+        return self._sim.t if t is None else t
     
     @t.setter
     def t(self, t):
-        if t == getattr(self, "_t", None): return
+        sim = self._sim
+        if t == sim.t:
+            if self._t is None: return
+            self._t = None
+            sim._t_set_balls.discard(self)
+            return
         self._t = t
-        self._r = None
-        self._v = None
+        sim._t_set_balls.add(self)
     
     @property
     def r(self):
-        res = getattr(self, "_r", None)
-        if res is None:
-            res = self.positionAtTime(self.t)
-            self._r = res
+        t = self.t
+        if t == self._cache_t:
+            res = self._r
+            if res is not None: return res
+        else:
+            self._cache_t = t
+            self._r = None
+            self._v = None
+        res = self.positionAtTime(t)
+        self._r = res
         return res
     
     @property
     def v(self):
-        res = getattr(self, "_v", None)
-        if res is None:
-            res = self.velocityAtTime(self.t)
-            self._v = res
+        t = self.t
+        if t == self._cache_t:
+            res = self._v
+            if res is not None: return res
+        else:
+            self._cache_t = t
+            self._r = None
+            self._v = None
+        res = self.velocityAtTime(t)
+        self._v = res
         return res
     
-    @property
-    def _t_ref(self):
-        return getattr(self.sim, "_t_ref", float("inf"))
-    
     def _timeToNextWall(self, idx: int) -> Real:
         """
         Method identifying the amount of time after the current
@@ -413,53 +617,38 @@ class Ball(object):
         acceleration in that direction both being exactly zero) then
         float("inf") is returned to represent this.
         """
-        v = self._v0[idx]
-        r = self._r0[idx]
-        a = self.g[idx]
-        neg = (v < 0)
-        if not a:
-            wall = self.centre_ranges[idx][not neg]# + 1
-            if not v: return float("inf")
-            return (wall - r) / v
-        vg_align = ((a > 0) == (v >= 0))
-        for j in range(2):
-            wall = self.centre_ranges[idx][not (neg ^ j)]# + 1
-            d = wall - r
-            discr = v ** 2 + 2 * a * d
-            if discr < 0: continue
-            s = math.sqrt(discr)
-            res_lst = sorted([(s - v) / a, (-v - s) / a])
-            res = res_lst[1] if vg_align or j else res_lst[0]
-            break
-        return res
+        arrs = self._state_arrays
+        return timeToNextWall(arrs._r0_arr.item(self._idx, idx),\
+                arrs._v0_arr.item(self._idx, idx), self._g[idx],\
+                *self.centre_ranges[idx])
     
-    def initialiseNextWallHeap(self) -> None:
+    def initialiseWallTimes(self) -> None:
         """
-        Completely resets the attribute next_wall_heap and sets up its
-        min-heap structure, based on the current time, position and
-        velocity of the Ball object.
+        Calculates the times of the next collisions of the Ball object
+        with the walls normal to each basis vector, based on the
+        reference time, position and velocity of the Ball object, and
+        stores them in the simulation's BallStateArrays (see its
+        attribute t_wall_axes).
         
         Returns:
         None
         """
-        heap = []
-        for i in range(self.n_dims):
-            if not self._v0[i] and not self.g[i]: continue
-            neg = self._v0[i] < 0
-            wall = self.centre_ranges[i][not neg]
-            heap.append((self._t0 + self._timeToNextWall(i), i))
-        heapq.heapify(heap)
-        self.next_wall_heap = heap
+        t0 = self._t0
+        self._state_arrays._t_wall_axes_arr[self._idx] =\
+                [t0 + self._timeToNextWall(i)\
+                for i in range(self._n_dims)]
+        self._state_arrays.syncWallTime(self._idx)
         return
     
-    def updateNextWallHeapSingleDimension(self, idx: int):
+    def updateWallTimeSingleDimension(self, idx: int) -> None:
         """
-        Inserts the details of the next collision with one of the walls
-        normal to the idx:th basis vector (if any) to the attribute
-        next_wall_heap (maintaining the attribute's min-heap
-        structure), assuming the Ball object does not collide with any
-        other objects (not including other walls) before the time of
-        that collision.        
+        Recalculates the time of the next collision of the Ball object
+        with one of the walls normal to the idx:th basis vector (if
+        any), based on the reference time, position and velocity of the
+        Ball object, and stores it in the simulation's BallStateArrays
+        (see its attribute t_wall_axes). This is sufficient following
+        a collision with one of those walls, as the motion along the
+        other basis vectors is unaffected.
         
         Args:
             Required positional:
@@ -470,12 +659,27 @@ class Ball(object):
         Returns:
         None
         """
-        if not self._v0[idx] and not self.g[idx]:
-            return
-        heapq.heappush(self.next_wall_heap,\
-                (self._t0 + self._timeToNextWall(idx), idx))
+        self._state_arrays._t_wall_axes_arr[self._idx, idx] =\
+                self._t0 + self._timeToNextWall(idx)
+        self._state_arrays.syncWallTime(self._idx)
         return
     
+    # The names of initialiseWallTimes() and
+    # updateWallTimeSingleDimension() from when the times of the next
+    # collisions with the walls were kept in the min-heap
+    # next_wall_heap, retained for compatibility
+    initialiseNextWallHeap = initialiseWallTimes
+    updateNextWallHeapSingleDimension = updateWallTimeSingleDimension
+    
+    @property
+    def next_wall_heap(self):
+        arrs = self._state_arrays
+        heap = [(t, i) for i, t in\
+                enumerate(arrs._t_wall_axes_arr[self._idx].tolist())\
+                if t != float("inf")]
+        heapq.heapify(heap)
+        return heap
+    
     def _positionAfterTimeIncrement(self, dt: Real) -> Tuple[Real]:
         """
         Calculates the position vector of the Ball object after a time
@@ -498,8 +702,8 @@ class Ball(object):
         collisions with walls or any other objects during this time
         interval.
         """
-        return tuple(r + v * dt + a * dt ** 2 / 2 for r, v, a in\
-                zip(self._r0, self._v0, self.g))
+        return self._kernels.positionAndVelocityAfterTimeIncrement(\
+                self._r0, self._v0, self._g, dt)[0]
     
     def _velocityAfterTimeIncrement(self, dt: Real) -> Tuple[Real]:
         """
@@ -523,7 +727,8 @@ class Ball(object):
         collisions with walls or any other objects during this time
         interval.
         """
-        return tuple(v + a * dt for v, a in zip(self._v0, self.g))
+        return self._kernels.positionAndVelocityAfterTimeIncrement(\
+                self._r0, self._v0, self._g, dt)[1]
     
     def _positionAndVelocityAfterTimeIncrement(
         self,
@@ -550,8 +755,8 @@ class Ball(object):
         Ball object does not experience any collisions with walls or
         any other objects during this time interval.
         """
-        return (self._positionAfterTimeIncrement(dt),\
-                self._velocityAfterTimeIncrement(dt))
+        return self._kernels.positionAndVelocityAfterTimeIncrement(\
+                self._r0, self._v0, self._g, dt)
     
     def positionAtTime(self, t: Real) -> Tuple[Real]:
         """
@@ -572,10 +777,11 @@ class Ball(object):
         representing the position vector of the Ball object at the
         time represented by t.
         """
-        if t == self.t and getattr(self, "_r", None) is not None:
-            return self.r
-        elif t == self._t0: return self._r0
-        dt = t - self._t0
+        if t == self._cache_t and self._r is not None:
+            return self._r
+        t0 = self._t0
+        if t == t0: return self._r0
+        dt = t - t0
         return self._positionAfterTimeIncrement(dt)
     
     def velocityAtTime(self, t: Real) -> Tuple[Real]:
@@ -597,10 +803,11 @@ class Ball(object):
         representing the velocity vector of the Ball object at the
         time represented by t.
         """
-        if t == self.t and getattr(self, "_v", None) is not None:
-            return self.v
-        elif t == self._t0: return self._v0
-        dt = t - self._t0
+        if t == self._cache_t and self._v is not None:
+            return self._v
+        t0 = self._t0
+        if t == t0: return self._v0
+        dt = t - t0
         return self._velocityAfterTimeIncrement(dt)
     
     def positionAndVelocityAtTime(
@@ -626,10 +833,12 @@ class Ball(object):
         (index 1) vectors of the Ball object at the time represented by
         t.
         """
-        if t == self.t and getattr(self, "_r", None) is not None:
-            return self.r, self.v
-        elif t == self._t0: return self._r0, self._v0
-        dt = t - self._t0
+        if t == self._cache_t and self._r is not None and\
+                self._v is not None:
+            return self._r, self._v
+        t0 = self._t0
+        if t == t0: return self._r0, self._v0
+        dt = t - t0
         return self._positionAndVelocityAfterTimeIncrement(dt)
     
     def _updateTime0(
@@ -656,8 +865,6 @@ class Ball(object):
                 self._positionAndVelocityAfterTimeIncrement(\
                 t0 - self._t0)
         self._t0 = t0
-        self._r = None
-        self._v = None
         return
     
     def progressToNextWallCollision(self) -> None:
@@ -671,10 +878,10 @@ class Ball(object):
         This assumes the Ball object does not collide with any other
         objects in the intervening time.
         The accurate details of this collision should have been
-        previously prepared using by defining and keeping updated the
-        attribute next_wall_heap throught the appropriate use of the
-        initialiseNextWallHeap() and
-        updateNextWallHeapSingleDimension().
+        previously prepared by keeping updated the times of the next
+        collisions with the walls in the simulation's BallStateArrays
+        through the appropriate use of initialiseWallTimes() and
+        updateWallTimeSingleDimension().
         In general simulations, this should be used only when collision
         between this Ball object and a wall is the next collision (both
         between pairs of objects and between objects and walls) due to
@@ -683,13 +890,14 @@ class Ball(object):
         Returns:
         None
         """
-        if not self.next_wall_heap: return
-        t, i = heapq.heappop(self.next_wall_heap)
-        self._updateTime0(t)
+        arrs = self._state_arrays
+        i = arrs._wall_axis_arr.item(self._idx)
+        if i < 0: return
+        self._updateTime0(arrs._t_wall_arr.item(self._idx))
         v = list(self._v0)
         v[i] = -v[i]
         self._v0 = tuple(v)
-        self.updateNextWallHeapSingleDimension(i)
+        self.updateWallTimeSingleDimension(i)
         return
     
     def identifyOtherBallNextCollision(
@@ -742,57 +950,229 @@ class Ball(object):
         in such a way that the overall momentum of both objects is
         exactly zero).
         """
-        rad_sum = self.radius + other.radius
-        rad_sum_sq = rad_sum ** 2
-        t_max = self.next_wall_heap[0][0] if self.next_wall_heap\
-                else float("inf")
-        t_max = min(t_max, other.next_wall_heap[0][0]\
-                if other.next_wall_heap else float("inf"))
+        t_wall_arr = self._state_arrays._t_wall_arr
+        t_max = min(t_wall_arr.item(self._idx), t_wall_arr.item(other._idx))
         t0 = max(self._t0, other._t0)
         if t0 >= t_max: return ()
         r1, v1 = self.positionAndVelocityAtTime(t0)
         r2, v2 = other.positionAndVelocityAtTime(t0)
+        # The tests for whether the balls collide before t_max and the
+        # details of the collision (see nextCollision() in the module
+        # kernels)
+        return self._kernels.nextCollision(r1, v1, r2, v2, t0,\
+                self.radius + other.radius, t_max, self.m, other.m)
+    
+    def identifyOtherBallsNextCollisions(
+        self,
+        idx_arr: np.ndarray,
+    ) -> Tuple[np.ndarray]:
+        """
+        Vectorised version of identifyOtherBallNextCollision() which,
+        given the indices of other Ball objects in the simulation's
+        BallStateArrays (the same as their indices in the attribute
+        balls of the simulation), calculates the details of the next
+        collision between this Ball object and each of those Ball
+        objects in a single pass over the simulation's BallStateArrays,
+        with the same results (up to rounding in the final digit) as
+        calling identifyOtherBallNextCollision() with each of those Ball
+        objects in turn.
+        
+        The pairs are subjected to the same series of tests as in
+        identifyOtherBallNextCollision(), with the pairs failing any
+        test being removed before the next test is applied, so that
+        the later (more expensive) parts of the calculation are only
+        performed for pairs that may still collide.
+        
+        Args:
+            Required positional:
+            idx_arr (1D array-like of ints): The indices in the
+                    simulation's BallStateArrays of the other Ball
+                    objects with which the next collision with the
+                    current Ball is to be identified. Should not
+                    include the index of this Ball object.
         
-        # Find the zero momentum frame
-        m_tot = self.m + other.m
-        m_ratio = other.m / self.m
-        v0 = tuple((self.m * x + other.m * y) / m_tot\
-                for x, y in zip(v1, v2))
+        Returns:
+        4-tuple of numpy arrays, each containing one row for each of
+        the other Ball objects which on their current trajectories will
+        collide with this Ball object before either of them is due to
+        next collide with a wall, in the same order as they appear in
+        idx_arr. Index 0 contains the 1D array of ints giving the
+        indices of those Ball objects, index 1 contains the 1D array of
+        floats giving the times at which the collisions would occur
+        (in terms of the simulation time measure), index 2 contains
+        the 2D array of floats whose rows are the displacement vectors
+        from the centre of this Ball to the other Ball at the positions
+        they are due to collide and index 3 contains the 2D array of
+        floats whose rows are the velocity vectors of this Ball object
+        in the zero momentum frame of the two objects combined (see
+        the documentation of identifyOtherBallNextCollision()).
+        """
+        arrs = self._state_arrays
+        idx_arr = np.asarray(idx_arr, dtype=np.intp)
+        t0_self = self._t0
+        t_max = np.minimum(arrs.t_wall[idx_arr],\
+                arrs._t_wall_arr[self._idx])
+        t0 = np.maximum(arrs.t0[idx_arr], t0_self)
+        keep = np.flatnonzero(t0 < t_max)
+        idx_arr, t_max, t0 = idx_arr[keep], t_max[keep], t0[keep]
         
-        #v2_zmf = tuple(x - y for x, y in zip(v2, v0))
+        # Positions and velocities of both Ball objects at the later of
+        # their reference times
+        g = np.asarray(self._g, dtype=float)
+        dt = (t0 - t0_self)[:, np.newaxis]
+        r1 = np.asarray(self._r0) + np.asarray(self._v0) * dt +\
+                g * dt ** 2 / 2
+        v1 = np.asarray(self._v0) + g * dt
+        dt = (t0 - arrs.t0[idx_arr])[:, np.newaxis]
+        v2_0 = arrs.v0[idx_arr]
+        r2 = arrs.r0[idx_arr] + v2_0 * dt + g * dt ** 2 / 2
+        v2 = v2_0 + g * dt
         
-        v_net = tuple(x - y for x, y in zip(v1, v2))
+        v_net = v1 - v2
+        rad_sum = self.radius + arrs.radius[idx_arr]
         
         # Check whether balls are separating along any dimension along
-        # which they are already too far apart to collide
-        for i in range(self.n_dims):
-            if (r1[i] - r2[i] > rad_sum and v_net[i] >= 0) or\
-                    r2[i] - r1[i] > rad_sum and v_net[i] <= 0:
-                return ()
-        # Check that balls are moving such that (at least initially)
-        # their relative distance is decreasing
-        if sum((x1 - x2) * y for x1, x2, y in zip(r1, r2, v_net)) >= 0:
-            return ()
-        v_net_sq = sum(x ** 2 for x in v_net)
-        approach_vec, t2 =\
-                closestApproachVector(r1, r2, v_net, v_net_sq)
-        #if t2 < 0:
-        #    return ()
-        approach_vec_sq = sum(x ** 2 for x in approach_vec)
+        # which they are already too far apart to collide, and that
+        # balls are moving such that (at least initially) their
+        # relative distance is decreasing
+        displ = r1 - r2
+        rad_sum_col = rad_sum[:, np.newaxis]
+        separating = (((displ > rad_sum_col) & (v_net >= 0)) |\
+                ((-displ > rad_sum_col) & (v_net <= 0))).any(axis=1)
+        keep = np.flatnonzero(~separating &\
+                ((displ * v_net).sum(axis=1) < 0))
+        idx_arr, t_max, t0, rad_sum = idx_arr[keep], t_max[keep],\
+                t0[keep], rad_sum[keep]
+        r1, r2, v1, v2, v_net = r1[keep], r2[keep], v1[keep],\
+                v2[keep], v_net[keep]
+        
+        # Closest approach (see closestApproachVector())
+        v_net_sq = (v_net ** 2).sum(axis=1)
+        t2 = (v_net * (r2 - r1)).sum(axis=1) / v_net_sq
+        approach_vec = r2 - (r1 + v_net * t2[:, np.newaxis])
+        approach_vec_sq = (approach_vec ** 2).sum(axis=1)
         # Check whether closest approach is less than the sum of the
         # radii of the two balls
-        if approach_vec_sq >= rad_sum_sq:
-            return ()
-        dt2 = math.sqrt((rad_sum_sq - approach_vec_sq) / v_net_sq)
-        t2 += t0 - dt2
-        if not t2 < t_max:
-            return ()
-        # Displacement vector from the centre of ball self to the
-        # centre of ball other at the point of collision
-        contact_displ_vec = tuple(x + y * dt2 for x, y in\
-                zip(approach_vec, v_net))
-        v1_zmf = tuple(x - y for x, y in zip(v1, v0))
-        return t2, contact_displ_vec, v1_zmf#, v2_zmf
+        rad_sum_sq = rad_sum ** 2
+        keep = np.flatnonzero(approach_vec_sq < rad_sum_sq)
+        dt2 = np.sqrt((rad_sum_sq[keep] - approach_vec_sq[keep]) /\
+                v_net_sq[keep])
+        t2 = t2[keep] + (t0[keep] - dt2)
+        keep2 = np.flatnonzero(t2 < t_max[keep])
+        keep = keep[keep2]
+        idx_arr, t2, dt2 = idx_arr[keep], t2[keep2], dt2[keep2]
+        # Displacement vectors from the centre of ball self to the
+        # centres of the other balls at the points of collision
+        contact_displ_vecs = approach_vec[keep] +\
+                v_net[keep] * dt2[:, np.newaxis]
+        # Find the zero momentum frames
+        v1, v2 = v1[keep], v2[keep]
+        m1, m2 = self.m, arrs.m[idx_arr][:, np.newaxis]
+        v0 = (m1 * v1 + m2 * v2) / (m1 + m2)
+        v1_zmf = v1 - v0
+        return idx_arr, t2, contact_displ_vecs, v1_zmf
+    
+    def identifyFewOtherBallsNextCollisions(
+        self,
+        idx_arr: Union[List[int], np.ndarray],
+    ) -> List[Tuple[Union[int, Real, Tuple[Real]]]]:
+        """
+        Version of identifyOtherBallsNextCollisions() for small numbers
+        of other Ball objects, for which the fixed cost of the numpy
+        operations in that method outweighs their benefit. The
+        reference states of the other Ball objects are read from the
+        simulation's BallStateArrays together, after which each pair
+        is examined in turn using the function nextCollision() of the
+        simulation's KinematicKernels (as in
+        identifyOtherBallNextCollision()).
+        
+        Args:
+            Required positional:
+            idx_arr (1D array-like of ints): The indices in the
+                    simulation's BallStateArrays of the other Ball
+                    objects with which the next collision with the
+                    current Ball is to be identified. Should not
+                    include the index of this Ball object.
+        
+        Returns:
+        List of 4-tuples, one for each of the other Ball objects which
+        on their current trajectories will collide with this Ball
+        object before either of them is due to next collide with a
+        wall, in the same order as they appear in idx_arr. Index 0 of
+        each contains the index of the other Ball object, and indices
+        1 to 3 contain the output of identifyOtherBallNextCollision()
+        for that Ball object.
+        """
+        arrs = self._state_arrays
+        kernels = self._kernels
+        posVel = kernels.positionAndVelocityAfterTimeIncrement
+        nextCollision = kernels.nextCollision
+        g = self._g
+        t0_1, r0_1, v0_1 = self._t0, self._r0, self._v0
+        t_wall1 = arrs._t_wall_arr.item(self._idx)
+        rad1, m1 = self.radius, self.m
+        res = []
+        for idx2, t0_2, r0_2, v0_2, t_wall2, rad2, m2 in zip(\
+                np.asarray(idx_arr).tolist(), arrs._t0_arr[idx_arr].tolist(),\
+                arrs._r0_arr[idx_arr].tolist(),\
+                arrs._v0_arr[idx_arr].tolist(),\
+                arrs._t_wall_arr[idx_arr].tolist(),\
+                arrs._radius_arr[idx_arr].tolist(),\
+                arrs._m_arr[idx_arr].tolist()):
+            t_max = min(t_wall1, t_wall2)
+            t0 = max(t0_1, t0_2)
+            if t0 >= t_max: continue
+            r1, v1 = (r0_1, v0_1) if t0 == t0_1 else\
+                    posVel(r0_1, v0_1, g, t0 - t0_1)
+            r2, v2 = (r0_2, v0_2) if t0 == t0_2 else\
+                    posVel(r0_2, v0_2, g, t0 - t0_2)
+            ans = nextCollision(r1, v1, r2, v2, t0, rad1 + rad2, t_max,\
+                    m1, m2)
+            if ans: res.append((idx2, *ans))
+        return res
+    
+    def contactGeometryAtTime(
+        self,
+        other: "Ball",
+        t: Real,
+    ) -> Tuple[Tuple[Real]]:
+        """
+        Given another Ball object with which this Ball object is due
+        to collide at time t, calculates the details of the collision
+        required by the method progressToNextOtherBallCollision() from
+        the positions and velocities of the two Ball objects at that
+        time, on their current trajectories.
+        
+        This allows the outcome of a collision to be calculated when
+        it occurs rather than when it is identified by the method
+        identifyOtherBallNextCollision(), so that only its time need
+        be stored in the interim.
+        
+        Args:
+            Required positional:
+            other (Ball): The other Ball object involved in the
+                    collision.
+            t (real numeric value): The time in terms of the
+                    simulation's time measure at which the collision
+                    occurs.
+        
+        Returns:
+        2-tuple of n-tuples of real numeric values (where n is the
+        number of spatial dimensions of the simulation) whose index 0
+        contains the displacement vector from the centre of this Ball
+        object to the centre of the other Ball object at time t and
+        whose index 1 contains the velocity vector of this Ball object
+        at time t in the zero momentum frame of the two Ball objects.
+        These agree with the corresponding outputs of
+        identifyOtherBallNextCollision() up to rounding error.
+        """
+        r1, v1 = self.positionAndVelocityAtTime(t)
+        r2, v2 = other.positionAndVelocityAtTime(t)
+        m1, m2 = self.m, other.m
+        m_tot = m1 + m2
+        contact_displ_vec = tuple(y - x for x, y in zip(r1, r2))
+        v1_zmf = tuple(m2 * (x - y) / m_tot for x, y in zip(v1, v2))
+        return contact_displ_vec, v1_zmf
     
     def progressToNextOtherBallCollision(
         self,
@@ -853,19 +1233,9 @@ class Ball(object):
         """
         self._updateTime0(t_collide)
         other._updateTime0(t_collide)
-        v1 = self._v0
-        v2 = other._v0
-        mult = -self.m / other.m
-        v2_zmf = tuple(mult * x for x in v1_zmf)
-        rad_sum_sq = (self.radius + other.radius) ** 2
-        dv1_sz = 2 * sum(x * y for x, y in\
-                zip(contact_displ_vec, v1_zmf)) / rad_sum_sq
-        self._v0 = tuple(x - dv1_sz * y for x, y in\
-                zip(v1, contact_displ_vec))
-        dv2_sz = 2 * sum(x * y for x, y in\
-                zip(contact_displ_vec, v2_zmf)) / rad_sum_sq
-        other._v0 = tuple(x - dv2_sz * y for x, y in\
-                zip(v2, contact_displ_vec))
+        self._v0, other._v0 = self._kernels.collisionVelocities(\
+                self._v0, other._v0, self.m, other.m, contact_displ_vec,\
+                v1_zmf, (self.radius + other.radius) ** 2)
         return
     
     def isOutsideBox(self) -> Tuple[int]:
@@ -898,7 +1268,7 @@ class Ball(object):
               the far wall).
         - Otherwise is an empty tuple.
         """
-        for axis_idx in range(self.n_dims):
+        for axis_idx in range(self._n_dims):
             r = self.r[axis_idx]
             if self.centre_ranges[axis_idx][0] > r:
                 return axis_idx, 0
@@ -932,7 +1302,7 @@ class Ball(object):
         the Ball object at the time represented by attribute t in terms
         of the simulation's energy units.
         """
-        return -sum(self.m * a * r for a, r in zip(self.g, self.r))
+        return -sum(self.m * a * r for a, r in zip(self._g, self.r))
     
     def calculateMechanicalEnergy(self) -> Real:
         """
@@ -1095,6 +1465,125 @@ class MultiBallSimulation(object):
                 Otherwise, this gives the components of the uniform
                 gravitational field in terms of the basis vectors.
             Default: 0
+        broadphase (str or None): Specifies the method used to restrict
+                the pairs of Ball objects examined for projected
+                collisions after a change in the trajectory of one of
+                them. The options are:
+                - None: every other Ball object in the simulation is
+                   examined, unless the simulation has one spatial
+                   dimension, in which case "ordered_1d" is used.
+                - "cell_grid": the box is partitioned into a uniform
+                   grid of cells (see UniformCellGrid) and only the
+                   Ball objects in neighbouring cells are examined,
+                   with the times Ball objects move between cells
+                   scheduled alongside the collisions. This makes the
+                   cost of each collision depend on the local density
+                   of Ball objects rather than their total number.
+                - "hierarchical_grid": as for "cell_grid", but with
+                   several grids of cells of different sizes, with each
+                   Ball object assigned to the grid whose cells best
+                   match its size (see HierarchicalCellGrid). This
+                   avoids the cells being sized for the largest Ball
+                   object, and so is suited to simulations in which the
+                   radii of the Ball objects differ greatly.
+                - "sweep_and_prune": each Ball object is assigned a
+                   region around its current position which it sweeps
+                   out until the region is reset, the extents of which
+                   along each basis vector are kept in sorted lists
+                   (see SweepAndPrune), and only the Ball objects whose
+                   regions overlap are examined, with the times the
+                   regions are due to be reset scheduled alongside the
+                   collisions. As the regions move with the Ball
+                   objects, this is suited to highly anisotropic boxes
+                   and dilute gases.
+                - "ordered_1d": only for simulations with one spatial
+                   dimension, in which Ball objects cannot pass each
+                   other. The Ball objects are kept in order of
+                   position and only the Ball objects either side of a
+                   given Ball object are examined (see
+                   OrderedNeighbours), so the cost of each collision
+                   does not depend on the number of Ball objects.
+            Default: None
+        cell_width (real numeric value or None): If broadphase is given
+                as "cell_grid", the minimum width of the cells along
+                any basis vector in terms of the simulation's distance
+                units (the width used is never less than twice the
+                largest radius of any Ball object in the simulation).
+                If broadphase is given as "hierarchical_grid", the
+                minimum width of the cells of its lowest level (the
+                width used is never less than twice the smallest
+                radius of any Ball object in the simulation).
+                If broadphase is given as "sweep_and_prune", the width
+                of the anchors of the Ball objects (see SweepAndPrune),
+                which if not given is 8 times the largest radius of any
+                Ball object in the simulation. Otherwise, this is
+                ignored.
+            Default: None
+        compact_events (bool): If True, the projected collisions in
+                the attribute balls_collision_heaps are stored in the
+                compact form described in the documentation of that
+                attribute, with the details of each collision needed
+                to calculate its outcome recalculated from the
+                trajectories of the Ball objects when it occurs, and
+                with at most max_predictions projected collisions
+                stored for each Ball object at any time. This keeps
+                the memory used by the simulation proportional to the
+                number of Ball objects however long it is run for, at
+                the cost of a small amount of additional work per
+                collision.
+            Default: False
+        max_predictions (strictly positive int): If compact_events is
+                True, the largest number of projected collisions
+                stored for each Ball object when its projected
+                collisions are calculated. Where more are found, only
+                the soonest max_predictions are kept and the projected
+                collisions of that Ball object are recalculated at the
+                time of the last of these (if it has not changed
+                trajectory by then). Otherwise, this is ignored.
+            Default: 4
+        event_queue_type (str): Specifies the implementation of the
+                attribute event_queue. The options are:
+                - "heap": a binary min-heap (see HeapEventQueue), from
+                   which events that are no longer on course to occur
+                   are discarded when they reach its front.
+                - "sorted": a sorted list indexed by Ball object (see
+                   SortedEventQueue), from which the events of each
+                   Ball object are removed as soon as it changes
+                   trajectory, so that the queue never contains events
+                   that are no longer on course to occur. This has a
+                   larger cost per operation, but avoids the growth
+                   of the queue between compactions.
+                - "calendar": a calendar queue (see
+                   CalendarEventQueue), which like "heap" discards
+                   events that are no longer on course to occur when
+                   they reach its front, but whose insertions and
+                   removals take amortised constant rather than
+                   logarithmic time, and so is suited to simulations
+                   with very large numbers of Ball objects.
+            Default: "heap"
+        reduced_precision (bool): If True, the reference positions and
+                velocities of the Ball objects are stored in single
+                rather than double precision (see the initialisation
+                argument dtype of BallStateArrays), with the times
+                still stored in double precision and all calculations
+                performed in double precision. This reduces the memory
+                used, for simulations with very large numbers of Ball
+                objects where only the qualitative behaviour matters.
+                As the rounded states do not exactly follow the
+                trajectories from which the projected collisions were
+                calculated, each collision between two Ball objects is
+                re-validated against the stored states when it is due
+                to occur, being applied only if the two Ball objects
+                are still approaching each other (at no earlier than
+                the reference times of either of them), and
+                otherwise discarded with their projected collisions
+                recalculated. The projected collisions are always
+                stored in compact form (i.e. compact_events is
+                taken to be True), and the checks for overlap allow
+                for the rounding (see the attribute position_tol).
+                The mechanical energy is then conserved only up to
+                the precision of the stored states.
+            Default: False
     
     Attributes:
     
@@ -1107,6 +1596,31 @@ class MultiBallSimulation(object):
         g (n-tuple of real numeric values): Vector representing the
                 uniform gravitational field in terms of the
                 simulation's acceleration units.
+        broadphase (str or None): The method used to restrict the
+                pairs of Ball objects examined for projected
+                collisions (see above).
+        event_queue_type (str): The implementation of the attribute
+                event_queue (see above).
+        compact_events (bool): Whether the projected collisions in the
+                attribute balls_collision_heaps are stored in compact
+                form (see above).
+        reduced_precision (bool): Whether the reference positions and
+                velocities of the Ball objects are stored in single
+                precision (see above).
+        position_tol (non-negative real numeric value): The distance
+                by which Ball objects may overlap each other or extend
+                beyond the walls of the box without this being
+                reported by the checks for overlap (such as
+                anyOverlapMessage()), allowing for the rounding of the
+                stored positions. This is zero unless reduced_precision
+                is True.
+        max_predictions (strictly positive int): If compact_events is
+                True, the largest number of projected collisions
+                stored for each Ball object (see above).
+        kernels (KinematicKernels): The functions used for the
+                calculations of the motion and collisions of the Ball
+                objects, chosen for the number of dimensions of the
+                simulation and whether there is a gravitational field.
         box_dims (n-tuple of strictly positive real numeric values):
                 The dimensions of the n-hyperrectangular box in which
                 the simulation is contained (i.e. for each basis
@@ -1130,6 +1644,15 @@ class MultiBallSimulation(object):
             
         balls (list of Ball objects): The Ball objects in the
                 simulation.
+        ball_state_arrays (BallStateArrays): Struct-of-arrays store
+                holding the mass, radius, reference time and reference
+                position and velocity vectors of every Ball object in
+                the simulation in contiguous NumPy arrays, with one row
+                per Ball object in the same order as the attribute
+                balls. Each Ball object is a view of its row, so these
+                arrays always reflect the current trajectories of the
+                Ball objects and may be used for vectorised
+                calculations over the whole simulation.
         ball_states (list of integers): A list of the same length as
                 the attribute balls. Each entry contains a non-negative
                 integer giving the state of the corresponding Ball
@@ -1182,6 +1705,24 @@ class MultiBallSimulation(object):
                 - Indices 5 and 6 contain non-negative integers idx2
                    and the current state of the Ball object with index
                    idx2 respectively.
+                If the attribute compact_events is True, the details
+                are instead stored as a 4-tuple with the following
+                structure (so that no vectors are stored, and ties in
+                the time are broken by the integer idx2):
+                - Index 0 contains a real numeric value representing
+                   the time the collision is projected to occur (in the
+                   simulation's time measure).
+                - Index 1 contains the non-negative integer idx2.
+                - Indices 2 and 3 contain non-negative integers giving
+                   the current state of the Ball objects with indices
+                   idx1 and idx2 respectively.
+                In this case, each min-heap holds at most
+                max_predictions entries, and if any projected
+                collisions of the Ball object at index idx1 were
+                omitted when it was calculated, the event_queue
+                contains an event (of kind REPREDICT_EVENT) at the time
+                of its latest entry at which its projected collisions
+                are recalculated.
                 As previously mentioned, the min-heap is arranged based
                 on the time the corresponding collision is due to
                 occur, so that the top of the heap (at index 0 in the
@@ -1189,12 +1730,97 @@ class MultiBallSimulation(object):
                 (joint) smallest (and so soonest) time for the
                 projected collision it describes out of all entries in
                 the heap.
+        event_queue (HeapEventQueue, SortedEventQueue or
+                CalendarEventQueue): Priority queue of the events
+                (collisions between pairs of Ball objects, collisions
+                between a Ball object and a wall and, if applicable,
+                cell crossings) currently scheduled in the simulation,
+                ordered by the time they are due to occur. For each
+                Ball object, this contains its next collision with a
+                wall, its next cell crossing and the collision at the
+                top of its min-heap in balls_collision_heaps. The queue
+                persists between calls to progressTime(), so that
+                progressing the simulation over a time interval only
+                involves examining the events due in that interval.
+                Events involving a Ball object whose state has
+                changed since they were scheduled are discarded when
+                they reach the front of the queue or, if the queue
+                supports it (as for SortedEventQueue), removed when
+                that change occurs (see the documentation of
+                HeapEventQueue for the format of the events).
+        stats (SimulationStats or None): If enabled using the method
+                enableStats(), the counters and timers of the work
+                done by the simulation (see the documentation of
+                SimulationStats), which are updated as the simulation
+                runs. Otherwise None, in which case no such
+                instrumentation is performed.
+        ledger (ThermodynamicLedger or None): If enabled using the
+                method enableLedger(), the accumulator of the total
+                energies, temperature and momentum transferred to each
+                wall (see the documentation of ThermodynamicLedger),
+                which is updated at each collision. Otherwise None.
+        event_log (EventLogWriter or None): If started using the method
+                startEventLog(), the writer to which every collision
+                processed by the simulation is recorded (see the
+                documentation of EventLogWriter). Otherwise None.
+        observers (tuple of callables): The callables registered using
+                the method addObserver(), which are called with a
+                CollisionEvent describing each collision processed by
+                the simulation, in the order they were registered.
+        keyframe_times (list of real numeric values or None): If
+                enabled using the method enableKeyframes(), the times
+                (in the simulation's time measure) of the checkpoints
+                of the simulation kept as keyframes for use by the
+                method seek(), in increasing order. Otherwise None.
     
     Methods:
         (For full description, see documentation of the method itself)
         
         progressTime(): Progresses the simulation up to a specified
                 time.
+        ballStatesAtTime(): Calculates the position and velocity
+                vectors of every Ball object in the simulation at a
+                given time as numpy arrays.
+        sampleStates(): Generator progressing the simulation through a
+                sequence of times and yielding the position and
+                velocity vectors of every Ball object at each of them.
+        enableStats(): Attaches a SimulationStats object to the
+                simulation, which is then updated as it runs.
+        disableStats(): Detaches the SimulationStats object (if any).
+        enableLedger(): Attaches a ThermodynamicLedger to the
+                simulation, which is then updated at each collision.
+        disableLedger(): Detaches the ThermodynamicLedger (if any).
+        addObserver(): Registers a callable to be called with the
+                details of each collision processed by the simulation.
+        removeObserver(): Removes a callable registered with
+                addObserver().
+        events(): Generator progressing the simulation up to a given
+                time and yielding the details of each collision as it
+                is processed.
+        startEventLog(): Starts recording every collision processed by
+                the simulation to an event log file.
+        stopEventLog(): Stops recording to the event log file (if any)
+                and closes it.
+        checkpoint(): Creates a snapshot of the complete state of the
+                simulation (including its scheduled events) as bytes.
+        saveCheckpoint(): Writes a snapshot of the complete state of
+                the simulation to a file.
+        fromCheckpoint(): Class method creating a simulation from a
+                snapshot created by checkpoint().
+        loadCheckpoint(): Class method creating a simulation from a
+                snapshot file written by saveCheckpoint().
+        restoreCheckpoint(): Returns the simulation to the state
+                recorded in a snapshot created by checkpoint().
+        enableKeyframes(): Starts taking a snapshot of the simulation
+                at regular intervals of simulation time.
+        disableKeyframes(): Stops taking these snapshots and discards
+                those taken.
+        seek(): Moves the simulation to a given time, restoring the
+                latest snapshot taken at or before that time where
+                this is quicker than progressing the simulation.
+        heapStats(): Gives the current sizes of the event queue and
+                per-ball collision min-heaps and the proportion of
+                their entries that are stale.
         calculateTotalKineticEnergy(): Calculates the total
                 translational kinetic energy of the objects in the
                 simulation.
@@ -1224,23 +1850,131 @@ class MultiBallSimulation(object):
                 checks of detectAnyBallOutsideBox() and
                 detectAnyBallsOverlap().
     """
+    broadphase_options = {
+        "cell_grid": UniformCellGrid,
+        "hierarchical_grid": HierarchicalCellGrid,
+        "sweep_and_prune": SweepAndPrune,
+        "ordered_1d": OrderedNeighbours,
+    }
+    
+    # The largest number of other Ball objects for which the projected
+    # collisions with a Ball object are found using the method
+    # identifyFewOtherBallsNextCollisions() of Ball rather than the
+    # (numpy) method identifyOtherBallsNextCollisions()
+    _few_pairs_max = 32
+    
+    event_queue_options = {
+        "heap": HeapEventQueue,
+        "sorted": SortedEventQueue,
+        "calendar": CalendarEventQueue,
+    }
+    
+    # The identifier and version of the format of the snapshots created
+    # by checkpoint()
+    _checkpoint_format = ("gas_simulation.MultiBallSimulation", 1)
+    
+    # The attributes of the simulation not recorded in its snapshots,
+    # either because they are recreated from the others (the Ball
+    # objects and kinematic functions) or because they describe the
+    # monitoring of the simulation rather than its state
+    _non_checkpoint_attrs = frozenset({
+        "_kernels",
+        "balls",
+        "_t_set_balls",
+        "_stats",
+        "_ledger",
+        "_event_log",
+        "_observers",
+        "_keyframes",
+        "_keyframe_interval",
+        "_keyframe_dir",
+    })
+    
     def __init__(
         self,
         box_dims: Tuple[Real],
         g: Union[Real, Tuple[Real]]=0,
+        broadphase: Optional[str]=None,
+        cell_width: Optional[Real]=None,
+        compact_events: bool=False,
+        max_predictions: int=4,
+        event_queue_type: str="heap",
+        reduced_precision: bool=False,
     ):
         
         self._box_dims = box_dims
         self._box_interior_ranges = tuple((0, x) for x in box_dims)
         self._g = g if hasattr(g, "__getitem__") else\
                 tuple([0] * (self.n_dims - 1) + [g])
+        self._kernels = KinematicKernels(self.n_dims, self._g)
+        
+        if broadphase is not None and\
+                broadphase not in self.broadphase_options.keys():
+            raise ValueError(f"broadphase must be None or one of "\
+                    f"{sorted(self.broadphase_options.keys())}, got "\
+                    f"{broadphase!r}")
+        if broadphase == "ordered_1d" and self.n_dims != 1:
+            raise ValueError(f"broadphase 'ordered_1d' can only be used "\
+                    f"for simulations with one spatial dimension, got "\
+                    f"{self.n_dims}")
+        if broadphase is None and self.n_dims == 1:
+            broadphase = "ordered_1d"
+        self._broadphase_name = broadphase
+        self._cell_width = cell_width
+        self._broadphase = None
+        
+        if max_predictions < 1:
+            raise ValueError(f"max_predictions must be a strictly "\
+                    f"positive integer, got {max_predictions!r}")
+        if event_queue_type not in self.event_queue_options.keys():
+            raise ValueError(f"event_queue_type must be one of "\
+                    f"{sorted(self.event_queue_options.keys())}, got "\
+                    f"{event_queue_type!r}")
+        self._event_queue_type = event_queue_type
+        
+        self._reduced_precision = reduced_precision
+        self._position_tol = 0.
+        if reduced_precision:
+            # The details of each collision are recalculated from the
+            # stored states when it occurs in any case
+            compact_events = True
+            # Allows for a few units in the last place of the largest
+            # possible position component in single precision
+            self._position_tol = 8 * float(np.finfo(np.float32).eps) *\
+                    max(max(abs(x) for x in rng)\
+                    for rng in self._box_interior_ranges)
+        self._compact_events = compact_events
+        self._max_predictions = max_predictions
+        # The indices in the entries of balls_collision_heaps of the
+        # state of the first Ball object, the index of the second Ball
+        # object and the state of the second Ball object respectively
+        self._bc_entry_fields = (2, 1, 3) if compact_events else (3, 5, 6)
         
         self.t = 0
+        # The Ball objects whose current time (attribute t) has been
+        # set to a value different from the current time of the
+        # simulation
+        self._t_set_balls = set()
         
+        self._ball_state_arrays = BallStateArrays(self.n_dims,\
+                dtype=np.float32 if reduced_precision else float)
         self.balls = []
         self.ball_states = []
         
-        self._t_ref = float("inf")
+        self._stats = None
+        self._ledger = None
+        self._event_log = None
+        # The callables to which each collision is passed (see
+        # addObserver()), replaced rather than modified when an observer
+        # is added or removed so that it may be iterated over safely
+        # while observers are being notified
+        self._observers = ()
+        # The times of the keyframes (see enableKeyframes()) with either
+        # the corresponding snapshots or the paths of the files to which
+        # they were written
+        self._keyframes = None
+        self._keyframe_interval = None
+        self._keyframe_dir = None
     
     @property
     def box_dims(self):
@@ -1258,141 +1992,1017 @@ class MultiBallSimulation(object):
     def g(self):
         return self._g
     
-    def addBall(
-        self,
-        m: Real,
-        radius: Real,
-        r0: Tuple[Real],
-        v0: Tuple[Real],
-        check_overlap: bool=True,
-        balls_t_updated: bool=False,
-    ) -> bool:
+    @property
+    def broadphase(self):
+        return self._broadphase_name
+    
+    @property
+    def event_queue_type(self):
+        return self._event_queue_type
+    
+    @property
+    def compact_events(self):
+        return self._compact_events
+    
+    @property
+    def reduced_precision(self):
+        return self._reduced_precision
+    
+    @property
+    def position_tol(self):
+        return self._position_tol
+    
+    @property
+    def max_predictions(self):
+        return self._max_predictions
+    
+    @property
+    def kernels(self):
+        return self._kernels
+    
+    @property
+    def ball_state_arrays(self):
+        return self._ball_state_arrays
+    
+    @property
+    def stats(self):
+        return self._stats
+    
+    def enableStats(self, timings: bool=False) -> SimulationStats:
         """
-        Adds a Ball object to the simulation at the current time,
-        representing a ball with mass in n-dimensional space (where
-        n is the number of spatial dimensions of the simulation)
-        which collides perfectly elastically with both walls and other
-        Ball objects.
-        If check_overlap given as True then before adding the Ball
-        checks that it does not overlap any other objects in the
-        simulation and is completely inside the box. If this check
-        is failed, then the Ball object is not added to the simulation.
-        
-        In the following:
-        - n represents the number of spatial dimensions of the
-            simulation (equal to the attribute n_dims)
-        - The current time of the simulation refers to the time
-            corresponding to the simulation's time measure having
-            a numerical value equal to the value of attribute t
-            at the point this method is called.
-        - Vectors are representeded using their components in the
-            simulation's orthonormal basis as an n-tuple of real
-            numeric values, with their units being the corresponding
-            unit of the simulation (e.g. the simulation's distance
-            units for position and displacement vectors, the
-            simulation's speed units- where one speed unit is equal to
-            one distance unit divided by one time unit- for velocity
-            vectors, etc.).
-        - The origin used for all position vectors is the spatial
-            origin of the simulation (as defined in the documentation
-            for MultiBallSimulation)
+        Attaches a new SimulationStats object to the simulation as the
+        attribute stats, replacing any previously attached, so that
+        counts (and optionally timings) of the work done by the
+        simulation from this point are recorded.
         
         Args:
-            Required positional:
-            m (strictly positive real numeric value): The mass of the
-                    object in terms of the simulation's mass units.
-            radius (strictly positive real numeric value): The radius
-                    of the new Ball object in terms of the simulation's
-                    mass units.
-            r0 (n-tuple of real numeric values): The position vector of
-                    the centre of the new Ball object at the current
-                    time.
-            v0 (n-tuple of real numeric values): The velocity vector of
-                    the centre of the new Ball object at the current
-                    time.
-            
             Optional named:
-            
-            check_overlap (bool): If True then checks to ensure that
-                    the new Ball object being added would be completely
-                    within the box and would not overlap with any
-                    object previously added to the simulation. If
-                    this check is performed and either of those
-                    conditions is not satisfied, then the new Ball
-                    object is not added to the simulation.
-                    This should only be given as False in a situation
-                    where both of the conditions are guaranteed to
-                    be satisfied. Otherwise, the simulation may not
-                    function correctly.
-                Default: True
-            balls_t_updated (bool): If True and check_overlap is also
-                    True, when checking for overlaps between the new
-                    Ball object and any of the previously added Ball
-                    objects (contained in the attribute balls), it is
-                    assumed that all of those previously added Ball
-                    objects have the same attribute t as that of the
-                    simulation (i.e. have the same current time).
-                    Otherwise, this is not assumed, and (if
-                    check_overlap is True) the attribute t of those
-                    previously added Ball objects is progressed to
-                    match that of the simulation.
+            timings (bool): If True, the time spent in each phase of
+                    the simulation is also recorded (see the
+                    documentation of SimulationStats).
                 Default: False
         
         Returns:
-        Boolean (bool), True if the Ball object was added to the
-        simulation, False if not (which only occurs when check_overlap
-        is given as False and either the definition of the new Ball
-        object does not place it completely within the box or it
-        overlaps with an object previously added to the simulation).
+        The attached SimulationStats object.
         """
-        ball = Ball(self, m, radius, r0, v0, t0=self.t)
-        if check_overlap:
-            if not balls_t_updated:
-                self._updateBallsTime()
-            if ball.isOutsideBox() or\
-                    self._detectBallsOverlap(ball, start_idx=0):
-                #print("failed check")
-                return False
-            #print("passed check")
-        self.balls.append(ball)
-        self.ball_states.append(0)
-        return True
+        self._stats = SimulationStats(timings=timings)
+        return self._stats
     
-    def _ballsCollisionHeapEntry(
-        self,
-        idx1: int,
-        idx2: int,
-    ) -> Tuple[Union[Real, Tuple[Real]]]:
+    def disableStats(self) -> Optional[SimulationStats]:
         """
-        Finds the next time (if any) two specific Ball objects in the
-        simulation are due to collide with each other and provides
-        details of this projected collision in a format that can
-        be inserted directly into the appropriate min-heap in the
-        attribute balls_collision_heaps.
-        
-        In the following:
-        - n represents the number of spatial dimensions of the
-            simulation (equal to the attribute n_dims)
-        - Vectors are represented using their components in the
-            simulation's orthonormal basis as an n-tuple of real
-            numeric values, with their units being the corresponding
-            unit of the simulation (e.g. the simulation's distance
-            units for position and displacement vectors, the
-            simulation's speed units- where one speed unit is equal to
-            one distance unit divided by one time unit- for velocity
-            vectors, etc.).
-        
-        Args:
-            Required positional:
-            idx1 (int): Non-negative integer giving the index in
-                    attribute balls for one of the pair of Ball
-                    objects being examined. This is also the index
-                    in the attribute balls_collision_heaps into
-                    which the output of this method is intended
-                    to be inserted
-            idx2 (int): Non-negative integer giving the index in
-                    attribute balls of the other of the pair of
-                    Ball objects being examined.
+        Detaches the SimulationStats object (if any) from the
+        simulation, so that no further instrumentation is performed.
+        
+        Returns:
+        The detached SimulationStats object, or None if there was none.
+        """
+        stats = self._stats
+        self._stats = None
+        return stats
+    
+    @property
+    def ledger(self):
+        return self._ledger
+    
+    def enableLedger(self) -> ThermodynamicLedger:
+        """
+        Attaches a new ThermodynamicLedger to the simulation as the
+        attribute ledger, replacing any previously attached, so that
+        the total energies, temperature and pressures of the simulation
+        can be read at any point without a sum over every Ball object,
+        and the conservation of energy checked. The ledger is
+        calculated from the current states of the Ball objects and is
+        then updated at each collision (as an observer, see the method
+        addObserver()) and when Ball objects are added.
+        
+        Returns:
+        The attached ThermodynamicLedger object.
+        """
+        self.disableLedger()
+        self._ledger = ThermodynamicLedger(self)
+        self.addObserver(self._ledger.recordEvent)
+        return self._ledger
+    
+    def disableLedger(self) -> Optional[ThermodynamicLedger]:
+        """
+        Detaches the ThermodynamicLedger (if any) from the simulation,
+        so that it is no longer updated.
+        
+        Returns:
+        The detached ThermodynamicLedger object, or None if there was
+        none.
+        """
+        ledger = self._ledger
+        if ledger is None: return None
+        self.removeObserver(ledger.recordEvent)
+        self._ledger = None
+        return ledger
+    
+    @property
+    def observers(self):
+        return self._observers
+    
+    def addObserver(
+        self,
+        observer: Callable[[CollisionEvent], Any],
+    ) -> Callable[[CollisionEvent], Any]:
+        """
+        Registers a callable to be called with a CollisionEvent
+        describing each collision (between two Ball objects or between
+        a Ball object and a wall) processed by the simulation, giving
+        its time, participants and the momentum transferred, so that
+        observables, loggers and visual effects can follow the
+        simulation event by event.
+        
+        The observers are called in the order they were registered,
+        immediately after the collision is processed (so that the
+        reference states of the Ball objects involved are those
+        immediately after the collision), at which point the current
+        time of the simulation (attribute t) is not yet updated. They
+        should not progress the simulation or add Ball objects to it.
+        When there are no observers, no CollisionEvent objects are
+        created.
+        
+        Args:
+            Required positional:
+            observer (callable): The callable to be registered, which
+                    takes a CollisionEvent as its only argument.
+        
+        Returns:
+        The callable observer (so that this may be used as a
+        decorator).
+        """
+        self._observers = self._observers + (observer,)
+        return observer
+    
+    def removeObserver(
+        self,
+        observer: Callable[[CollisionEvent], Any],
+    ) -> None:
+        """
+        Removes a callable registered using the method addObserver(),
+        after which it is no longer called for each collision.
+        
+        Args:
+            Required positional:
+            observer (callable): The callable to be removed.
+        
+        Returns:
+        None
+        """
+        observers = list(self._observers)
+        observers.remove(observer)
+        self._observers = tuple(observers)
+        return
+    
+    def _notifyWallCollision(self, idx: int, axis: int) -> None:
+        """
+        Passes a CollisionEvent describing the collision just processed
+        between the Ball object with index idx and a wall normal to the
+        basis vector with index axis to each of the observers.
+        
+        Args:
+            Required positional:
+            idx (int): The index of the Ball object in the attribute
+                    balls.
+            axis (int): The index of the basis vector normal to the
+                    wall.
+        
+        Returns:
+        None
+        """
+        ball = self.balls[idx]
+        v_normal = ball._v0[axis]
+        # The component of the velocity normal to the wall is reversed
+        # by the collision, so the Ball object was previously moving
+        # with the opposite velocity
+        impulse = [0.] * self.n_dims
+        impulse[axis] = 2 * ball.m * v_normal
+        wall = 2 * axis + (ball._r0[axis] * 2 >= self.box_dims[axis])
+        event = CollisionEvent(ball._t0, idx, -1, wall, tuple(impulse))
+        for observer in self._observers:
+            observer(event)
+        return
+    
+    def _notifyBallsCollision(
+        self,
+        t: Real,
+        idx1: int,
+        idx2: int,
+        contact_displ_vec: Tuple[Real],
+        v1_zmf: Tuple[Real],
+        rejected: bool=False,
+    ) -> None:
+        """
+        Passes a CollisionEvent describing the collision just processed
+        between the Ball objects with indices idx1 and idx2 to each of
+        the observers.
+        
+        Args:
+            Required positional:
+            t (real numeric value): The time of the collision.
+            idx1 (int): The index of the first Ball object in the
+                    attribute balls.
+            idx2 (int): The index of the second Ball object in the
+                    attribute balls.
+            contact_displ_vec (n-tuple of real numeric values): The
+                    displacement vector from the centre of the first
+                    Ball object to the centre of the second at time t.
+            v1_zmf (n-tuple of real numeric values): The velocity of
+                    the first Ball object in the zero momentum frame of
+                    the two Ball objects immediately before the
+                    collision.
+            
+            Optional named:
+            rejected (bool): Whether the collision was rejected on
+                    re-validation, in which case the impulse is zero.
+                Default: False
+        
+        Returns:
+        None
+        """
+        if rejected:
+            impulse = (0.,) * self.n_dims
+        else:
+            # In the zero momentum frame, the component of the velocity
+            # of the first Ball object along the line of centres is
+            # reversed by the collision
+            ball1 = self.balls[idx1]
+            mult = -2 * ball1.m * sum(x * y for x, y in\
+                    zip(contact_displ_vec, v1_zmf)) /\
+                    sum(x * x for x in contact_displ_vec)
+            impulse = tuple(mult * x for x in contact_displ_vec)
+        event = CollisionEvent(t, idx1, idx2, -1, impulse, rejected)
+        for observer in self._observers:
+            observer(event)
+        return
+    
+    @property
+    def event_log(self):
+        return self._event_log
+    
+    def startEventLog(
+        self,
+        path: str,
+        buffer_size: int=4096,
+    ) -> EventLogWriter:
+        """
+        Starts recording the events processed by the simulation to an
+        event log file at path, which can be read using EventLog.
+        
+        The states of the Ball objects at this point are written to
+        the file, followed by a fixed-size record for each event in
+        which the state of one or two Ball objects changes (see
+        eventRecordDtype() in the event_log module) as it is
+        processed, so that the full history of the simulation from
+        this point can be reconstructed from the file. These are
+        collisions between two Ball objects (including, for
+        simulations with reduced_precision True, those rejected on
+        re-validation, for which the velocities are unchanged) and
+        collisions between a Ball object and a wall. The records are
+        written by a background thread (see EventLogWriter), so the
+        simulation does not wait for the file to be written.
+        
+        Ball objects may not be added to the simulation while the log
+        is being recorded.
+        
+        Args:
+            Required positional:
+            path (str): The path of the file to be written (which is
+                    overwritten if it exists).
+            
+            Optional named:
+            buffer_size (strictly positive int): The number of records
+                    passed to the background thread at a time.
+                Default: 4096
+        
+        Returns:
+        The EventLogWriter to which the events are recorded (also
+        given by the attribute event_log).
+        """
+        if self._event_log is not None:
+            raise ValueError("An event log is already being recorded, "\
+                    "stop it with stopEventLog() first")
+        arrs = self._ball_state_arrays
+        self._event_log = EventLogWriter(path, self.box_dims, self.g,\
+                self.t, arrs.m, arrs.radius, arrs.t0, arrs.r0, arrs.v0,\
+                buffer_size=buffer_size)
+        self.addObserver(self._recordEventToLog)
+        return self._event_log
+    
+    def stopEventLog(self) -> Optional[EventLogWriter]:
+        """
+        Stops recording to the event log (if any), writing any
+        remaining records and closing the file.
+        
+        Returns:
+        The closed EventLogWriter, or None if no event log was being
+        recorded.
+        """
+        event_log = self._event_log
+        if event_log is None: return None
+        self.removeObserver(self._recordEventToLog)
+        self._event_log = None
+        event_log.close()
+        return event_log
+    
+    def _recordEventToLog(self, event: CollisionEvent) -> None:
+        """
+        Observer (see the method addObserver()) recording each
+        collision to the event log, with the reference states of the
+        Ball objects involved immediately after the collision.
+        
+        Args:
+            Required positional:
+            event (CollisionEvent): The collision.
+        
+        Returns:
+        None
+        """
+        ball1 = self.balls[event.idx1]
+        if event.idx2 < 0:
+            self._event_log.record(event.t, event.idx1, -1, ball1._r0,\
+                    ball1._v0)
+            return
+        ball2 = self.balls[event.idx2]
+        self._event_log.record(event.t, event.idx1, event.idx2,\
+                ball1._r0, ball1._v0, ball2._r0, ball2._v0)
+        return
+    
+    def _checkpointState(self) -> dict:
+        """
+        Gives the state of the simulation recorded in its snapshots,
+        consisting of all of its attributes other than those in
+        _non_checkpoint_attrs, along with the current times of the
+        Ball objects whose time has been set to a value other than
+        the current time of the simulation.
+        
+        Returns:
+        Dictionary mapping the names of the attributes to their values,
+        with the Ball object times under the key "_ball_times" as a
+        dictionary mapping the indices of the Ball objects to their
+        times.
+        """
+        non_checkpoint_attrs = self._non_checkpoint_attrs
+        state = {attr: val for attr, val in self.__dict__.items()\
+                if attr not in non_checkpoint_attrs}
+        state["_ball_times"] = {ball._idx: ball._t\
+                for ball in self._t_set_balls}
+        return state
+    
+    def _restoreCheckpointState(self, state: dict) -> None:
+        """
+        Replaces the state of the simulation with that given by a
+        snapshot, recreating the Ball objects (as views of the rows of
+        the restored BallStateArrays) and kinematic functions. The
+        attributes not recorded in the snapshots are retained if
+        present.
+        
+        Args:
+            Required positional:
+            state (dict): The state of the simulation, as given by the
+                    method _checkpointState() (whose contents may be
+                    used by the simulation after this call).
+        
+        Returns:
+        None
+        """
+        ball_times = state.pop("_ball_times")
+        retained = {attr: getattr(self, attr, None)\
+                for attr in self._non_checkpoint_attrs}
+        self.__dict__.clear()
+        self.__dict__.update(state)
+        for attr in ("_stats", "_ledger", "_event_log", "_keyframes",\
+                "_keyframe_interval", "_keyframe_dir"):
+            setattr(self, attr, retained[attr])
+        self._observers = retained["_observers"] or ()
+        self._kernels = KinematicKernels(self.n_dims, self._g)
+        self._t_set_balls = set()
+        self.balls = [Ball._fromStateArraysRow(self, idx)\
+                for idx in range(len(self._ball_state_arrays))]
+        for idx, t in ball_times.items():
+            self.balls[idx].t = t
+        if self._ledger is not None:
+            self._ledger.reset()
+        return
+    
+    def checkpoint(self) -> bytes:
+        """
+        Creates a snapshot of the complete state of the simulation,
+        from which the simulation can be recreated (using the class
+        method fromCheckpoint()) or to which it can be returned (using
+        the method restoreCheckpoint()), after which it continues
+        exactly as it would have from the point the snapshot was
+        taken.
+        
+        As well as the parameters of the simulation, its current time
+        and the reference states of the Ball objects (including the
+        attribute ball_states), the snapshot contains the events
+        currently scheduled (the attributes balls_collision_heaps and
+        event_queue, along with the state of the broadphase), so that
+        these need not be recalculated when it is restored. The Ball
+        objects themselves are not included, as they are views of the
+        simulation's BallStateArrays and are recreated from it. Any
+        SimulationStats, event log or keyframes of the simulation are
+        also not included.
+        
+        The snapshot is a pickle, so should only be restored if it is
+        from a trusted source.
+        
+        Returns:
+        Bytes object (bytes) containing the snapshot.
+        """
+        state = self._checkpointState()
+        return pickle.dumps((self._checkpoint_format, state),\
+                protocol=pickle.HIGHEST_PROTOCOL)
+    
+    def saveCheckpoint(self, path: str) -> None:
+        """
+        Writes a snapshot of the complete state of the simulation (see
+        the documentation of the method checkpoint()) to a file, from
+        which the simulation can be recreated using the class method
+        loadCheckpoint().
+        
+        Args:
+            Required positional:
+            path (str): The path of the file to be written (which is
+                    overwritten if it exists).
+        
+        Returns:
+        None
+        """
+        data = self.checkpoint()
+        with open(path, "wb") as f:
+            f.write(data)
+        return
+    
+    @classmethod
+    def _checkpointStateFromBytes(cls, data: bytes) -> dict:
+        """
+        Extracts the state of a simulation from a snapshot created by
+        the method checkpoint(), checking its format.
+        
+        Args:
+            Required positional:
+            data (bytes): The snapshot.
+        
+        Returns:
+        Dictionary giving the state of the simulation (see the method
+        _checkpointState()).
+        """
+        try:
+            fmt, state = pickle.loads(data)
+        except (pickle.UnpicklingError, TypeError, ValueError):
+            raise ValueError("data is not a snapshot created by "\
+                    "checkpoint()")
+        if fmt != cls._checkpoint_format:
+            raise ValueError(f"Unsupported snapshot format {fmt!r}, "\
+                    f"expected {cls._checkpoint_format!r}")
+        return state
+    
+    @classmethod
+    def fromCheckpoint(cls, data: bytes) -> "MultiBallSimulation":
+        """
+        Creates a simulation from a snapshot created by the method
+        checkpoint(), which continues exactly as the simulation from
+        which the snapshot was taken would have from that point.
+        
+        Args:
+            Required positional:
+            data (bytes): The snapshot, which should only be from a
+                    trusted source (as it is a pickle).
+        
+        Returns:
+        The new MultiBallSimulation object.
+        """
+        state = cls._checkpointStateFromBytes(data)
+        sim = cls.__new__(cls)
+        sim._restoreCheckpointState(state)
+        return sim
+    
+    @classmethod
+    def loadCheckpoint(cls, path: str) -> "MultiBallSimulation":
+        """
+        Creates a simulation from a snapshot file written by the method
+        saveCheckpoint() (see the documentation of the class method
+        fromCheckpoint()).
+        
+        Args:
+            Required positional:
+            path (str): The path of the snapshot file, which should
+                    only be from a trusted source (as it is a pickle).
+        
+        Returns:
+        The new MultiBallSimulation object.
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        return cls.fromCheckpoint(data)
+    
+    def restoreCheckpoint(self, data: bytes) -> None:
+        """
+        Returns the simulation to the state recorded in a snapshot
+        created by the method checkpoint() (normally of this
+        simulation at an earlier or later time), after which it
+        continues exactly as the simulation from which the snapshot
+        was taken would have from that point.
+        
+        The Ball objects of the simulation are replaced by new Ball
+        objects, so any references to the previous Ball objects
+        should be replaced by the elements of the attribute balls.
+        Any SimulationStats, observers and keyframes of the simulation
+        are retained, and any ThermodynamicLedger is reset (see its
+        method reset()). This may not be used while an event log is being
+        recorded.
+        
+        Args:
+            Required positional:
+            data (bytes): The snapshot, which should only be from a
+                    trusted source (as it is a pickle).
+        
+        Returns:
+        None
+        """
+        if self._event_log is not None:
+            raise ValueError("A checkpoint may not be restored while "\
+                    "an event log is being recorded")
+        state = self._checkpointStateFromBytes(data)
+        if state["_box_dims"] != self._box_dims or\
+                state["_g"] != self._g:
+            raise ValueError("The snapshot is of a simulation with a "\
+                    "different box or gravitational field")
+        self._restoreCheckpointState(state)
+        return
+    
+    @property
+    def keyframe_times(self):
+        if self._keyframes is None: return None
+        return [t for t, _ in self._keyframes]
+    
+    def enableKeyframes(
+        self,
+        interval: Real,
+        directory: Optional[str]=None,
+    ) -> None:
+        """
+        Starts taking snapshots of the simulation (see the
+        documentation of the method checkpoint()) as keyframes, taking
+        one immediately and then one every time the simulation reaches
+        the time interval after the latest one, so that the method
+        seek() can return the simulation to any time from this point
+        onwards by restoring the latest keyframe at or before that time
+        and progressing the simulation from there. Any keyframes
+        previously taken are discarded.
+        
+        Args:
+            Required positional:
+            interval (strictly positive real numeric value): The
+                    interval (in terms of the simulation's time units)
+                    between keyframes.
+            
+            Optional named:
+            directory (str or None): If specified, the path of an
+                    existing directory to which each keyframe is
+                    written as a file (named keyframe_<n>.ckpt, where
+                    <n> is the number of keyframes taken before it),
+                    rather than kept in memory.
+                Default: None
+        
+        Returns:
+        None
+        """
+        if interval <= 0:
+            raise ValueError(f"interval must be strictly positive, got "\
+                    f"{interval!r}")
+        self._keyframes = []
+        self._keyframe_interval = interval
+        self._keyframe_dir = directory
+        self._addKeyframe()
+        return
+    
+    def disableKeyframes(self) -> None:
+        """
+        Stops taking keyframes (see the method enableKeyframes()) and
+        discards those taken (without deleting any files to which they
+        were written).
+        
+        Returns:
+        None
+        """
+        self._keyframes = None
+        self._keyframe_interval = None
+        self._keyframe_dir = None
+        return
+    
+    def _addKeyframe(self) -> None:
+        """
+        Takes a snapshot of the simulation at its current time and adds
+        it to the keyframes, writing it to a file if keyframes are
+        stored in a directory.
+        
+        Returns:
+        None
+        """
+        data = self.checkpoint()
+        if self._keyframe_dir is not None:
+            path = os.path.join(self._keyframe_dir,\
+                    f"keyframe_{len(self._keyframes):06d}.ckpt")
+            with open(path, "wb") as f:
+                f.write(data)
+            data = path
+        self._keyframes.append((self.t, data))
+        return
+    
+    def _nextKeyframeTime(self) -> Real:
+        """
+        Gives the time at which the next keyframe is due to be taken
+        (see the method enableKeyframes()), or inf if keyframes are
+        not enabled.
+        """
+        if self._keyframes is None: return float("inf")
+        return self._keyframes[-1][0] + self._keyframe_interval
+    
+    def _restoreKeyframe(self, i: int) -> None:
+        """
+        Returns the simulation to the state recorded in the keyframe
+        with index i (in order of time).
+        
+        Args:
+            Required positional:
+            i (int): The index of the keyframe.
+        
+        Returns:
+        None
+        """
+        data = self._keyframes[i][1]
+        if isinstance(data, str):
+            with open(data, "rb") as f:
+                data = f.read()
+        self.restoreCheckpoint(data)
+        return
+    
+    def seek(self, t: Real, check_overlap: bool=False) -> int:
+        """
+        Moves the simulation to time t, which may be earlier than its
+        current time. If keyframes are enabled (see the method
+        enableKeyframes()) and there is a keyframe at or before t
+        later than the current time of the simulation (or t is earlier
+        than the current time), the latest such keyframe is restored
+        (see the method restoreCheckpoint()) before progressing the
+        simulation to time t, so that only the events after that
+        keyframe are processed. Otherwise, the simulation is
+        progressed from its current time.
+        
+        In either case, the simulation is then in exactly the state it
+        would have been had it been progressed to time t directly from
+        the time keyframes were enabled. If a keyframe is restored, the
+        Ball objects of the simulation are replaced by new Ball objects
+        (see the method restoreCheckpoint()).
+        
+        Args:
+            Required positional:
+            t (real numeric value): The time (in terms of the
+                    simulation's time measure) to which the simulation
+                    is to be moved. If this is earlier than the current
+                    time of the simulation, it may not be earlier than
+                    the first keyframe.
+            
+            Optional named:
+            check_overlap (bool): If True then after the simulation has
+                    reached time t, checks whether any pair of objects
+                    overlap as for the method progressTime().
+                Default: False
+        
+        Returns:
+        Non-negative integer (int) representing the number of
+        collisions processed in progressing the simulation to time t
+        (from the restored keyframe, if any).
+        """
+        keyframes = self._keyframes if self._keyframes is not None\
+                else []
+        i = bisect.bisect_right(keyframes, t, key=operator.itemgetter(0))\
+                - 1
+        if t < self.t or (i >= 0 and keyframes[i][0] > self.t):
+            if i < 0:
+                raise ValueError(f"t ({t}) is earlier than both the "\
+                        f"current time of the simulation and its first "\
+                        f"keyframe")
+            self._restoreKeyframe(i)
+        return self._progressToTime(t, check_overlap=check_overlap)
+    
+    def heapStats(self) -> dict:
+        """
+        Gives the current sizes of the event queue and the per-ball
+        collision min-heaps (in the attributes event_queue and
+        balls_collision_heaps), along with the proportion of the entries
+        of each that are stale (i.e. involve a Ball object whose state
+        has changed since they were calculated, and so will be
+        discarded when they are reached). This requires examining
+        every entry, so takes time linear in their total size.
+        
+        Returns:
+        Dictionary with keys "event_queue_size",
+        "event_queue_stale_fraction", "balls_collision_heap_entries",
+        "balls_collision_heaps_stale_fraction" and
+        "max_balls_collision_heap_size". If the event structures
+        have not been initialised, all values are 0.
+        """
+        res = {"event_queue_size": 0, "event_queue_stale_fraction": 0.,\
+                "balls_collision_heap_entries": 0,\
+                "balls_collision_heaps_stale_fraction": 0.,\
+                "max_balls_collision_heap_size": 0}
+        if not hasattr(self, "event_queue"): return res
+        events = self.event_queue.events()
+        res["event_queue_size"] = len(events)
+        if events:
+            res["event_queue_stale_fraction"] = sum(\
+                    not self._isEventCurrent(event) for event in events)\
+                    / len(events)
+        states = self.ball_states
+        i_s1, i_idx2, i_s2 = self._bc_entry_fields
+        n_entries = 0
+        n_stale = 0
+        for idx1, heap in\
+                getattr(self, "balls_collision_heaps", {}).items():
+            n_entries += len(heap)
+            n_stale += sum(tup[i_s1] != states[idx1] or\
+                    tup[i_s2] != states[tup[i_idx2]] for tup in heap)
+            if len(heap) > res["max_balls_collision_heap_size"]:
+                res["max_balls_collision_heap_size"] = len(heap)
+        res["balls_collision_heap_entries"] = n_entries
+        if n_entries:
+            res["balls_collision_heaps_stale_fraction"] =\
+                    n_stale / n_entries
+        return res
+    
+    def addBall(
+        self,
+        m: Real,
+        radius: Real,
+        r0: Tuple[Real],
+        v0: Tuple[Real],
+        check_overlap: bool=True,
+        balls_t_updated: bool=False,
+    ) -> bool:
+        """
+        Adds a Ball object to the simulation at the current time,
+        representing a ball with mass in n-dimensional space (where
+        n is the number of spatial dimensions of the simulation)
+        which collides perfectly elastically with both walls and other
+        Ball objects.
+        If check_overlap given as True then before adding the Ball
+        checks that it does not overlap any other objects in the
+        simulation and is completely inside the box. If this check
+        is failed, then the Ball object is not added to the simulation.
+        
+        In the following:
+        - n represents the number of spatial dimensions of the
+            simulation (equal to the attribute n_dims)
+        - The current time of the simulation refers to the time
+            corresponding to the simulation's time measure having
+            a numerical value equal to the value of attribute t
+            at the point this method is called.
+        - Vectors are representeded using their components in the
+            simulation's orthonormal basis as an n-tuple of real
+            numeric values, with their units being the corresponding
+            unit of the simulation (e.g. the simulation's distance
+            units for position and displacement vectors, the
+            simulation's speed units- where one speed unit is equal to
+            one distance unit divided by one time unit- for velocity
+            vectors, etc.).
+        - The origin used for all position vectors is the spatial
+            origin of the simulation (as defined in the documentation
+            for MultiBallSimulation)
+        
+        Args:
+            Required positional:
+            m (strictly positive real numeric value): The mass of the
+                    object in terms of the simulation's mass units.
+            radius (strictly positive real numeric value): The radius
+                    of the new Ball object in terms of the simulation's
+                    mass units.
+            r0 (n-tuple of real numeric values): The position vector of
+                    the centre of the new Ball object at the current
+                    time.
+            v0 (n-tuple of real numeric values): The velocity vector of
+                    the centre of the new Ball object at the current
+                    time.
+            
+            Optional named:
+            
+            check_overlap (bool): If True then checks to ensure that
+                    the new Ball object being added would be completely
+                    within the box and would not overlap with any
+                    object previously added to the simulation. If
+                    this check is performed and either of those
+                    conditions is not satisfied, then the new Ball
+                    object is not added to the simulation.
+                    This should only be given as False in a situation
+                    where both of the conditions are guaranteed to
+                    be satisfied. Otherwise, the simulation may not
+                    function correctly.
+                Default: True
+            balls_t_updated (bool): If True and check_overlap is also
+                    True, when checking for overlaps between the new
+                    Ball object and any of the previously added Ball
+                    objects (contained in the attribute balls), it is
+                    assumed that all of those previously added Ball
+                    objects have the same attribute t as that of the
+                    simulation (i.e. have the same current time).
+                    Otherwise, this is not assumed, and (if
+                    check_overlap is True) the attribute t of those
+                    previously added Ball objects is progressed to
+                    match that of the simulation.
+                Default: False
+        
+        Returns:
+        Boolean (bool), True if the Ball object was added to the
+        simulation, False if not (which only occurs when check_overlap
+        is given as False and either the definition of the new Ball
+        object does not place it completely within the box or it
+        overlaps with an object previously added to the simulation).
+        """
+        if self._event_log is not None:
+            raise ValueError("Ball objects may not be added while an "\
+                    "event log is being recorded")
+        ball = Ball(self, m, radius, r0, v0, t0=self.t)
+        if check_overlap:
+            if not balls_t_updated:
+                self._updateBallsTime()
+            if ball.isOutsideBox() or\
+                    self._detectBallsOverlap(ball, start_idx=0):
+                #print("failed check")
+                self._ball_state_arrays.pop()
+                return False
+            #print("passed check")
+        self.balls.append(ball)
+        self.ball_states.append(0)
+        if self._ledger is not None:
+            self._ledger.addBalls()
+        # Any events already scheduled do not account for the new
+        # Ball object, so these are recalculated from scratch the
+        # next time the simulation is progressed.
+        if hasattr(self, "balls_collision_heaps"):
+            del self.balls_collision_heaps
+        return True
+    
+    def addBalls(
+        self,
+        m: Union[Real, np.ndarray],
+        radius: Union[Real, np.ndarray],
+        r0: np.ndarray,
+        v0: np.ndarray,
+        check_overlap: bool=True,
+        balls_t_updated: bool=False,
+    ) -> np.ndarray:
+        """
+        Adds a batch of Ball objects to the simulation at the current
+        time. This is equivalent to calling addBall() for each of the
+        new Ball objects in turn (so that if check_overlap is True,
+        a new Ball object is rejected if it is not completely inside
+        the box or if it overlaps with a previously added Ball object
+        or a Ball object earlier in the batch that was not itself
+        rejected), but the checks for the whole batch are performed
+        in a single vectorised pass (using findOverlappingPairs() in
+        the broadphase module), making this far faster for adding many
+        Ball objects.
+        
+        In the following, n represents the number of spatial
+        dimensions of the simulation (equal to the attribute n_dims) and
+        k the number of new Ball objects, with vectors represented
+        as for addBall().
+        
+        Args:
+            Required positional:
+            m (strictly positive real numeric value or 1D array-like of
+                    k such values): The masses of the new Ball objects
+                    in terms of the simulation's mass units. If given
+                    as a single value, every new Ball object has this
+                    mass.
+            radius (strictly positive real numeric value or 1D
+                    array-like of k such values): The radii of the new
+                    Ball objects in terms of the simulation's distance
+                    units. If given as a single value, every new Ball
+                    object has this radius.
+            r0 (2D array-like of real numeric values with k rows and
+                    n columns): The position vectors of the centres of
+                    the new Ball objects at the current time.
+            v0 (2D array-like of real numeric values with k rows and
+                    n columns): The velocity vectors of the centres of
+                    the new Ball objects at the current time.
+            
+            Optional named:
+            
+            check_overlap (bool): If True then checks to ensure that
+                    each new Ball object would be completely within
+                    the box and would not overlap with any object
+                    previously added to the simulation (including
+                    those earlier in this batch), as for addBall().
+                Default: True
+            balls_t_updated (bool): As for addBall().
+                Default: False
+        
+        Returns:
+        1D numpy array of k bools, with the element at a given index
+        being True if the new Ball object corresponding to that index
+        was added to the simulation and False if not. The Ball objects
+        added are appended to the attribute balls in the order given.
+        """
+        if self._event_log is not None:
+            raise ValueError("Ball objects may not be added while an "\
+                    "event log is being recorded")
+        r0 = np.asarray(r0, dtype=float).reshape(-1, self.n_dims)
+        n_new = len(r0)
+        v0 = np.asarray(v0, dtype=float).reshape(n_new, self.n_dims)
+        m = np.broadcast_to(np.asarray(m, dtype=float), (n_new,))
+        radius = np.broadcast_to(np.asarray(radius, dtype=float),\
+                (n_new,))
+        accepted = np.ones(n_new, dtype=bool)
+        if check_overlap and n_new:
+            if not balls_t_updated:
+                self._updateBallsTime()
+            # Containment within the box
+            rad_col = radius[:, np.newaxis]
+            accepted = ~((rad_col > r0) |\
+                    (np.asarray(self.box_dims, dtype=float) - rad_col <\
+                    r0)).any(axis=1)
+            # Overlaps, with the new Ball objects that are inside the
+            # box placed after the existing Ball objects in their
+            # original order
+            arrs = self._ball_state_arrays
+            n_old = len(self.balls)
+            new_inds = np.flatnonzero(accepted)
+            idx1_arr, idx2_arr, _, _ = findOverlappingPairs(\
+                    np.concatenate([arrs.positionsAtTime(self.t, self.g),\
+                    r0[new_inds]]), np.concatenate([arrs.radius,\
+                    radius[new_inds]]))
+            new_pairs = idx2_arr >= n_old
+            idx1_arr, idx2_arr = idx1_arr[new_pairs], idx2_arr[new_pairs]
+            old_pairs = idx1_arr < n_old
+            accepted[new_inds[idx2_arr[old_pairs] - n_old]] = False
+            # Overlaps within the batch are resolved greedily in the
+            # order given, with a Ball object rejected only if it
+            # overlaps with an earlier one that has been accepted.
+            # As pairs are processed in order of the later Ball object,
+            # whether the earlier Ball object is accepted has already
+            # been decided.
+            idx1_arr = new_inds[idx1_arr[~old_pairs] - n_old]
+            idx2_arr = new_inds[idx2_arr[~old_pairs] - n_old]
+            order = np.argsort(idx2_arr, kind="stable")
+            for idx1, idx2 in zip(idx1_arr[order].tolist(),\
+                    idx2_arr[order].tolist()):
+                if accepted[idx1]: accepted[idx2] = False
+        n_old = len(self.balls)
+        for idx in np.flatnonzero(accepted).tolist():
+            ball = Ball(self, m[idx].item(), radius[idx].item(),\
+                    tuple(r0[idx].tolist()), tuple(v0[idx].tolist()),\
+                    t0=self.t, wall_times=False)
+            self.balls.append(ball)
+            self.ball_states.append(0)
+        self._ball_state_arrays.calculateWallTimes(\
+                self.box_interior_ranges, self.g,\
+                idx_arr=np.arange(n_old, len(self.balls)))
+        if self._ledger is not None:
+            self._ledger.addBalls()
+        if hasattr(self, "balls_collision_heaps"):
+            del self.balls_collision_heaps
+        return accepted
+    
+    def _ballsCollisionHeapEntry(
+        self,
+        idx1: int,
+        idx2: int,
+    ) -> Tuple[Union[Real, Tuple[Real]]]:
+        """
+        Finds the next time (if any) two specific Ball objects in the
+        simulation are due to collide with each other and provides
+        details of this projected collision in a format that can
+        be inserted directly into the appropriate min-heap in the
+        attribute balls_collision_heaps.
+        
+        In the following:
+        - n represents the number of spatial dimensions of the
+            simulation (equal to the attribute n_dims)
+        - Vectors are represented using their components in the
+            simulation's orthonormal basis as an n-tuple of real
+            numeric values, with their units being the corresponding
+            unit of the simulation (e.g. the simulation's distance
+            units for position and displacement vectors, the
+            simulation's speed units- where one speed unit is equal to
+            one distance unit divided by one time unit- for velocity
+            vectors, etc.).
+        
+        Args:
+            Required positional:
+            idx1 (int): Non-negative integer giving the index in
+                    attribute balls for one of the pair of Ball
+                    objects being examined. This is also the index
+                    in the attribute balls_collision_heaps into
+                    which the output of this method is intended
+                    to be inserted
+            idx2 (int): Non-negative integer giving the index in
+                    attribute balls of the other of the pair of
+                    Ball objects being examined.
         
         Returns:
         Tuple, which:
@@ -1423,19 +3033,138 @@ class MultiBallSimulation(object):
               the current state of the Ball object with index idx2
               respectively.
            This tuple is designed to be added directly to the min-heap
-           at index idx1 of the attribute balls_collision_heaps.
+           at index idx1 of the attribute balls_collision_heaps. If
+           the attribute compact_events is True, this is instead the
+           4-tuple described in the documentation of that attribute.
         - Otherwise, is an empty tuple.
         
         """
         ball1, ball2 = self.balls[idx1], self.balls[idx2]
         ans = ball1.identifyOtherBallNextCollision(ball2)
-        if ball1.t > self._t_ref:
-            print(f"collision of balls {idx1} and {idx2}: {ans}")
+        stats = self._stats
+        if stats is not None:
+            stats.pair_predictions += 1
+            stats.pair_rejections += not ans
         if not ans: return ()
         t2, contact_displ_vec, v1_zmf = ans
+        if self._compact_events:
+            return (t2, idx2, self.ball_states[idx1],\
+                    self.ball_states[idx2])
         return (t2, contact_displ_vec, idx1, self.ball_states[idx1],\
                 v1_zmf, idx2, self.ball_states[idx2])
     
+    def _ballsCollisionHeapEntries(
+        self,
+        idx1: int,
+        idx2_arr: np.ndarray,
+    ) -> List[Tuple[Union[Real, Tuple[Real]]]]:
+        """
+        Vectorised version of _ballsCollisionHeapEntry() which finds
+        the next time (if any) a specific Ball object in the simulation
+        is due to collide with each of a collection of other Ball
+        objects in the simulation, using the method
+        identifyOtherBallsNextCollisions() of that Ball object (or for
+        at most _few_pairs_max other Ball objects, its method
+        identifyFewOtherBallsNextCollisions()).
+        
+        Args:
+            Required positional:
+            idx1 (int): Non-negative integer giving the index in
+                    attribute balls for the Ball object being examined.
+                    This is also the index in the attribute
+                    balls_collision_heaps into which the output of this
+                    method is intended to be inserted.
+            idx2_arr (1D array-like of ints): The indices in attribute
+                    balls of the other Ball objects with which
+                    collisions are to be identified, not including
+                    idx1.
+        
+        Returns:
+        List of tuples with the same structure as the non-empty
+        outputs of _ballsCollisionHeapEntry(), one for each of the other
+        Ball objects with which the Ball object with index idx1 is
+        currently on course to collide (in the same order as they
+        appear in idx2_arr).
+        """
+        if not len(idx2_arr): return []
+        stats = self._stats
+        if stats is not None:
+            t0 = stats.clock()
+            n_pairs = len(idx2_arr)
+        states = self.ball_states
+        state1 = states[idx1]
+        if len(idx2_arr) <= self._few_pairs_max:
+            ans = self.balls[idx1].identifyFewOtherBallsNextCollisions(\
+                    idx2_arr)
+            if stats is not None:
+                stats.pair_predictions += n_pairs
+                stats.pair_rejections += n_pairs - len(ans)
+                stats.addTime("prediction", stats.clock() - t0)
+            if self._compact_events:
+                return [(t2, idx2, state1, states[idx2])\
+                        for idx2, t2, _, _ in ans]
+            return [(t2, contact_displ_vec, idx1, state1, v1_zmf, idx2,\
+                    states[idx2]) for idx2, t2, contact_displ_vec, v1_zmf\
+                    in ans]
+        idx2_arr, t2_arr, contact_displ_vecs, v1_zmfs =\
+                self.balls[idx1].identifyOtherBallsNextCollisions(idx2_arr)
+        if stats is not None:
+            stats.pair_predictions += n_pairs
+            stats.pair_rejections += n_pairs - len(idx2_arr)
+            stats.addTime("prediction", stats.clock() - t0)
+        if self._compact_events:
+            return [(t2, idx2, state1, states[idx2]) for idx2, t2 in\
+                    zip(idx2_arr.tolist(), t2_arr.tolist())]
+        return [(t2, tuple(contact_displ_vec), idx1, state1,\
+                tuple(v1_zmf), idx2, states[idx2])\
+                for idx2, t2, contact_displ_vec, v1_zmf in\
+                zip(idx2_arr.tolist(), t2_arr.tolist(),\
+                contact_displ_vecs.tolist(), v1_zmfs.tolist())]
+    
+    def _storeBallsCollisionHeap(
+        self,
+        idx: int,
+        heap: List[Tuple[Union[Real, Tuple[Real]]]],
+    ) -> Optional[Real]:
+        """
+        Arranges a list of projected collisions for the Ball object at
+        index idx of the attribute balls (as given by
+        _ballsCollisionHeapEntries()) into a min-heap and stores it at
+        index idx of the attribute balls_collision_heaps, replacing
+        any min-heap previously stored there (or if the list is empty,
+        removing it).
+        
+        If the attribute compact_events is True and the list contains
+        more than max_predictions entries, only the soonest
+        max_predictions of these are stored.
+        
+        Args:
+            Required positional:
+            idx (int): Non-negative integer giving the index in the
+                    attribute balls_collision_heaps at which the
+                    min-heap is to be stored.
+            heap (list of tuples): The projected collisions to be
+                    stored, in the format of the entries of
+                    balls_collision_heaps. This list may be modified.
+        
+        Returns:
+        If any projected collisions were omitted, a real numeric value
+        giving the time of the latest of the stored projected
+        collisions, by which the projected collisions of the Ball
+        object must be recalculated. Otherwise, None.
+        """
+        if not heap:
+            self.balls_collision_heaps.pop(idx, None)
+            return None
+        res = None
+        if self._compact_events and len(heap) > self._max_predictions:
+            # A sorted list is a valid min-heap
+            heap = heapq.nsmallest(self._max_predictions, heap)
+            res = heap[-1][0]
+        else: heapq.heapify(heap)
+        self.balls_collision_heaps[idx] = heap
+        return res
+    
     def _initialiseBallsCollisionHeaps(self) -> None:
         """
         Completely sets (or resets) the attribute balls_collision_heaps
@@ -1445,17 +3174,22 @@ class MultiBallSimulation(object):
         Returns:
         None
         """
-        res = {}
+        if self._broadphase_name is not None:
+            self._broadphase = self.broadphase_options[\
+                    self._broadphase_name](self,\
+                    min_cell_width=self._cell_width)
+        self.balls_collision_heaps = {}
+        self._repredict_times = {}
         n_balls = len(self.balls)
         for idx1 in range(n_balls):
-            heap = []
-            for idx2 in range(idx1 + 1, n_balls):
-                ans = self._ballsCollisionHeapEntry(idx1, idx2)
-                if ans: heap.append(ans)
-            if heap:
-                heapq.heapify(heap)
-                res[idx1] = heap
-        self.balls_collision_heaps = res
+            idx2_arr = np.arange(idx1 + 1, n_balls)\
+                    if self._broadphase is None else\
+                    [idx2 for idx2 in self._broadphase.candidates(idx1)\
+                    if idx2 > idx1]
+            t_repredict = self._storeBallsCollisionHeap(idx1,\
+                    self._ballsCollisionHeapEntries(idx1, idx2_arr))
+            if t_repredict is not None:
+                self._repredict_times[idx1] = t_repredict
         return
     
     def _resetBallsCollisionHeap(
@@ -1502,36 +3236,34 @@ class MultiBallSimulation(object):
                     against this causing errors in the simulation if
                     the physics model is changed.
         
+        If the attribute compact_events is True and not all of the
+        projected collisions found are stored (see
+        _storeBallsCollisionHeap()), an event at which they are to be
+        recalculated is inserted into the attribute event_queue.
+        
         Returns:
         Boolean (bool), giving True if the reset min-heap is non-empty,
         otherwise False.
         """
-        heap = []
-        ball1 = self.balls[idx]
-        if ball1.t > self._t_ref:
-            print(f"resetting ball {idx} collision heap")
-        excl_sorted = sorted(excl.union({idx}))
-        rngs = []
-        prev = 0
-        for curr in excl_sorted:
-            if curr == prev:
-                continue
-            rngs.append(range(prev, curr))
-            prev = curr + 1
-        n_balls = len(self.balls)
-        if prev != n_balls:
-            rngs.append(range(prev, n_balls))
-        for idx2 in itertools.chain(*rngs):
-            if idx2 in excl: continue
-            if ball1.t > self._t_ref:
-                print(idx2)
-            ans = self._ballsCollisionHeapEntry(idx, idx2)
-            if ans: heap.append(ans)
-        if heap:
-            heapq.heapify(heap)
-            self.balls_collision_heaps[idx] = heap
-            return True
-        return False
+        if self._broadphase is not None:
+            idx2_arr = [idx2 for idx2 in self._broadphase.candidates(idx)\
+                    if idx2 not in excl]
+        else:
+            incl = np.ones(len(self.balls), dtype=bool)
+            incl[idx] = False
+            incl[list(excl)] = False
+            idx2_arr = np.flatnonzero(incl)
+        heap = self._ballsCollisionHeapEntries(idx, idx2_arr)
+        stats = self._stats
+        if stats is not None:
+            stats.heap_resets += 1
+            if len(heap) > stats.peak_balls_collision_heap_size:
+                stats.peak_balls_collision_heap_size = len(heap)
+        t_repredict = self._storeBallsCollisionHeap(idx, heap)
+        if t_repredict is not None:
+            self.event_queue.push((t_repredict, REPREDICT_EVENT, idx,\
+                    self.ball_states[idx], -1, -1))
+        return bool(heap)
     
     def _updateBallsCollisionHeap(
         self,
@@ -1566,293 +3298,325 @@ class MultiBallSimulation(object):
         collision that is still on course to occur), otherwise False.
         """
         bc_heap = self.balls_collision_heaps.get(idx, [])
+        i_s1, i_idx2, i_s2 = self._bc_entry_fields
         while bc_heap:
             tup = bc_heap[0]
             if tup[0] > t_max: return ()
-            idx2 = tup[5]
-            if tup[3] == self.ball_states[idx] and\
-                    tup[6] == self.ball_states[idx2]:
+            idx2 = tup[i_idx2]
+            if tup[i_s1] == self.ball_states[idx] and\
+                    tup[i_s2] == self.ball_states[idx2]:
                 return True#(tup[0], idx2)
             heapq.heappop(bc_heap)
+            if self._stats is not None:
+                self._stats.stale_heap_entries_popped += 1
         return False#()
     
-    def _constructGlobalBallsCollisionHeap(
-        self,
-        t_max: Real,
-    ) -> List[Tuple[Real]]:
-        """
-        Constructs a min-heap containing the details of the earliest
-        collision(s) (if any) each Ball object in the simulation is
-        currently on course to have with any other Ball object provided
-        that this collision is projected to occur no later than the
-        time represented by t_max.
-        The min-heap is arranged based on the time the corresponding
-        collision is due to occur, so that the top of the heap (at
-        index 0 in the heap, as represented by a list) has the
-        smallest (or joint smallest) time for the corresponding
-        collision out of all entries in the heap.
-        
-        Note that this min-heap is guaranteed to contain the earliest
-        collision each Ball object in the simulation is on course
-        to be involved in (provided it is projected to occur no later
-        than t_max), but due to the mechanism this heap is updated
-        and interacts with the rest of the simulation, it may also
-        contain details of projected collisions where for neither of
-        the Ball objects involved is that collision their first.
-        
-        Further note that care has been taken to ensure that each
-        projected collision is only included once and in particular,
-        the min-heap constructed will not contain the same entry twice
-        with the details of the two Balls involved swapping positions
-        (which could give rise to significant issues for the
-        simulation)
+    def _ballsCollisionEvent(self, idx: int) -> Tuple[Real]:
+        """
+        Gives the event (in the format used by the attribute
+        event_queue) representing the collision at the top of the
+        min-heap at index idx of the attribute balls_collision_heaps.
         
         Args:
             Required positional:
-            t_max (real numeric value): The time (in terms of the
-                    simulation's time measure) such that collisions
-                    projected to occur after this time are not inserted
-                    into the min-heap.
-        
-        Returns:
-        List arranged as a min-heap by the heapq package. Each item
-        in the list is a 5-tuple representing a collision between
-        two Ball objects that is currently on course to happen, where:
-        - Index 0 contains a real numeric value giving the time the
-           projected collision is currently due to occur (in terms of
-           the simulation's time measure)
-        - Indices 1 and 2 contain non-negative integers giving the
-           index in the attribute balls corresponding to one of the
-           Ball objects involved in the collision (and the one whose
-           min-heap in balls_collision_heaps contains the full details
-           of the collision) and the current state of that Ball object
-           (i.e. the total number of collisions that Ball object has
-           previously experienced over the course of the simulation at
-           the current time, as recorded in the attribute ball_states)
-           respectively
-        - Indices 3 and 4 similarly contain non-negative integers
-           giving the index in the attribute balls corresponding to the
-           other Ball object involved in the collision and the current
-           state of that Ball object respectively
-        The min-heap is arranged based on the times of the projected
-        collisions (with the smallest and so soonest time at the top,
-        of the heap, or equivalently at index 0 of the heap).
+            idx (int): Non-negative integer giving the index in the
+                    attribute balls_collision_heaps of the min-heap in
+                    question, which must be non-empty.
+        
+        Returns:
+        6-tuple representing the event (see the documentation of the
+        attribute event_queue).
         """
-        if not hasattr(self, "balls_collision_heaps"):
-            self._initialiseBallsCollisionHeaps()
+        tup = self.balls_collision_heaps[idx][0]
+        if self._compact_events:
+            return (tup[0], BALLS_COLLISION_EVENT, idx, tup[2], tup[1],\
+                    tup[3])
+        return (tup[0], BALLS_COLLISION_EVENT, tup[2], tup[3], tup[5],\
+                tup[6])
+    
+    def _cancelBallEvents(self, idx: int) -> None:
+        """
+        If the attribute event_queue supports it, removes from it every
+        event involving the Ball object at index idx of the attribute
+        balls, which is assumed to have just changed state. Where a
+        removed event was a collision at the top of the min-heap in
+        balls_collision_heaps of another Ball object, the next
+        projected collision of that min-heap still on course to occur
+        (if any) is inserted into the queue in its place.
         
-        heap = []
-        for idx1 in list(self.balls_collision_heaps.keys()):
-            if self._updateBallsCollisionHeap(idx1, t_max):
-                tup = self.balls_collision_heaps[idx1][0]
-                t, idx2 = tup[0], tup[5]
-                heap.append((t, idx1, self.ball_states[idx1],\
-                        idx2, self.ball_states[idx2]))
-            elif not self.balls_collision_heaps[idx1]:
-                self.balls_collision_heaps.pop(idx1)
-        heapq.heapify(heap)
-        return heap
+        Args:
+            Required positional:
+            idx (int): Non-negative integer giving the index in the
+                    attribute balls of the Ball object in question.
+        
+        Returns:
+        None
+        """
+        queue = self.event_queue
+        if not queue.supports_cancellation: return
+        cancelled = queue.cancelBall(idx)
+        if self._stats is not None:
+            self._stats.cancelled_events += len(cancelled)
+        for event in cancelled:
+            idx1 = event[2]
+            if event[1] != BALLS_COLLISION_EVENT or idx1 == idx:
+                continue
+            if self._updateBallsCollisionHeap(idx1, float("inf")):
+                queue.push(self._ballsCollisionEvent(idx1))
+            else: self.balls_collision_heaps.pop(idx1, None)
+        return
     
-    def _constructGlobalWallCollisionHeap(
-        self,
-        t_max: Real,
-    ) -> List[Tuple[Real]]:
-        """
-        Constructs a min-heap containing the details of the earliest
-        collision (if any) each Ball object in the simulation is
-        currently on course to have with a wall, provided that this
-        collision is projected to occur no later than the time
-        represented by t_max.
-        The min-heap is arranged based on the time the corresponding
-        collision is due to occur, so that the top of the heap (at
-        index 0 in the heap, as represented by a list) has the
-        smallest (or joint smallest) time for the corresponding
-        collision out of all entries in the heap.
+    def _pushWallCollisionEvent(self, idx: int) -> None:
+        """
+        Inserts the next collision with a wall (if any) of the Ball
+        object at index idx of the attribute balls into the attribute
+        event_queue.
         
         Args:
             Required positional:
-            t_max (real numeric value): The time (in terms of the
-                    simulation's time measure) such that collisions
-                    projected to occur after this time are not inserted
-                    into the min-heap.
-        
-        Returns:
-        List arranged as a min-heap by the heapq package. Each item
-        in the list is a 3-tuple representing a collision between
-        Ball object and a wall that is currently on course to happen,
-        where:
-        - Index 0 contains a real numeric value giving the time the
-           projected collision is currently due to occur (in terms of
-           the simulation's time measure)
-        - Index 1 contains a non-negative integer giving the index in
-           the attribute balls corresponding to the Ball object
-           involved in the projected collision
-        - Index 2 contains a non-negative integer giving the current
-           state of the Ball object (i.e. the total number of
-           collisions that Ball object has previously experienced
-           over the course of the simulation at the current time, as
-           recorded in the attribute ball_states)
-        The min-heap is arranged based on the times of the projected
-        collisions (with the smallest and so soonest time at the top,
-        of the heap, or equivalently at index 0 of the heap).
-        """
-        heap = []
-        for i, ball in enumerate(self.balls):
-            nw_heap = ball.next_wall_heap
-            if not nw_heap: continue
-            t, dim_idx = nw_heap[0]
-            if t > t_max: continue
-            heap.append((t, i, self.ball_states[i]))
-        heapq.heapify(heap)
-        return heap
+            idx (int): Non-negative integer giving the index in the
+                    attribute balls of the Ball object in question.
+        
+        Returns:
+        None
+        """
+        t_wall = self._ball_state_arrays._t_wall_arr.item(idx)
+        if t_wall != float("inf"):
+            self.event_queue.push((t_wall, WALL_COLLISION_EVENT, idx,\
+                    self.ball_states[idx], -1, -1))
+        return
     
-    def _updateGlobalBallsCollisionHeap(
-        self,
-        gc_heap: List[Tuple[Real]],
-        t_max: Real,
-    ) -> bool:
+    def _pushCellCrossingEvent(self, idx: int) -> None:
         """
-        Updates the min-heap gc_heap (used to identify the next
-        collision between any pair of Ball objects in the simulation
-        currently on course to occur) by repeatedly removing the item
-        at the top of the heap as long as it no longer represents a
-        collision that is on course to occur (due to the trajectory
-        of either of the corresponding Ball objects having changed
-        since that item was added to the min-heap), replacing the
-        removed item in the min-heap if and as appropriate.
+        If the simulation uses a broadphase, inserts the next cell
+        crossing (if any) of the Ball object at index idx of the
+        attribute balls (i.e. the next time its centre is due to move
+        from one cell of the broadphase grid to another or, for
+        SweepAndPrune, to leave its anchor) into the attribute
+        event_queue.
         
         Args:
-            gc_heap (list of 5-tuples arranged as a min-heap by the
-                    heapq package): Min-heap storing details of
-                    collisions between pairs of Ball objects currently
-                    on course to occur in the simulation no later than
-                    the time t_max, with the min-heap organised based
-                    on the projected times of the corresponding
-                    collisions (with a collision projected to occur
-                    the soonest or joint soonest at the top of the
-                    heap).
-                    This min-heap should have been constructed using
-                    the method _constructGlobalBallsCollisionHeap().
-                    See the documentation of the former of this method
-                    for more details regarding the construction of the
-                    min-heap.
-            t_max (real numeric value): The time (in terms of the
-                    simulation's time measure) such that if and when
-                    the item at the top of the min-heap has a time
-                    exceeds this, it is not removed (even if it
-                    no longer represents a collision that is on
-                    course to occur).
+            Required positional:
+            idx (int): Non-negative integer giving the index in the
+                    attribute balls of the Ball object in question.
         
         Returns:
-        Boolean (bool), giving True if after being updated the min-heap
-        gc_heap is non-empty and the item at the top of the heap has a
-        time no greater than that represented by t_max (and so
-        represents a collision that is still on course to occur),
-        otherwise False.
+        None
         """
-        if t_max > self._t_ref:
-            print(f"Finding next ball collision")
-        while gc_heap:
-            t, idx1, state1, idx2, state2 = gc_heap[0]
-            if self.ball_states[idx1] == state1 and\
-                    self.ball_states[idx2] == state2:
-                return True
-            bc_heap = self.balls_collision_heaps.get(idx1, [])
-            if not bc_heap or bc_heap[0][2] != idx1 or\
-                    bc_heap[0][3] != state1 or\
-                    bc_heap[0][5] != idx2 or\
-                    bc_heap[0][6] != state2:
-                heapq.heappop(gc_heap)
-                continue
-            
-            if t_max > self._t_ref:
-                print(f"Soonest gc_heap entry at t = {t}, "\
-                        f"idx1 = {idx1}")
-                print(f"Soonest bc_heap entry for ball {idx1} = "\
-                        f"{bc_heap[0]}")
-                print(f"ball states = {self.ball_states}")
-            idx2 = bc_heap[0][5]
-            if len(bc_heap) == 1:
-                self.balls_collision_heaps.pop(idx1)
-                heapq.heappop(gc_heap)
-                continue
-            heapq.heappop(bc_heap)
-            if self._updateBallsCollisionHeap(idx1, t_max):
-                t, idx2 = bc_heap[0][0], bc_heap[0][5]
-                heapq.heappushpop(gc_heap,\
-                        (t, idx1, self.ball_states[idx1],\
-                        idx2, self.ball_states[idx2]))
-            else: heapq.heappop(gc_heap)
-                
-        return False
+        if self._broadphase is None: return
+        crossing = self._broadphase.next_crossings[idx]
+        if crossing:
+            self.event_queue.push((crossing[0], CELL_CROSSING_EVENT,\
+                    idx, self.ball_states[idx], -1, -1))
+        return
     
-    def _updateGlobalWallCollisionHeap(
-        self,
-        gnw_heap: List[Tuple[Real]],
-    ) -> bool:
+    def _initialiseEventQueue(self) -> None:
+        """
+        Completely sets (or resets) the attribute event_queue based on
+        the attribute balls_collision_heaps and the next collision
+        with a wall (and if applicable cell crossing) of each Ball
+        object in the simulation.
+        
+        For each Ball object, the event queue receives the collision at
+        the top of the corresponding min-heap in balls_collision_heaps
+        (if any), which is guaranteed to be the earliest of the
+        projected collisions stored in that min-heap. Care has been
+        taken to ensure that each projected collision is only included
+        once and in particular, the queue will not contain the same
+        collision twice with the details of the two Ball objects
+        involved swapping positions (which could give rise to
+        significant issues for the simulation).
+        
+        Returns:
+        None
+        """
+        if not hasattr(self, "balls_collision_heaps"):
+            self._initialiseBallsCollisionHeaps()
+        
+        events = []
+        for idx1 in list(self.balls_collision_heaps.keys()):
+            if self._updateBallsCollisionHeap(idx1, float("inf")):
+                events.append(self._ballsCollisionEvent(idx1))
+            else: self.balls_collision_heaps.pop(idx1)
+        t_wall = self._ball_state_arrays.t_wall
+        wall_inds = np.flatnonzero(t_wall != np.inf)
+        events.extend((t, WALL_COLLISION_EVENT, idx, self.ball_states[idx],\
+                -1, -1) for idx, t in\
+                zip(wall_inds.tolist(), t_wall[wall_inds].tolist()))
+        if self._broadphase is not None:
+            for idx, crossing in\
+                    enumerate(self._broadphase.next_crossings):
+                if not crossing: continue
+                events.append((crossing[0], CELL_CROSSING_EVENT, idx,\
+                        self.ball_states[idx], -1, -1))
+        for idx, t_repredict in self._repredict_times.items():
+            events.append((t_repredict, REPREDICT_EVENT, idx,\
+                    self.ball_states[idx], -1, -1))
+        self._repredict_times = {}
+        self.event_queue =\
+                self.event_queue_options[self._event_queue_type](events)
+        self._compact_event_queue_size = 2 * len(self.event_queue) + 64
+        return
+    
+    def _ensureEventQueue(self) -> None:
+        """
+        Initialises the event queue (see the method
+        _initialiseEventQueue()) if this has not yet been done.
+        
+        Returns:
+        None
+        """
+        if hasattr(self, "balls_collision_heaps"): return
+        stats = self._stats
+        if stats is not None: t0 = stats.clock()
+        self._initialiseEventQueue()
+        if stats is not None:
+            stats.addTime("init", stats.clock() - t0)
+        return
+    
+    def _isEventCurrent(self, event: Tuple[Real]) -> bool:
         """
-        Updates the min-heap gnw_heap (used to identify the next
-        collision between a Ball object in the simulation and a wall
-        currently on course to occur) by repeatedly removing the item
-        at the top of the heap as long as it no longer represents a
-        collision that is on course to occur (due to the trajectory of
-        the corresponding Ball object having changed since that item
-        was added to the min-heap).
+        Checks whether the Ball objects involved in an event have not
+        changed state since that event was scheduled.
         
         Args:
             Required positional:
-            gnw_heap (list of 3-tuples arranged as a min-heap by the
-                    heapq package): Min-heap storing details of
-                    collisions between a Ball object and a wall
-                    currently on course to occur in the simulation no
-                    later than the time t_max, with the min-heap
-                    organised based on the projected times of the
-                    corresponding collisions (with a collision
-                    projected to occur the soonest or joint soonest at
-                    the top of the heap).
-                    This min-heap should have been constructed using
-                    the method _constructGlobalWallCollisionHeap(). See
-                    the documentation of of this method for more
-                    details regarding the construction of the min-heap.
+            event (6-tuple): The event in question, in the format used
+                    by the attribute event_queue.
         
         Returns:
-        Boolean (bool), giving True if after being updated the min-heap
-        gnw_heap is non-empty (and so the item at the top of the heap
-        represents a collision that is still on course to occur),
+        Boolean (bool) giving True if every Ball object involved in the
+        event has the same state as when the event was scheduled,
         otherwise False.
         """
-        while gnw_heap:
-            t, i, state = gnw_heap[0]
-            if state == self.ball_states[i]:
-                return True
-            heapq.heappop(gnw_heap)
-        return False
+        if self.ball_states[event[2]] != event[3]: return False
+        return event[4] < 0 or self.ball_states[event[4]] == event[5]
+    
+    def _compactEventQueue(self) -> None:
+        """
+        Removes from the attribute event_queue all events for which
+        at least one of the Ball objects involved has changed state
+        since the event was scheduled (and so no longer represent an
+        event that is on course to occur).
+        
+        As such events are otherwise only discarded when they reach the
+        front of the queue, this prevents the queue from growing
+        without limit over long simulations.
+        
+        Collisions between Ball objects are all removed and then
+        reinserted from the tops of the min-heaps in the attribute
+        balls_collision_heaps (after discarding projected collisions
+        that are no longer on course to occur from those tops), since
+        the removal of a collision whose details are at the top of one
+        of those min-heaps would otherwise prevent the collisions below
+        it from ever being inserted. The projected collisions that are
+        no longer on course to occur are also removed from the rest of
+        each of those min-heaps.
+        
+        Returns:
+        None
+        """
+        events = [event for event in self.event_queue.events() if\
+                event[1] != BALLS_COLLISION_EVENT and\
+                self._isEventCurrent(event)]
+        states = self.ball_states
+        i_s1, i_idx2, i_s2 = self._bc_entry_fields
+        for idx1, bc_heap in list(self.balls_collision_heaps.items()):
+            state1 = states[idx1]
+            bc_heap[:] = [tup for tup in bc_heap if tup[i_s1] == state1\
+                    and tup[i_s2] == states[tup[i_idx2]]]
+            if not bc_heap:
+                self.balls_collision_heaps.pop(idx1)
+                continue
+            heapq.heapify(bc_heap)
+            events.append(self._ballsCollisionEvent(idx1))
+        if self._stats is not None:
+            self._stats.compactions += 1
+            self._stats.compacted_events_removed +=\
+                    len(self.event_queue) - len(events)
+        self.event_queue.rebuild(events)
+        self._compact_event_queue_size =\
+                2 * len(self.event_queue) + 64
+        return
+    
+    def _nextEvent(self) -> Optional[Tuple[Real]]:
+        """
+        Updates the attribute event_queue by repeatedly removing the
+        event at the front of the queue as long as it no longer
+        represents an event that is on course to occur (due to the
+        trajectory of any of the Ball objects involved having changed
+        since it was scheduled), replacing the removed event in the
+        queue if and as appropriate, and gives the event at the front
+        of the queue after this update (without removing it from the
+        queue).
+        
+        Returns:
+        If the updated event_queue is non-empty, a 6-tuple giving the
+        event at its front (which is guaranteed to be on course to
+        occur and to be the soonest such event in the simulation).
+        Otherwise, None.
+        """
+        queue = self.event_queue
+        stats = self._stats
+        if stats is not None and\
+                len(queue) > stats.peak_event_queue_size:
+            stats.peak_event_queue_size = len(queue)
+        if len(queue) > self._compact_event_queue_size:
+            self._compactEventQueue()
+        while queue:
+            event = queue.peek()
+            if self._isEventCurrent(event):
+                return event
+            if stats is not None:
+                stats.stale_events_popped += 1
+            if event[1] != BALLS_COLLISION_EVENT:
+                queue.pop()
+                continue
+            t, _, idx1, state1, idx2, state2 = event
+            bc_heap = self.balls_collision_heaps.get(idx1, [])
+            i_s1, i_idx2, i_s2 = self._bc_entry_fields
+            if not bc_heap or bc_heap[0][0] != t or\
+                    bc_heap[0][i_s1] != state1 or\
+                    bc_heap[0][i_idx2] != idx2 or\
+                    bc_heap[0][i_s2] != state2:
+                queue.pop()
+                continue
+            
+            if len(bc_heap) == 1:
+                self.balls_collision_heaps.pop(idx1)
+                queue.pop()
+                continue
+            heapq.heappop(bc_heap)
+            if self._updateBallsCollisionHeap(idx1, float("inf")):
+                queue.replaceFront(self._ballsCollisionEvent(idx1))
+            else: queue.pop()
+        return None
     
     def _updateBallsStateAfterBallsCollision(
         self,
         idx1: int,
         idx2: int,
-        t_max: Real,
-        gc_heap: List[Tuple[Real]],
-        gnw_heap: List[Tuple[Real]],
     ) -> None:
         """
         Implements the necessary changes to be made immediately
         following a collision between two Ball objects in the
         simulation. Specifically:
         - Increments the state of the two Ball objects involved
-           by 1.
-        - Resets the attribute next_wall_heap of those two Ball objects
-           (using the method initialiseNextWallHeap() of each Ball
-           object) and the attribute balls_collision_heaps of the
-           simulation (using the method _resetBallsCollisionHeap())
-           for those two Ball objects to reflect their respective
-           changes in trajectory and therefore the collisions each
-           object is now on course for resulting from the collision.
-        - Updates the heaps gnw_heap and gc_heap to similarly reflect
-           the effect these changes in trajectory have on the upcoming
-           collisions with walls and between Ball objects respectively
-           in the simulation as a whole.
+           by 1, removing their events from the attribute event_queue
+           if it supports this (using the method _cancelBallEvents()).
+        - Resets the times of the next collisions with the walls of
+           those two Ball objects (using the method
+           initialiseWallTimes() of each Ball object) and the
+           attribute balls_collision_heaps of the simulation (using
+           the method _resetBallsCollisionHeap()) for those two Ball
+           objects to reflect their respective changes in trajectory
+           and therefore the collisions each object is now on course
+           for resulting from the collision.
+        - Inserts into the attribute event_queue the events these
+           changes in trajectory give rise to (i.e. the next collision
+           with a wall, the next collision with another Ball object
+           and if applicable the next cell crossing of each of the two
+           Ball objects).
         It is assumed that the value of the attribute t (representing
         the current time in terms of the simulation's time measure) for
         the simulation and the two Ball objects has already been set to
@@ -1874,64 +3638,23 @@ class MultiBallSimulation(object):
             idx2 (int): Non-negative integer giving the index in the
                     attribute balls of the other of the two Ball
                     objects involved in the collision.
-            t_max (real numeric value):
-            gc_heap (list of 5-tuples arranged as a min-heap by the
-                    heapq package): Min-heap storing details of
-                    collisions between pairs of Ball objects currently
-                    on course to occur in the simulation no later than
-                    the time t_max, with the min-heap organised based
-                    on the projected times of the corresponding
-                    collisions (with a collision projected to occur
-                    the soonest or joint soonest at the top of the
-                    heap).
-                    This min-heap should have been constructed using
-                    the method _constructGlobalBallsCollisionHeap() and
-                    kept updated using the method
-                    _updateGlobalBallsCollisionHeap(). See the
-                    documentation of the former of these methods for
-                    more details regarding the construction of the
-                    min-heap.
-            gnw_heap (list of 3-tuples arranged as a min-heap by the
-                    heapq package): Min-heap storing details of
-                    collisions between a Ball object and a wall
-                    currently on course to occur in the simulation no
-                    later than the time t_max, with the min-heap
-                    organised based on the projected times of the
-                    corresponding collisions (with a collision
-                    projected to occur the soonest or joint soonest at
-                    the top of the heap).
-                    This min-heap should have been constructed using
-                    the method _constructGlobalWallCollisionHeap() and
-                    kept updated using the method
-                    _updateGlobalWallCollisionHeap(). See the
-                    documentation of the former of these methods for
-                    more details regarding the construction of the
-                    min-heap.
         
         Returns:
         None
         """
-        if t_max > self._t_ref:
-            print(f"Pre, t = {t_max}, ball {idx1}: "\
-                    f"{self.balls_collision_heaps.get(idx1, [])}\n ball "\
-                    f"{idx2}: {self.balls_collision_heaps.get(idx2, [])}"\
-                    f"\n gc_heap: {gc_heap}")
         for idx in (idx1, idx2):
             self.ball_states[idx] += 1
-            ball = self.balls[idx]
-            ball.initialiseNextWallHeap()
-            if ball.next_wall_heap:
-                t = ball.next_wall_heap[0][0]
-                if t <= t_max:
-                    heapq.heappush(gnw_heap,\
-                            (t, idx, self.ball_states[idx]))
+        for idx in (idx1, idx2):
+            self._cancelBallEvents(idx)
+            self.balls[idx].initialiseWallTimes()
+            self._pushWallCollisionEvent(idx)
+            if self._broadphase is not None:
+                self._broadphase.updateBall(idx)
+                self._pushCellCrossingEvent(idx)
         excl = set()
         for idx in (idx2, idx1):
             if self._resetBallsCollisionHeap(idx, excl):
-                tup = self.balls_collision_heaps[idx][0]
-                if tup[0] <= t_max:
-                    ans = (tup[0], tup[2], tup[3], tup[5], tup[6])
-                    heapq.heappush(gc_heap, ans)
+                self.event_queue.push(self._ballsCollisionEvent(idx))
             # Future-proofing against changes in the physics used
             # (e.g. a non-uniform gravitational field) giving rise to
             # the possibility of two Ball objects being on course to
@@ -1943,152 +3666,167 @@ class MultiBallSimulation(object):
             # balls_collision_heaps[idx2], guaranteeing that it cannot
             # appear in the latter).
             excl.add(idx)
-        if t_max > self._t_ref:
-            bc_heap1 = self.balls_collision_heaps.get(idx1, [])
-            bc_heap2 = self.balls_collision_heaps.get(idx2, [])
-            print(f"Post, t = {t_max}, ball {idx1}: {bc_heap1}"\
-                    f"\n ball {idx2}: {bc_heap2}\n gc_heap: {gc_heap}")
         return
     
     def _updateBallStateAfterWallCollision(
         self,
         idx: int,
-        t_max: Real,
-        gc_heap: List[Tuple[Real]],
-        gnw_heap: List[Tuple[Real]],
     ) -> None:
         """
         Implements the necessary changes to be made immediately
         following a collision between a Ball object and a wall in the
         simulation. Specifically:
-        - Increments the state of the Ball object involved by 1.
-        - Updates the attribute next_wall_heap of the Ball object
-           (using its method initialiseNextWallHeap()) and resets the
-           attribute balls_collision_heaps of the simulation (using
-           the method _resetBallsCollisionHeap()) for the Ball object
-           to reflect its change in trajectory and therefore the
-           collisions it is now on course for resulting from the
+        - Increments the state of the Ball object involved by 1,
+           removing its events from the attribute event_queue if it
+           supports this (using the method _cancelBallEvents()).
+        - Resets the attribute balls_collision_heaps of the simulation
+           (using the method _resetBallsCollisionHeap()) for the Ball
+           object to reflect its change in trajectory and therefore
+           the collisions it is now on course for resulting from the
            collision.
-        - Updates the heaps gnw_heap and gc_heap to similarly reflect
-           the effect these changes in trajectory have on the upcoming
-           collisions with walls and between Ball objects respectively
-           in the simulation as a whole.
+        - Inserts into the attribute event_queue the events this
+           change in trajectory gives rise to (i.e. the next collision
+           with a wall, the next collision with another Ball object
+           and if applicable the next cell crossing of the Ball
+           object).
         It is assumed that the value of the attribute t (representing
         the current time in terms of the simulation's time measure) for
         the simulation and the Ball object has already been set to
         represent the time of the collision. Furthermore, the change in
         velocity of the Ball object resulting from the collision is
         assumed to already have been applied (by the appropriate use
-        of the Ball object's method progressToNextWallCollision()).
+        of the Ball object's method progressToNextWallCollision(),
+        which also updates its times of the next collisions with the
+        walls).
         
         Args:
             Required positional:
             idx (int): Non-negative integer giving the index in the
                     attribute balls of the Ball object involved in the
                     collision.
-            t_max (real numeric value): The latest time (in terms of
-                    the simulation's time measure) of new projected
-                    collisions for which corresponding items are
-                    added to gnw_heap or gc_heap.
-            gc_heap (list of 5-tuples arranged as a min-heap by the
-                    heapq package): Min-heap storing details of
-                    collisions between pairs of Ball objects currently
-                    on course to occur in the simulation no later than
-                    the time t_max, with the min-heap organised based
-                    on the projected times of the corresponding
-                    collisions (with a collision projected to occur
-                    the soonest or joint soonest at the top of the
-                    heap).
-                    This min-heap should have been constructed using
-                    the method _constructGlobalBallsCollisionHeap() and
-                    kept updated using the method
-                    _updateGlobalBallsCollisionHeap(). See the
-                    documentation of the former of these methods for
-                    more details regarding the construction of the
-                    min-heap
-            gnw_heap (list of 3-tuples arranged as a min-heap by the
-                    heapq package): Min-heap storing details of
-                    collisions between a Ball object and a wall
-                    currently on course to occur in the simulation no
-                    later than the time t_max, with the min-heap
-                    organised based on the projected times of the
-                    corresponding collisions (with a collision
-                    projected to occur the soonest or joint soonest at
-                    the top of the heap).
-                    This min-heap should have been constructed using
-                    the method _constructGlobalWallCollisionHeap() and
-                    kept updated using the method
-                    _updateGlobalWallCollisionHeap(). See the
-                    documentation of the former of these methods for
-                    more details regarding the construction of the
-                    min-heap.
         
         Returns:
         None
         """
         self.ball_states[idx] += 1
-        ball = self.balls[idx]
-        if ball.next_wall_heap:
-            t = ball.next_wall_heap[0][0]
-            if t <= t_max:
-                heapq.heappush(gnw_heap,\
-                        (t, idx, self.ball_states[idx]))
+        self._cancelBallEvents(idx)
+        self._pushWallCollisionEvent(idx)
+        if self._broadphase is not None:
+            self._broadphase.updateBall(idx)
+            self._pushCellCrossingEvent(idx)
+        if self._resetBallsCollisionHeap(idx, set()):
+            self.event_queue.push(self._ballsCollisionEvent(idx))
+        return
+    
+    def _updateBallStateAfterCellCrossing(
+        self,
+        idx: int,
+    ) -> None:
+        """
+        Implements the necessary changes to be made immediately
+        following a cell crossing of a Ball object in the simulation
+        (i.e. its centre moving from one cell of the broadphase grid
+        to another or, for SweepAndPrune, leaving its anchor).
+        Specifically:
+        - Increments the state of the Ball object involved by 1. While
+           its trajectory is unchanged, this invalidates the projected
+           collisions previously calculated for it so that these can
+           be recalculated for its new set of neighbouring Ball
+           objects without any being counted twice. Its events are
+           also removed from the attribute event_queue if it supports
+           this (using the method _cancelBallEvents()).
+        - Reinserts its next collision with a wall and inserts its next
+           cell crossing into the attribute event_queue.
+        - Resets the attribute balls_collision_heaps of the simulation
+           for the Ball object (using the method
+           _resetBallsCollisionHeap()) and inserts the resulting next
+           collision with another Ball object into the attribute
+           event_queue.
+        It is assumed that the Ball object has already been moved to
+        its new cell (using the method applyNextCellCrossing() of the
+        broadphase).
+        
+        Args:
+            Required positional:
+            idx (int): Non-negative integer giving the index in the
+                    attribute balls of the Ball object involved in the
+                    cell crossing.
+        
+        Returns:
+        None
+        """
+        self.ball_states[idx] += 1
+        self._cancelBallEvents(idx)
+        self._pushWallCollisionEvent(idx)
+        self._pushCellCrossingEvent(idx)
+        if self._resetBallsCollisionHeap(idx, set()):
+            self.event_queue.push(self._ballsCollisionEvent(idx))
+        return
+    
+    def _updateBallStateAfterRepredict(
+        self,
+        idx: int,
+    ) -> None:
+        """
+        Implements the necessary changes to be made when the projected
+        collisions of a Ball object in the simulation are due to be
+        recalculated because only some of them were stored (which can
+        only occur if the attribute compact_events is True).
+        Specifically:
+        - Increments the state of the Ball object involved by 1. While
+           its trajectory is unchanged, this invalidates the projected
+           collisions previously calculated for it (including those
+           stored in the min-heaps of other Ball objects) so that
+           these can be recalculated without any being counted twice.
+           Its events are also removed from the attribute event_queue
+           if it supports this (using the method _cancelBallEvents()).
+        - Reinserts its next collision with a wall and (if applicable)
+           its next cell crossing into the attribute event_queue.
+        - Resets the attribute balls_collision_heaps of the simulation
+           for the Ball object (using the method
+           _resetBallsCollisionHeap()) and inserts the resulting next
+           collision with another Ball object into the attribute
+           event_queue.
+        
+        Args:
+            Required positional:
+            idx (int): Non-negative integer giving the index in the
+                    attribute balls of the Ball object in question.
+        
+        Returns:
+        None
+        """
+        self.ball_states[idx] += 1
+        self._cancelBallEvents(idx)
+        self._pushWallCollisionEvent(idx)
+        self._pushCellCrossingEvent(idx)
         if self._resetBallsCollisionHeap(idx, set()):
-            tup = self.balls_collision_heaps[idx][0]
-            #print(t, t_max)
-            if tup[0] <= t_max:
-                ans = (tup[0], tup[2], tup[3], tup[5], tup[6])
-                heapq.heappush(gc_heap, ans)
+            self.event_queue.push(self._ballsCollisionEvent(idx))
         return
     
     def _progressToNextCollision(
         self,
         t_max: Real,
-        gc_heap: List[Tuple[Real]],
-        gnw_heap: List[Tuple[Real]],
     ) -> bool:
         """
         Progresses the simulation until immediately after the next
         collision due to occur in the simulation (either a collision
         between two objects or between an object and a wall) as long
         as this occurs no later than the time represented by t_max.
+        Any cell crossings and recalculations of projected collisions
+        due to occur before that collision are applied first, as are
+        any collisions between two Ball objects rejected on
+        re-validation (see the initialisation argument
+        reduced_precision).
+        
+        The events are taken from the attribute event_queue, which
+        persists between calls, so that only the events due no later
+        than t_max are examined.
         
         Args:
             t_max (real numeric value): The latest time (in terms of
-                    the simulation's time measure) of new projected
-                    collisions for which corresponding items are
-                    added to gnw_heap or gc_heap.
-            gc_heap (list of 5-tuples arranged as a min-heap by the
-                    heapq package): Min-heap storing details of
-                    collisions between pairs of Ball objects currently
-                    on course to occur in the simulation no later than
-                    the time t_max, with the min-heap organised based
-                    on the projected times of the corresponding
-                    collisions (with a collision projected to occur
-                    the soonest or joint soonest at the top of the
-                    heap).
-                    This min-heap should have been constructed using
-                    the method _constructGlobalBallsCollisionHeap() and
-                    kept updated using the method
-                    _updateGlobalBallsCollisionHeap(). See the
-                    documentation of the former of these methods for
-                    more details regarding the min-heap.
-            gnw_heap (list of 3-tuples arranged as a min-heap by the
-                    heapq package): Min-heap storing details of
-                    collisions between a Ball object and a wall
-                    currently on course to occur in the simulation no
-                    later than the time t_max, with the min-heap
-                    organised based on the projected times of the
-                    corresponding collisions (with a collision
-                    projected to occur the soonest or joint soonest at
-                    the top of the heap).
-                    This min-heap should have been constructed using
-                    the method _constructGlobalWallCollisionHeap() and
-                    kept updated using the method
-                    _updateGlobalWallCollisionHeap(). See the
-                    documentation of the former of these methods for
-                    more details regarding the construction of the
-                    min-heap.
+                    the simulation's time measure) of collisions
+                    that may be applied.
         
         Returns:
         Boolean (bool) which if True signifies that the method has
@@ -2097,61 +3835,224 @@ class MultiBallSimulation(object):
         the next collision in the simulation will occur after the time
         represented by t_max).
         """
-        b1 = self._updateGlobalBallsCollisionHeap(gc_heap, t_max)
-        b2 = self._updateGlobalWallCollisionHeap(gnw_heap)
-        if t_max > self._t_ref:
-            print("Finding next collision")
-            print(f"Global balls collision heap: {gc_heap}")
-            print(f"Global walls collision heap: {gnw_heap}")
-            print("Balls collision heaps: "\
-                    f"{self.balls_collision_heaps}")
-        if not b1 and not b2: return False
-        if not b1 or (b2 and gc_heap[0][0] > gnw_heap[0][0]):
-            i = heapq.heappop(gnw_heap)[1]
-            #self.applyNextWallCollision(i, t_max, gc_heap, gnw_heap)
-            self.balls[i].progressToNextWallCollision()
-            if t_max > self._t_ref:
-                print(f"Applying collision between ball {i} and wall "\
-                        f"at t = {self.balls[i].t}")
-            self._updateBallStateAfterWallCollision(i, t_max, gc_heap,\
-                    gnw_heap)
+        stats = self._stats
+        while True:
+            if stats is not None: t0 = stats.clock()
+            event = self._nextEvent()
+            if stats is not None:
+                t1 = stats.clock()
+                stats.addTime("queue", t1 - t0)
+            if event is None or event[0] > t_max: return False
+            self.event_queue.pop()
+            kind = event[1]
+            if kind == CELL_CROSSING_EVENT:
+                i = event[2]
+                self._broadphase.applyNextCellCrossing(i)
+                self._updateBallStateAfterCellCrossing(i)
+                if stats is not None:
+                    stats.cell_crossings += 1
+                    stats.addTime("cell_crossing", stats.clock() - t1)
+                continue
+            if kind == REPREDICT_EVENT:
+                self._updateBallStateAfterRepredict(event[2])
+                if stats is not None:
+                    stats.repredictions += 1
+                    stats.addTime("repredict", stats.clock() - t1)
+                continue
+            if kind == WALL_COLLISION_EVENT:
+                i = event[2]
+                ball = self.balls[i]
+                observers = self._observers
+                if observers:
+                    axis = self._ball_state_arrays._wall_axis_arr.item(i)
+                ball.progressToNextWallCollision()
+                self._updateBallStateAfterWallCollision(i)
+                if observers:
+                    self._notifyWallCollision(i, axis)
+                if stats is not None:
+                    stats.wall_collisions += 1
+                    stats.addTime("wall_collision", stats.clock() - t1)
+                return True
+            i1 = event[2]
+            ball1 = self.balls[i1]
+            if self._compact_events:
+                t, i2, _, _ =\
+                        heapq.heappop(self.balls_collision_heaps[i1])
+                ball2 = self.balls[i2]
+                if self._reduced_precision:
+                    # The rounded reference states may place the time
+                    # of the collision slightly before the reference
+                    # time of either Ball object
+                    t = max(t, ball1._t0, ball2._t0)
+                contact_displ_vec, v1_zmf =\
+                        ball1.contactGeometryAtTime(ball2, t)
+            else:
+                t, contact_displ_vec, _, _, v1_zmf, i2, _ =\
+                        heapq.heappop(self.balls_collision_heaps[i1])
+                ball2 = self.balls[i2]
+            if not self.balls_collision_heaps[i1]:
+                self.balls_collision_heaps.pop(i1)
+            if self._reduced_precision and sum(x * y for x, y in\
+                    zip(contact_displ_vec, v1_zmf)) <= 0:
+                # Re-validation against the rounded reference states
+                # found that the Ball objects are not approaching each
+                # other, so instead of colliding they continue on their
+                # current trajectories and their projected collisions
+                # are recalculated from time t.
+                ball1._updateTime0(t)
+                ball2._updateTime0(t)
+                self._updateBallsStateAfterBallsCollision(i1, i2)
+                if self._observers:
+                    self._notifyBallsCollision(t, i1, i2,\
+                            contact_displ_vec, v1_zmf, rejected=True)
+                if stats is not None:
+                    stats.rejected_collisions += 1
+                    stats.addTime("ball_collision", stats.clock() - t1)
+                continue
+            ball1.progressToNextOtherBallCollision(ball2, t,\
+                    contact_displ_vec, v1_zmf)
+            self._updateBallsStateAfterBallsCollision(i1, i2)
+            if self._observers:
+                self._notifyBallsCollision(t, i1, i2, contact_displ_vec,\
+                        v1_zmf)
+            if stats is not None:
+                stats.ball_collisions += 1
+                stats.addTime("ball_collision", stats.clock() - t1)
             return True
-        i1 = heapq.heappop(gc_heap)[1]
-        #self.applyNextBallCollision(i1, t_max, gc_heap, gnw_heap)
-        if t_max > self._t_ref:
-            print(f"gc_heap = {gc_heap}")
-            print(f"ball collision heap for ball {i1} = "\
-                    f"{self.balls_collision_heaps[i1]}")
-            print(f"ball states = {self.ball_states}")
-        t, contact_displ_vec, _, _, v1_zmf, i2, _ =\
-                heapq.heappop(self.balls_collision_heaps[i1])
-        if not self.balls_collision_heaps[i1]:
-            self.balls_collision_heaps.pop(i1)
-        ball1, ball2 = self.balls[i1], self.balls[i2]
-        if t_max > self._t_ref:
-            print(f"Applying collision between balls {i1} and {i2} "\
-                    f"at t = {t}")
-            d_sq = sum((x - y) ** 2 for x, y in zip(ball1.r, ball2.r))
-            rad_sq = (ball1.radius + ball2.radius)
-            print(f"For balls {i1} and {i2}, squared centre distance "\
-                    f"= {d_sq}, squared radius sum = {rad_sq}")
-        self.balls[i1].progressToNextOtherBallCollision(\
-                self.balls[i2], t, contact_displ_vec, v1_zmf)
-        self._updateBallsStateAfterBallsCollision(\
-                i1, i2, t_max, gc_heap, gnw_heap)
-        return True
     
     def _updateBallsTime(self) -> None:
         """
         Sets the current time of all of the Ball objects (as
         represented by attribute t in the simulation's time measure)
         to equal that of the simulation.
+        As Ball objects follow the current time of the simulation
+        unless their time has been set to a different value, only
+        those Ball objects need to be updated.
         
         Returns:
         None
         """
-        for ball in self.balls:
-            ball.t = self.t
+        for ball in self._t_set_balls:
+            ball._t = None
+        self._t_set_balls.clear()
+        return
+    
+    def ballStatesAtTime(
+        self,
+        t: Optional[Real]=None,
+    ) -> Tuple[np.ndarray]:
+        """
+        Calculates the position vectors of the centres and the velocity
+        vectors of all of the Ball objects in the simulation at time t
+        in a single vectorised calculation from their reference states
+        (see BallStateArrays), without updating the Ball objects
+        themselves.
+        
+        The trajectory of each Ball object is followed from its
+        reference time under the uniform gravitational field, so the
+        results are exact for any time t between the latest reference
+        time of the Ball objects and the time of the next collision in
+        the simulation (which includes the current time of the
+        simulation). For later times, any collisions occurring before
+        t are not accounted for.
+        
+        Args:
+            Optional named:
+            t (real numeric value or None): If specified, the time in
+                    terms of the simulation's time measure at which
+                    the states are to be calculated. This may not be
+                    earlier than the reference time of any of the Ball
+                    objects. Otherwise, the current time of the
+                    simulation (attribute t).
+                Default: None
+        
+        Returns:
+        2-tuple of 2D numpy arrays of floats with n_dims columns, whose
+        index 0 contains the array whose rows are the position vectors
+        and whose index 1 contains the array whose rows are the
+        velocity vectors of the Ball objects (in the same order as the
+        attribute balls). These are new arrays, so may be modified
+        freely.
+        """
+        if t is None: t = self.t
+        arrs = self.ball_state_arrays
+        if len(arrs) and t < arrs.t0.max():
+            raise ValueError("The time t may not be earlier than the "
+                    "reference time of any of the Ball objects.")
+        return arrs.statesAtTime(t, self.g)
+    
+    def sampleStates(
+        self,
+        times: Iterable[Real],
+        directory: Optional[str]=None,
+        chunk_size: int=1024,
+        check_overlap: bool=False,
+    ) -> Generator[Tuple[np.ndarray], None, None]:
+        """
+        Generator progressing the simulation through each of the given
+        sample times in turn and yielding the position and velocity
+        vectors of all of the Ball objects at each of those times.
+        
+        The simulation is progressed event by event up to each sample
+        time (as for the method progressTime()) only when the next
+        sample is requested, and the states of the Ball objects are
+        then calculated from their trajectories in a single vectorised
+        calculation (see the method ballStatesAtTime()). As each sample
+        consists of new arrays and nothing is retained between samples,
+        an arbitrarily long run can be processed in constant memory.
+        On completion (or if the generator is closed early), the
+        simulation is at the time of the latest sample yielded.
+        
+        Args:
+            Required positional:
+            times (iterable of real numeric values): The sample times
+                    (in terms of the simulation's time measure), which
+                    must be in non-decreasing order and no earlier than
+                    the current time of the simulation. This may be a
+                    generator, and so need not be finite.
+            
+            Optional named:
+            directory (str or None): If specified, the path of an
+                    existing directory to which the samples are also
+                    written as chunks of .npy files through memory maps
+                    (see TrajectoryChunkWriter), which can be read with
+                    TrajectoryChunks.
+                Default: None
+            chunk_size (strictly positive int): If directory is
+                    specified, the largest number of samples in each
+                    chunk.
+                Default: 1024
+            check_overlap (bool): If True then after the simulation has
+                    reached each sample time, checks whether any pair
+                    of objects overlap as for the method
+                    progressTime().
+                Default: False
+        
+        Yields:
+        2-tuple of 2D numpy arrays of floats with n_dims columns, whose
+        index 0 contains the array whose rows are the position vectors
+        and whose index 1 contains the array whose rows are the
+        velocity vectors of the Ball objects (in the same order as the
+        attribute balls) at the sample time.
+        """
+        writer = TrajectoryChunkWriter(directory, len(self.balls),\
+                self.n_dims, chunk_size=chunk_size)\
+                if directory is not None else None
+        try:
+            for t in times:
+                if t < self.t:
+                    raise ValueError(f"The sample times must be in "\
+                            f"non-decreasing order and no earlier than "\
+                            f"the current time of the simulation, got "\
+                            f"{t} after {self.t}")
+                self._progressToTime(t, check_overlap=check_overlap)
+                r, v = self.ballStatesAtTime(t)
+                if writer is not None:
+                    writer.append(t, r, v)
+                yield (r, v)
+        finally:
+            if writer is not None:
+                writer.close()
     
     def progressTime(
         self,
@@ -2193,26 +4094,119 @@ class MultiBallSimulation(object):
         between an object and a wall) in the simulation during this
         time interval.
         """
-        t2 = self.t + dt
-        if t2 > self._t_ref:
-            print(f"\nprogressing time to {t2}")
-            for i, ball in enumerate(self.balls):
-                print(i, ball.r, ball.v)
-        gc_heap = self._constructGlobalBallsCollisionHeap(t2)
-        gnw_heap = self._constructGlobalWallCollisionHeap(t2)
+        return self._progressToTime(self.t + dt,\
+                check_overlap=check_overlap)
+    
+    def _progressToTime(
+        self,
+        t2: Real,
+        check_overlap: bool=True,
+    ) -> int:
+        """
+        Progresses the simulation from the current time (attribute t)
+        to time t2, taking keyframes along the way if these are enabled
+        (see the method enableKeyframes()).
+        
+        Args:
+            Required positional:
+            t2 (real numeric value): The time (in terms of the
+                    simulation's time measure) to which the simulation
+                    is to be progressed, which may not be earlier than
+                    the current time.
+            
+            Optional named:
+            check_overlap (bool): See the documentation of the method
+                    progressTime().
+                Default: True
+        
+        Returns:
+        Non-negative integer (int) representing the number of
+        collisions that occurred in the simulation during this time
+        interval (see the documentation of the method progressTime()).
+        """
+        stats = self._stats
+        self._ensureEventQueue()
         cnt = 0
-        while self._progressToNextCollision(t2, gc_heap, gnw_heap):
+        # Progresses to the time of each keyframe due before t2 in turn
+        # (which does not alter the events processed, as the events up
+        # to a given time are processed in order of time in any case)
+        t_key = self._nextKeyframeTime()
+        while t_key <= t2:
+            while self._progressToNextCollision(t_key):
+                cnt += 1
+            self.t = t_key
+            self._updateBallsTime()
+            self._addKeyframe()
+            t_key = self._nextKeyframeTime()
+        while self._progressToNextCollision(t2):
             cnt += 1
         self.t = t2
         self._updateBallsTime()
         if check_overlap:
+            if stats is not None: t0 = stats.clock()
             msg = self.anyOverlapMessage()
+            if stats is not None:
+                stats.addTime("audit", stats.clock() - t0)
             if msg:
                 print(msg)
                 print(f"Count = {cnt}")
         
         return cnt
     
+    def events(self, until: Real) -> Generator[CollisionEvent, None, None]:
+        """
+        Generator progressing the simulation up to time until (as for
+        the method progressTime(), without checking for overlaps) and
+        yielding a CollisionEvent describing each collision (between
+        two Ball objects or between a Ball object and a wall) as it is
+        processed (see the method addObserver()).
+        
+        The simulation is only progressed as far as the next collision
+        when the next CollisionEvent is requested, and its current time
+        (attribute t) is only updated to until once the generator is
+        exhausted (if the generator is closed early, it is instead set
+        to the time of the latest collision processed). While the
+        generator is in use, the simulation should not be progressed
+        by other means.
+        
+        Args:
+            Required positional:
+            until (real numeric value): The time (in terms of the
+                    simulation's time measure) to which the simulation
+                    is to be progressed, which may not be earlier than
+                    its current time.
+        
+        Yields:
+        CollisionEvent describing a collision, in order of time.
+        """
+        if until < self.t:
+            raise ValueError(f"until ({until}) may not be earlier than "\
+                    f"the current time of the simulation ({self.t})")
+        self._ensureEventQueue()
+        pending = collections.deque()
+        self.addObserver(pending.append)
+        t_last = self.t
+        try:
+            while True:
+                t_key = self._nextKeyframeTime()
+                t_seg = min(t_key, until)
+                while self._progressToNextCollision(t_seg) or pending:
+                    while pending:
+                        event = pending.popleft()
+                        t_last = event.t
+                        yield event
+                self.t = t_seg
+                self._updateBallsTime()
+                if t_key > until: break
+                self._addKeyframe()
+        finally:
+            self.removeObserver(pending.append)
+            if pending:
+                t_last = pending[-1].t
+            if t_last > self.t:
+                self.t = t_last
+                self._updateBallsTime()
+    
     def calculateTotalKineticEnergy(self) -> Real:
         """
         Calculates the current total translational kinetic energy of
@@ -2223,8 +4217,10 @@ class MultiBallSimulation(object):
         energy of the objects in the simulation at the time represented
         by attribute t in terms of the simulation's energy units.
         """
-        return sum(ball.calculateKineticEnergy()\
-                for ball in self.balls)
+        if not self.balls: return 0
+        v_arr = self.ballStatesAtTime()[1]
+        return 0.5 * float((self.ball_state_arrays.m *\
+                (v_arr ** 2).sum(axis=1)).sum())
     
     def calculateTotalPotentialEnergy(self) -> Real:
         """
@@ -2240,8 +4236,10 @@ class MultiBallSimulation(object):
         energy of the objects in the simulation at the time represented
         by attribute t in terms of the simulation's energy units.
         """
-        return sum(ball.calculatePotentialEnergy()\
-                for ball in self.balls)
+        if not self.balls: return 0
+        r_arr = self.ballStatesAtTime()[0]
+        return -float((self.ball_state_arrays.m *\
+                (r_arr @ np.asarray(self.g, dtype=float))).sum())
     
     def calculateTotalMechanicalEnergy(self) -> Real:
         """
@@ -2269,6 +4267,8 @@ class MultiBallSimulation(object):
         Checks whether any Ball objects in the simulation are not
         completely contained within the box. If so, returns details
         of the first Ball object identified such that this is the case.
+        Ball objects extending beyond the walls by no more than the
+        attribute position_tol are not counted.
         
         Args:
             Optional named:
@@ -2313,14 +4313,23 @@ class MultiBallSimulation(object):
         """
         if not balls_t_updated:
             self._updateBallsTime()
-        for idx, ball in enumerate(self.balls):
-            ans = ball.isOutsideBox()
-            if not ans: continue
-            axis_idx, end_idx = ans
-            d = self.box_dims[axis_idx] - ball.r[axis_idx] if axis_idx\
-                    else ball.r[axis_idx]
-            return idx, axis_idx, end_idx, ball.radius, d
-        return ()
+        if not self.balls: return ()
+        arrs = self._ball_state_arrays
+        positions = arrs.positionsAtTime(self.t, self.g)
+        radii = arrs.radius[:, np.newaxis]
+        box_dims = np.asarray(self.box_dims, dtype=float)
+        tol = self._position_tol
+        below = radii - tol > positions
+        above = box_dims - radii + tol < positions
+        outside = below | above
+        outside_balls = np.flatnonzero(outside.any(axis=1))
+        if not len(outside_balls): return ()
+        idx = int(outside_balls[0])
+        axis_idx = int(np.argmax(outside[idx]))
+        end_idx = 0 if below[idx, axis_idx] else 1
+        r = float(positions[idx, axis_idx])
+        d = self.box_dims[axis_idx] - r if end_idx else r
+        return idx, axis_idx, end_idx, self.balls[idx].radius, d
     
     def _detectBallsOverlap(
         self,
@@ -2372,26 +4381,31 @@ class MultiBallSimulation(object):
         """
         # Assumes ball and all elements of self.balls have time equal
         # to self.t
-        for idx in range(start_idx, len(self.balls)):
-            ball2 = self.balls[idx]
-            r1, r2 = ball.r, ball2.r
-            rad_sum = ball.radius + ball2.radius
-            rad_sum_sq = rad_sum ** 2
-            d_sq = sum((x - y) ** 2 for x, y in zip(r1, r2))
-            if d_sq < rad_sum_sq:
-                return idx, rad_sum, d_sq
-        return ()
+        n_balls = len(self.balls)
+        if start_idx >= n_balls: return ()
+        arrs = self._ball_state_arrays
+        positions = arrs.positionsAtTime(self.t, self.g)[start_idx:n_balls]
+        rad_sums = ball.radius + arrs.radius[start_idx:n_balls]
+        d_sqs = ((positions - np.asarray(ball.r)) ** 2).sum(axis=1)
+        overlaps = np.flatnonzero(d_sqs < rad_sums ** 2)
+        if not len(overlaps): return ()
+        i = int(overlaps[0])
+        return start_idx + i, float(rad_sums[i]), float(d_sqs[i])
     
     def detectAnyBallsOverlap(
         self,
         balls_t_updated: bool=False,
     ) -> Tuple[Real]:
         """
-        Examines all pairs of objects in the simulation until one pair
-        of objects are found to overlap with each other (i.e. the
-        intersection of the sets position vectors comprising the two
-        objects is not empty). If such an overlap is found, then
-        immediately returns details of the overlap.
+        Examines all pairs of objects in the simulation for overlap
+        with each other (i.e. the intersection of the sets position
+        vectors comprising the two objects is not empty). If such an
+        overlap is found, then returns details of the overlap.
+        To avoid explicitly examining every pair, candidate pairs are
+        found by a vectorised sort-and-sweep (see
+        findOverlappingPairs() in the broadphase module). Pairs
+        overlapping by no more than the attribute position_tol are not
+        counted.
         During the simulation, no pair of objects should ever overlap
         with each other. Thus, this method acts as a check for errors
         in the correct addition of objects into the simulation and
@@ -2428,12 +4442,15 @@ class MultiBallSimulation(object):
         """
         if not balls_t_updated:
             self._updateBallsTime()
-        for idx1, ball1 in enumerate(self.balls):
-            ans = self._detectBallsOverlap(ball1, start_idx=idx1 + 1)
-            if ans:
-                idx2, rad_sum, d_sq = ans
-                return idx1, idx2, rad_sum, d_sq
-        return ()
+        arrs = self._ball_state_arrays
+        tol = self._position_tol
+        idx1_arr, idx2_arr, rad_sums, d_sqs = findOverlappingPairs(\
+                arrs.positionsAtTime(self.t, self.g),\
+                arrs.radius - tol / 2 if tol else arrs.radius)
+        if not len(idx1_arr): return ()
+        if tol: rad_sums = rad_sums + tol
+        return int(idx1_arr[0]), int(idx2_arr[0]), float(rad_sums[0]),\
+                float(d_sqs[0])
     
     def anyOverlapMessage(
         self,
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+
+from typing import (
+    Optional,
+    Tuple,
+)
+
+import numpy as np
+
+from gas_simulation.utils import Real
+from gas_simulation.kernels import timesToNextWalls
+
+class BallStateArrays(object):
+    """
+    Struct-of-arrays store of the state of every Ball object in a
+    MultiBallSimulation, holding the mass, radius, reference time and
+    the position and velocity vectors at that reference time of each
+    Ball object in contiguous NumPy arrays (see the documentation of
+    Ball for the meaning of the reference time), along with the times
+    of the next collisions of each Ball object with the walls. Each Ball
+    object corresponds to one row of these arrays, and acts as a view of
+    that row, so that the state of the whole simulation is also
+    available to vectorised calculations.
+    
+    The arrays are allocated with spare capacity which is doubled
+    whenever it is exhausted, so that adding a Ball object takes
+    amortised constant time. As such, the arrays themselves may be
+    replaced when a row is added, and references to them (as opposed
+    to this object) should not be kept across additions.
+    
+    Initialisation args:
+        
+        Required positional:
+        
+        n_dims (strictly positive int): The number of spatial
+                dimensions of the simulation.
+        
+        Optional named:
+        
+        capacity (strictly positive int): The number of rows initially
+                allocated.
+            Default: 16
+        dtype (numpy floating point type): The data type of the arrays
+                r0 and v0. Using a type with lower precision than the
+                default (such as numpy.float32) reduces the memory used
+                at the cost of the positions and velocities being
+                rounded whenever the reference states are updated. The
+                remaining arrays (in particular the times) always use
+                the default type.
+            Default: float (i.e. double precision)
+    
+    Attributes:
+        
+        n_dims (strictly positive int): The number of spatial
+                dimensions of the simulation.
+        dtype (numpy dtype): The data type of the arrays r0 and v0.
+        m (1D numpy array of floats): The mass of each Ball object in
+                terms of the simulation's mass units.
+        radius (1D numpy array of floats): The radius of each Ball
+                object in terms of the simulation's distance units.
+        t0 (1D numpy array of floats): The reference time of each Ball
+                object in terms of the simulation's time measure.
+        r0 (2D numpy array of floats): Array with n_dims columns whose
+                rows are the position vectors of the centre of each
+                Ball object at its reference time in terms of the
+                simulation's distance units.
+        v0 (2D numpy array of floats): Array with n_dims columns whose
+                rows are the velocity vectors of each Ball object at
+                its reference time in terms of the simulation's
+                velocity units.
+        t_wall_axes (2D numpy array of floats): Array with n_dims
+                columns giving for each Ball object and basis vector
+                the time of the next collision of the Ball object with
+                one of the walls normal to that basis vector on its
+                current trajectory in terms of the simulation's time
+                measure, or inf if it is not due to collide with
+                either of those walls.
+        t_wall (1D numpy array of floats): The time of the next
+                collision of each Ball object with any wall (i.e. the
+                smallest element of the corresponding row of
+                t_wall_axes).
+        wall_axis (1D numpy array of ints): The index of the basis
+                vector normal to the wall involved in the next
+                collision of each Ball object with a wall (the column
+                of t_wall_axes giving t_wall, with ties resolved in
+                favour of the smallest index), or -1 if it is not due
+                to collide with a wall.
+        Each of these contains exactly one row for each Ball object, in
+        the order in which they were added, and is a view of the
+        underlying storage (so that changes made to their elements are
+        reflected in the corresponding Ball objects).
+    
+    Methods:
+        (For full description, see documentation of the method itself)
+        
+        append(): Adds a row for a new Ball object.
+        pop(): Removes the most recently added row.
+        calculateWallTimes(): Calculates the times of the next
+                collisions with the walls of some or all of the Ball
+                objects.
+        syncWallTime(): Updates the time of the next collision with any
+                wall of a Ball object after a change in the times of
+                its next collisions with the walls normal to each basis
+                vector.
+        positionsAtTime(): Calculates the position vectors of the
+                centres of every Ball object at a given time.
+        velocitiesAtTime(): Calculates the velocity vectors of every
+                Ball object at a given time.
+        statesAtTime(): Calculates both the position and velocity
+                vectors of every Ball object at a given time.
+    """
+    def __init__(
+        self,
+        n_dims: int,
+        capacity: int=16,
+        dtype: type=float,
+    ):
+        self._n_dims = n_dims
+        self._dtype = np.dtype(dtype)
+        self._n = 0
+        self._m_arr = np.zeros(capacity, dtype=float)
+        self._radius_arr = np.zeros(capacity, dtype=float)
+        self._t0_arr = np.zeros(capacity, dtype=float)
+        self._r0_arr = np.zeros((capacity, n_dims), dtype=self._dtype)
+        self._v0_arr = np.zeros((capacity, n_dims), dtype=self._dtype)
+        self._t_wall_axes_arr = np.zeros((capacity, n_dims), dtype=float)
+        self._t_wall_arr = np.zeros(capacity, dtype=float)
+        self._wall_axis_arr = np.zeros(capacity, dtype=np.intp)
+    
+    def __len__(self) -> int:
+        return self._n
+    
+    @property
+    def n_dims(self):
+        return self._n_dims
+    
+    @property
+    def dtype(self):
+        return self._dtype
+    
+    @property
+    def m(self):
+        return self._m_arr[:self._n]
+    
+    @property
+    def radius(self):
+        return self._radius_arr[:self._n]
+    
+    @property
+    def t0(self):
+        return self._t0_arr[:self._n]
+    
+    @property
+    def r0(self):
+        return self._r0_arr[:self._n]
+    
+    @property
+    def v0(self):
+        return self._v0_arr[:self._n]
+    
+    @property
+    def t_wall_axes(self):
+        return self._t_wall_axes_arr[:self._n]
+    
+    @property
+    def t_wall(self):
+        return self._t_wall_arr[:self._n]
+    
+    @property
+    def wall_axis(self):
+        return self._wall_axis_arr[:self._n]
+    
+    def _setCapacity(self, capacity: int) -> None:
+        """
+        Reallocates the underlying arrays so that they have space for
+        capacity rows, retaining the existing rows.
+        
+        Args:
+            Required positional:
+            capacity (int): The number of rows to allocate, which must
+                    be no less than the current number of rows.
+        
+        Returns:
+        None
+        """
+        n = self._n
+        for attr in ("_m_arr", "_radius_arr", "_t0_arr", "_r0_arr",\
+                "_v0_arr", "_t_wall_axes_arr", "_t_wall_arr",\
+                "_wall_axis_arr"):
+            arr = getattr(self, attr)
+            arr2 = np.zeros((capacity,) + arr.shape[1:], dtype=arr.dtype)
+            arr2[:n] = arr[:n]
+            setattr(self, attr, arr2)
+        return
+    
+    def append(
+        self,
+        m: Real,
+        radius: Real,
+        r0: Tuple[Real],
+        v0: Tuple[Real],
+        t0: Real,
+    ) -> int:
+        """
+        Adds a row to the arrays for a new Ball object. The times of
+        its next collisions with the walls are initially set to inf.
+        
+        Args:
+            Required positional:
+            m (strictly positive real numeric value): The mass of the
+                    Ball object.
+            radius (strictly positive real numeric value): The radius
+                    of the Ball object.
+            r0 (n-tuple of real numeric values): The position vector of
+                    the centre of the Ball object at time t0.
+            v0 (n-tuple of real numeric values): The velocity vector of
+                    the Ball object at time t0.
+            t0 (real numeric value): The reference time of the Ball
+                    object.
+        
+        Returns:
+        Integer (int) giving the index of the new row.
+        """
+        idx = self._n
+        if idx == len(self._m_arr):
+            self._setCapacity(2 * idx)
+        self._m_arr[idx] = m
+        self._radius_arr[idx] = radius
+        self._t0_arr[idx] = t0
+        self._r0_arr[idx] = r0
+        self._v0_arr[idx] = v0
+        self._t_wall_axes_arr[idx] = float("inf")
+        self._t_wall_arr[idx] = float("inf")
+        self._wall_axis_arr[idx] = -1
+        self._n += 1
+        return idx
+    
+    def pop(self) -> None:
+        """
+        Removes the most recently added row from the arrays.
+        
+        Returns:
+        None
+        """
+        self._n -= 1
+        return
+    
+    def calculateWallTimes(
+        self,
+        box_interior_ranges: Tuple[Tuple[Real]],
+        g: Tuple[Real],
+        idx_arr: Optional[np.ndarray]=None,
+    ) -> None:
+        """
+        Calculates the times of the next collisions with the walls
+        normal to each basis vector of the Ball objects in the given
+        rows, assuming each follows its trajectory from its reference
+        time, and stores them in the attribute t_wall_axes (updating
+        the attributes t_wall and wall_axis accordingly). This gives
+        identical results to the method initialiseWallTimes() of
+        each of the corresponding Ball objects.
+        
+        Args:
+            Required positional:
+            box_interior_ranges (n-tuple of 2-tuples of real numeric
+                    values): The ranges of the components of the
+                    position vectors of the points inside the box of
+                    the simulation along each basis vector (see the
+                    attribute of the same name of MultiBallSimulation).
+            g (n-tuple of real numeric values): The uniform
+                    gravitational field of the simulation.
+            
+            Optional named:
+            idx_arr (1D array-like of ints or None): If given, the
+                    indices of the rows to be updated. Otherwise, every
+                    row is updated.
+                Default: None
+        
+        Returns:
+        None
+        """
+        if idx_arr is None:
+            idx_arr = np.arange(self._n)
+        idx_arr = np.asarray(idx_arr, dtype=np.intp)
+        if not len(idx_arr): return
+        ranges = np.asarray(box_interior_ranges, dtype=float)
+        rad = self._radius_arr[idx_arr][:, np.newaxis]
+        t_wall_axes = self._t0_arr[idx_arr][:, np.newaxis] +\
+                timesToNextWalls(self._r0_arr[idx_arr].astype(float),\
+                self._v0_arr[idx_arr].astype(float), g,\
+                ranges[:, 0] + rad, ranges[:, 1] - rad)
+        self._t_wall_axes_arr[idx_arr] = t_wall_axes
+        wall_axis = t_wall_axes.argmin(axis=1)
+        t_wall = t_wall_axes[np.arange(len(idx_arr)), wall_axis]
+        wall_axis[t_wall == np.inf] = -1
+        self._t_wall_arr[idx_arr] = t_wall
+        self._wall_axis_arr[idx_arr] = wall_axis
+        return
+    
+    def syncWallTime(self, idx: int) -> None:
+        """
+        Sets the elements of the attributes t_wall and wall_axis for
+        the Ball object in row idx from the corresponding row of the
+        attribute t_wall_axes. This should be used whenever that row
+        is modified.
+        
+        Args:
+            Required positional:
+            idx (int): The index of the row in question.
+        
+        Returns:
+        None
+        """
+        t_wall_axes = self._t_wall_axes_arr[idx].tolist()
+        t_wall = min(t_wall_axes)
+        self._t_wall_arr[idx] = t_wall
+        self._wall_axis_arr[idx] = t_wall_axes.index(t_wall)\
+                if t_wall != float("inf") else -1
+        return
+    
+    def positionsAtTime(
+        self,
+        t: Real,
+        g: Tuple[Real],
+    ) -> np.ndarray:
+        """
+        Calculates the position vectors of the centres of every Ball
+        object at time t, assuming that each follows its trajectory
+        from its reference time under the uniform gravitational field
+        g (i.e. experiences no collisions between its reference time
+        and t).
+        
+        Args:
+            Required positional:
+            t (real numeric value): The time in terms of the
+                    simulation's time measure.
+            g (n-tuple of real numeric values): The uniform
+                    gravitational field of the simulation.
+        
+        Returns:
+        2D numpy array of floats with n_dims columns whose rows are the
+        position vectors of the Ball objects (in the order in which
+        they were added).
+        """
+        dt = (t - self.t0)[:, np.newaxis]
+        return self.r0 + self.v0 * dt + np.asarray(g) * dt ** 2 / 2
+    
+    def velocitiesAtTime(
+        self,
+        t: Real,
+        g: Tuple[Real],
+    ) -> np.ndarray:
+        """
+        Calculates the velocity vectors of every Ball object at time
+        t, assuming that each follows its trajectory from its reference
+        time under the uniform gravitational field g (i.e. experiences
+        no collisions between its reference time and t).
+        
+        Args:
+            Required positional:
+            t (real numeric value): The time in terms of the
+                    simulation's time measure.
+            g (n-tuple of real numeric values): The uniform
+                    gravitational field of the simulation.
+        
+        Returns:
+        2D numpy array of floats with n_dims columns whose rows are the
+        velocity vectors of the Ball objects (in the order in which
+        they were added).
+        """
+        dt = (t - self.t0)[:, np.newaxis]
+        return self.v0 + np.asarray(g) * dt
+    
+    def statesAtTime(
+        self,
+        t: Real,
+        g: Tuple[Real],
+    ) -> Tuple[np.ndarray]:
+        """
+        Calculates the position vectors of the centres and the velocity
+        vectors of every Ball object at time t in a single pass,
+        giving the same results as positionsAtTime() and
+        velocitiesAtTime() (see the documentation of those methods).
+        
+        Args:
+            Required positional:
+            t (real numeric value): The time in terms of the
+                    simulation's time measure.
+            g (n-tuple of real numeric values): The uniform
+                    gravitational field of the simulation.
+        
+        Returns:
+        2-tuple of 2D numpy arrays of floats with n_dims columns, whose
+        index 0 contains the array whose rows are the position vectors
+        and whose index 1 contains the array whose rows are the
+        velocity vectors of the Ball objects (in the order in which
+        they were added).
+        """
+        dt = (t - self.t0)[:, np.newaxis]
+        g = np.asarray(g)
+        v0 = self.v0
+        return self.r0 + v0 * dt + g * dt ** 2 / 2, v0 + g * dt
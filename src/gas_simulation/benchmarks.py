@@ -0,0 +1,707 @@
+#!/usr/bin/env python3
+
+from typing import (
+    Union,
+    Tuple,
+    List,
+    Dict,
+    Optional,
+    Any,
+)
+
+import argparse
+import itertools
+import json
+import operator
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from gas_simulation.utils import Real
+from gas_simulation.ball_collision_simulator import MultiBallSimulation
+from gas_simulation.initial_conditions import (
+    generateRandomPacking,
+    maxwellBoltzmannVelocities,
+)
+
+# The animations in example_simulation_animations run at this framerate
+# with one simulation time unit per frame, so velocities and
+# accelerations given per second are divided by this and its square
+# respectively to give them in terms of the simulation's units (see
+# MultiBallSimulationAnimatorDisplay).
+_FRAMERATE = 60
+
+def scenario1Simulation(
+    broadphase: Optional[str]=None,
+    g_mult: Real=1,
+    event_queue_type: str="heap",
+) -> Tuple[Union[MultiBallSimulation, Real]]:
+    """
+    Headless equivalent of the simulation animated by runSimulation1()
+    of example_simulation_animations at 60 frames per second: three
+    balls in a 20 by 20 box under gravity.
+    
+    Args:
+        Optional named:
+        broadphase (str or None): The broadphase used by the
+                simulation (see the documentation of
+                MultiBallSimulation).
+            Default: None
+        g_mult (real numeric value): Multiplier for the gravitational
+                field of runSimulation1().
+            Default: 1
+        event_queue_type (str): The event queue used by the
+                simulation (see the documentation of
+                MultiBallSimulation).
+            Default: "heap"
+    
+    Returns:
+    2-tuple whose index 0 contains the MultiBallSimulation and whose
+    index 1 contains the time interval corresponding to one animation
+    frame in terms of its time measure.
+    """
+    sim = MultiBallSimulation(box_dims=(20, 20),\
+            g=3 * g_mult / _FRAMERATE ** 2, broadphase=broadphase,\
+            event_queue_type=event_queue_type)
+    for m, radius, r0, v0 in ((2, 2, (2, 3), (5, 3)),\
+            (1, 1, (5, 9), (-12, 1)), (1, 1, (15, 16), (0, 0))):
+        sim.addBall(m=m, radius=radius, r0=r0,\
+                v0=tuple(x / _FRAMERATE for x in v0))
+    return sim, 1
+
+def scenario2Simulation(
+    n_rows: int,
+    seed: int=0,
+    broadphase: Optional[str]=None,
+    g_mult: Real=1,
+    event_queue_type: str="heap",
+) -> Tuple[Union[MultiBallSimulation, Real]]:
+    """
+    Headless equivalent of the simulation animated by runSimulation2()
+    of example_simulation_animations at 60 frames per second: rows of
+    balls in a 50 by 50 box under gravity, with the mass of the balls
+    increasing with the height of their row and random initial
+    velocities.
+    
+    Args:
+        Required positional:
+        n_rows (strictly positive int): The number of rows of balls.
+        
+        Optional named:
+        seed (int): The seed for the random initial velocities.
+            Default: 0
+        broadphase (str or None): The broadphase used by the
+                simulation (see the documentation of
+                MultiBallSimulation).
+            Default: None
+        g_mult (real numeric value): Multiplier for the gravitational
+                field of runSimulation2().
+            Default: 1
+        event_queue_type (str): The event queue used by the
+                simulation (see the documentation of
+                MultiBallSimulation).
+            Default: "heap"
+    
+    Returns:
+    2-tuple whose index 0 contains the MultiBallSimulation and whose
+    index 1 contains the time interval corresponding to one animation
+    frame in terms of its time measure.
+    """
+    rng = random.Random(seed)
+    d = 50
+    sim = MultiBallSimulation(box_dims=(d, d),\
+            g=10 * g_mult / _FRAMERATE ** 2, broadphase=broadphase,\
+            event_queue_type=event_queue_type)
+    m_lst, r0_lst, v0_lst = [], [], []
+    for i2 in range(1, n_rows * 2, 2):
+        for i1 in range(1, d - 1, 3):
+            m_lst.append(i2 ** 2)
+            r0_lst.append((i1, i2))
+            v0_lst.append((rng.uniform(-20, 20) / _FRAMERATE,\
+                    rng.uniform(-20, 20) / _FRAMERATE))
+    sim.addBalls(m_lst, 1, r0_lst, v0_lst)
+    return sim, 1
+
+def packingSimulation(
+    n_balls: int,
+    packing_fraction: Real,
+    n_dims: int=2,
+    g: Real=0,
+    mass_ratio: Real=1,
+    seed: int=0,
+    broadphase: Optional[str]="cell_grid",
+    cache_dir: Optional[str]=None,
+    event_queue_type: str="heap",
+    box_aspect: Optional[Tuple[Real]]=None,
+    reduced_precision: bool=False,
+) -> Tuple[Union[MultiBallSimulation, Real]]:
+    """
+    Random packing of equal balls of radius 1 at unit temperature (see
+    generateRandomPacking() in the initial_conditions module), with
+    every other ball having mass mass_ratio and the rest mass 1.
+    
+    Args:
+        Required positional:
+        n_balls (strictly positive int): The number of balls.
+        packing_fraction (real numeric value strictly between 0 and
+                1): The proportion of the volume of the box occupied
+                by the balls.
+        
+        Optional named:
+        n_dims (strictly positive int): The number of spatial
+                dimensions.
+            Default: 2
+        g (real numeric value): The magnitude of the gravitational
+                field, which is antiparallel to the final basis vector.
+            Default: 0
+        mass_ratio (strictly positive real numeric value): The ratio of
+                the masses of the two species of ball.
+            Default: 1
+        seed (int): The seed for the initial conditions.
+            Default: 0
+        broadphase (str or None): The broadphase used by the
+                simulation (see the documentation of
+                MultiBallSimulation).
+            Default: "cell_grid"
+        cache_dir (str or None): Passed to generateRandomPacking().
+            Default: None
+        event_queue_type (str): The event queue used by the
+                simulation (see the documentation of
+                MultiBallSimulation).
+            Default: "heap"
+        box_aspect (n-tuple of strictly positive real numeric values
+                or None): Passed to generateRandomPacking().
+            Default: None
+        reduced_precision (bool): Whether the simulation stores the
+                states of the balls in single precision (see the
+                documentation of MultiBallSimulation).
+            Default: False
+    
+    Returns:
+    2-tuple whose index 0 contains the MultiBallSimulation and whose
+    index 1 contains a time interval of the order of a tenth of the
+    typical time taken for a ball to travel its own diameter.
+    """
+    box_dims, m, radius, r0, v0 = generateRandomPacking(n_balls, n_dims,\
+            packing_fraction, box_aspect=box_aspect, seed=seed,\
+            cache_dir=cache_dir)
+    if mass_ratio != 1:
+        m = np.where(np.arange(n_balls) % 2, float(mass_ratio), 1.)
+        v0 = maxwellBoltzmannVelocities(m, n_dims, 1,\
+                np.random.default_rng(seed))
+    sim = MultiBallSimulation(box_dims, g=-g, broadphase=broadphase,\
+            event_queue_type=event_queue_type,\
+            reduced_precision=reduced_precision)
+    sim.addBalls(m, radius, r0, v0, check_overlap=False)
+    return sim, 0.2
+
+def _heapSizes(sim: MultiBallSimulation) -> Dict[str, int]:
+    """
+    Gives the sizes of the event structures of a simulation.
+    """
+    bc_heaps = getattr(sim, "balls_collision_heaps", {})
+    event_queue = getattr(sim, "event_queue", None)
+    return {
+        "event_queue_size": 0 if event_queue is None else\
+                len(event_queue),
+        "balls_collision_heap_entries": sum(len(heap) for heap in\
+                bc_heaps.values()),
+        "max_balls_collision_heap": max((len(heap) for heap in\
+                bc_heaps.values()), default=0),
+    }
+
+def benchmarkSimulation(
+    build: Any,
+    min_events: int=20000,
+    max_seconds: Real=10,
+    max_steps: int=10 ** 6,
+    check_overlap: bool=False,
+    measure_memory: bool=True,
+) -> Dict[str, Any]:
+    """
+    Measures the throughput of a simulation, built by the callable
+    build (taking no arguments and returning the simulation and the
+    time interval by which it is to be progressed per step, as for
+    the scenario functions of this module).
+    
+    The simulation is built, its event structures initialised (by
+    progressing it by a time interval of zero) and then progressed
+    in steps until at least min_events events have occurred or
+    max_seconds seconds have elapsed, with each phase being timed.
+    If measure_memory is True, the simulation is then built and
+    initialised a second time with tracemalloc active to measure the
+    memory used, so that the timings are not affected by tracing.
+    
+    Args:
+        Required positional:
+        build (callable): Function with no arguments returning a
+                2-tuple containing a MultiBallSimulation and the time
+                interval of each step.
+        
+        Optional named:
+        min_events (int): The number of events after which the timed
+                run stops.
+            Default: 20000
+        max_seconds (real numeric value): The number of seconds after
+                which the timed run stops regardless of the number of
+                events.
+            Default: 10
+        max_steps (int): The maximum number of steps in the timed run.
+            Default: 10 ** 6
+        check_overlap (bool): Passed to progressTime() for each step.
+            Default: False
+        measure_memory (bool): Whether to measure memory use as
+                described above.
+            Default: True
+    
+    Returns:
+    Dictionary of results, with the throughput given as
+    "events_per_sec".
+    """
+    t0 = time.perf_counter()
+    sim, dt = build()
+    t1 = time.perf_counter()
+    sim.progressTime(0, check_overlap=False)
+    t2 = time.perf_counter()
+    heap_sizes_init = _heapSizes(sim)
+    energy0 = sim.calculateTotalMechanicalEnergy()
+    n_events = 0
+    n_steps = 0
+    t_end = t2 + max_seconds
+    t3 = t2
+    while n_events < min_events and n_steps < max_steps and t3 < t_end:
+        n_events += sim.progressTime(dt, check_overlap=check_overlap)
+        n_steps += 1
+        t3 = time.perf_counter()
+    energy1 = sim.calculateTotalMechanicalEnergy()
+    run_seconds = t3 - t2
+    res = {
+        "n_balls": len(sim.balls),
+        "n_dims": sim.n_dims,
+        "setup_seconds": t1 - t0,
+        "init_seconds": t2 - t1,
+        "run_seconds": run_seconds,
+        "n_steps": n_steps,
+        "sim_time": sim.t,
+        "events": n_events,
+        "events_per_sec": n_events / run_seconds if run_seconds > 0\
+                else 0.,
+        "energy_rel_drift": abs(energy1 - energy0) / abs(energy0)\
+                if energy0 else abs(energy1 - energy0),
+        "init_heap_sizes": heap_sizes_init,
+        "final_heap_sizes": _heapSizes(sim),
+    }
+    if measure_memory:
+        del sim
+        tracemalloc.start()
+        try:
+            sim, dt = build()
+            sim.progressTime(0, check_overlap=False)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        res["memory_bytes"] = current
+        res["peak_memory_bytes"] = peak
+        res["memory_bytes_per_ball"] = current / max(len(sim.balls), 1)
+    return res
+
+def benchmarkCases(args: argparse.Namespace) -> List[Tuple[Any]]:
+    """
+    Gives the benchmark cases specified by the command line arguments,
+    as a list of 3-tuples containing the name of the case, a
+    dictionary of its parameters and the callable that builds it (see
+    benchmarkSimulation()). Every case is repeated for each of the
+    broadphases and event queues specified, so that their throughputs
+    can be compared on the same scenario.
+    """
+    cases = []
+    for broadphase, event_queue_type in itertools.product(\
+            args.broadphase, args.event_queues):
+        for name, params, build in _benchmarkCasesForEventQueue(args,\
+                None if broadphase == "none" else broadphase,\
+                event_queue_type):
+            if len(args.broadphase) > 1:
+                name = f"{name}[broadphase={broadphase}]"
+            if len(args.event_queues) > 1:
+                name = f"{name}[event_queue={event_queue_type}]"
+            cases.append((name, {**params,\
+                    "event_queue_type": event_queue_type}, build))
+    return cases
+
+def _benchmarkCasesForEventQueue(
+    args: argparse.Namespace,
+    broadphase: Optional[str],
+    event_queue_type: str,
+) -> List[Tuple[Any]]:
+    """
+    Gives the benchmark cases specified by the command line arguments
+    (see benchmarkCases()) for a single event queue.
+    """
+    cases = []
+    if "scenario1" in args.scenarios:
+        for g_mult in args.gravity_mults:
+            params = {"scenario": "scenario1", "g_mult": g_mult,\
+                    "broadphase": broadphase}
+            cases.append((f"scenario1[g_mult={g_mult}]", params,\
+                    lambda g_mult=g_mult: scenario1Simulation(\
+                    broadphase=broadphase, g_mult=g_mult,\
+                    event_queue_type=event_queue_type)))
+    if "scenario2" in args.scenarios:
+        for n_rows, g_mult in itertools.product(args.n_rows,\
+                args.gravity_mults):
+            params = {"scenario": "scenario2", "n_rows": n_rows,\
+                    "g_mult": g_mult, "seed": args.seed,\
+                    "broadphase": broadphase}
+            cases.append((f"scenario2[n_rows={n_rows},g_mult={g_mult}]",\
+                    params, lambda n_rows=n_rows, g_mult=g_mult:\
+                    scenario2Simulation(n_rows, seed=args.seed,\
+                    broadphase=broadphase, g_mult=g_mult,\
+                    event_queue_type=event_queue_type)))
+    if "packing" in args.scenarios:
+        base = {"n_balls": args.n_balls[0],\
+                "packing_fraction": args.packing_fractions[0],\
+                "n_dims": args.n_dims[0], "g": args.gravities[0],\
+                "mass_ratio": args.mass_ratios[0]}
+        sweep = {"n_balls": args.n_balls,\
+                "packing_fraction": args.packing_fractions,\
+                "n_dims": args.n_dims, "g": args.gravities,\
+                "mass_ratio": args.mass_ratios}
+        if args.grid:
+            param_sets = [dict(zip(sweep.keys(), vals)) for vals in\
+                    itertools.product(*sweep.values())]
+        else:
+            # One parameter varied at a time from the base case (the
+            # first value given for each parameter)
+            param_sets = [base]
+            for key, vals in sweep.items():
+                for val in vals[1:]:
+                    param_sets.append({**base, key: val})
+        for param_set in param_sets:
+            if args.box_aspect is not None and\
+                    len(args.box_aspect) == param_set["n_dims"]:
+                param_set = {**param_set,\
+                        "box_aspect": tuple(args.box_aspect)}
+            params = {"scenario": "packing", **param_set,\
+                    "seed": args.seed, "broadphase": broadphase,\
+                    "reduced_precision": args.reduced_precision}
+            name = "packing[" + ",".join(f"{key}={val}" for key, val in\
+                    param_set.items()) + "]"
+            cases.append((name, params, lambda param_set=param_set:\
+                    packingSimulation(**param_set, seed=args.seed,\
+                    broadphase=broadphase, cache_dir=args.cache_dir,\
+                    event_queue_type=event_queue_type,\
+                    reduced_precision=args.reduced_precision)))
+    return cases
+
+def compareResults(
+    results: List[Dict[str, Any]],
+    baseline: List[Dict[str, Any]],
+    tolerance: Real,
+) -> Tuple[Union[List[str], int]]:
+    """
+    Compares the events per second of benchmark results against those
+    of a baseline with the same case names.
+    
+    Args:
+        Required positional:
+        results (list of dicts): The results to be compared, as
+                found in the "results" entry of the output of main().
+        baseline (list of dicts): The baseline results in the same
+                format.
+        tolerance (real numeric value): The proportion by which the
+                events per second may fall below that of the baseline
+                before being reported as a regression.
+    
+    Returns:
+    2-tuple whose index 0 contains a list of strings giving one line
+    of the comparison for each case present in both, and whose index 1
+    contains the number of regressions found.
+    """
+    baseline_dict = {res["name"]: res for res in baseline}
+    lines = []
+    n_regressions = 0
+    for res in results:
+        base = baseline_dict.get(res["name"])
+        if base is None or not base["events_per_sec"]: continue
+        ratio = res["events_per_sec"] / base["events_per_sec"]
+        flag = ""
+        if ratio < 1 - tolerance:
+            flag = "  REGRESSION"
+            n_regressions += 1
+        lines.append(f"{res['name']}: {res['events_per_sec']:.0f} vs "
+                f"{base['events_per_sec']:.0f} events/s "
+                f"(x{ratio:.2f}){flag}")
+    return lines, n_regressions
+
+def _latticeSimulation(
+    n_balls: int,
+    n_dims: int=2,
+) -> MultiBallSimulation:
+    """
+    Simulation without gravity with a cubic box just large enough to
+    hold n_balls balls of radius 0.25 at the centres of the cells of a
+    cubic lattice with unit spacing, to which these balls (with unit
+    mass and random velocities) are added by _addLatticeBalls(). The
+    balls are added separately so that the cost of adding them can be
+    measured.
+    """
+    n_side = int(np.ceil(n_balls ** (1 / n_dims) - 1e-9))
+    return MultiBallSimulation(box_dims=(n_side,) * n_dims)
+
+def _addLatticeBalls(
+    sim: MultiBallSimulation,
+    n_balls: int,
+    seed: int=0,
+) -> None:
+    """
+    Adds the balls described in _latticeSimulation() to sim.
+    """
+    n_dims = sim.n_dims
+    n_side = int(sim.box_interior_ranges[0][1])
+    grid = np.indices((n_side,) * n_dims).reshape(n_dims, -1).T
+    r0 = grid[:n_balls] + 0.5
+    v0 = np.random.default_rng(seed).uniform(-1, 1, (n_balls, n_dims))
+    sim.addBalls(1., 0.25, r0, v0, check_overlap=False)
+    return
+
+def ballMemoryFootprint(
+    n_balls: int=100000,
+    n_dims: int=2,
+) -> Dict[str, Any]:
+    """
+    Measures the memory used per ball by the Ball objects of a
+    simulation and the BallStateArrays storing their states, excluding
+    the event structures (which are measured by benchmarkSimulation()).
+    
+    The balls are those described in _latticeSimulation(), with the
+    memory measured using tracemalloc after they are added and again
+    after the position and velocity of every ball has been read (so
+    that these are cached by the Ball objects).
+    
+    Args:
+        Optional named:
+        n_balls (strictly positive int): The number of balls.
+            Default: 100000
+        n_dims (strictly positive int): The number of spatial
+                dimensions.
+            Default: 2
+    
+    Returns:
+    Dictionary of results, with the memory per ball in bytes after
+    adding the balls given as "bytes_per_ball" and after reading their
+    positions and velocities as "bytes_per_ball_cached". The size of a
+    single Ball object (excluding the objects it references) and the
+    memory per ball of the arrays of the BallStateArrays are also given
+    as "ball_object_bytes" and "state_array_bytes_per_ball".
+    """
+    sim = _latticeSimulation(n_balls, n_dims=n_dims)
+    tracemalloc.start()
+    try:
+        current0 = tracemalloc.get_traced_memory()[0]
+        _addLatticeBalls(sim, n_balls)
+        current1 = tracemalloc.get_traced_memory()[0]
+        for ball in sim.balls:
+            ball.r
+            ball.v
+        current2 = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    arrs = sim.ball_state_arrays
+    arr_bytes = sum(arr.nbytes for arr in (arrs._m_arr,\
+            arrs._radius_arr, arrs._t0_arr, arrs._r0_arr, arrs._v0_arr,\
+            arrs._t_wall_arr, arrs._t_wall_axes_arr, arrs._wall_axis_arr))
+    return {
+        "n_balls": n_balls,
+        "n_dims": n_dims,
+        "bytes_per_ball": (current1 - current0) / n_balls,
+        "bytes_per_ball_cached": (current2 - current0) / n_balls,
+        "ball_object_bytes": sys.getsizeof(sim.balls[0]),
+        "state_array_bytes_per_ball": arr_bytes / n_balls,
+    }
+
+def ballAttributeAccessBenchmark(
+    n_balls: int=10000,
+    n_dims: int=2,
+    repeats: int=5,
+) -> Dict[str, Real]:
+    """
+    Measures the time taken to access commonly used attributes of the
+    Ball objects of a simulation (containing the balls described in
+    _latticeSimulation()), and to calculate the position at a time
+    other than the current time (for which the cached position cannot
+    be used).
+    
+    Each attribute is read from every ball in turn, with the time per
+    access taken to be the shortest time of repeats such passes
+    divided by the number of balls.
+    
+    Args:
+        Optional named:
+        n_balls (strictly positive int): The number of balls.
+            Default: 10000
+        n_dims (strictly positive int): The number of spatial
+                dimensions.
+            Default: 2
+        repeats (strictly positive int): The number of passes over the
+                balls for each attribute.
+            Default: 5
+    
+    Returns:
+    Dictionary whose keys are the names of the attributes (and
+    "positionAtTime") and whose values are the times per access in
+    nanoseconds.
+    """
+    sim = _latticeSimulation(n_balls, n_dims=n_dims)
+    _addLatticeBalls(sim, n_balls)
+    balls = sim.balls
+    t = sim.t + 0.5
+    funcs = {name: operator.attrgetter(name) for name in ("m",\
+            "radius", "n_dims", "g", "centre_ranges", "t", "r", "v")}
+    funcs["positionAtTime"] = lambda ball: ball.positionAtTime(t)
+    res = {}
+    for name, func in funcs.items():
+        best = float("inf")
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            for ball in balls:
+                func(ball)
+            best = min(best, time.perf_counter() - t0)
+        res[name] = best / n_balls * 1e9
+    return res
+
+def parseArgs(argv: Optional[List[str]]=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Headless "
+            "benchmarks of the MultiBallSimulation event engine.")
+    parser.add_argument("--scenarios", nargs="+",\
+            choices=["scenario1", "scenario2", "packing"],\
+            default=["scenario1", "scenario2", "packing"])
+    parser.add_argument("--n-rows", nargs="+", type=int,\
+            default=[3, 10], help="Rows of balls for scenario2.")
+    parser.add_argument("--gravity-mults", nargs="+", type=float,\
+            default=[1.], help="Multipliers of the gravitational field "
+            "of scenario1 and scenario2.")
+    parser.add_argument("--n-balls", nargs="+", type=int,\
+            default=[1000, 250, 4000])
+    parser.add_argument("--packing-fractions", nargs="+", type=float,\
+            default=[0.2, 0.05, 0.4])
+    parser.add_argument("--n-dims", nargs="+", type=int,\
+            default=[2, 3])
+    parser.add_argument("--gravities", nargs="+", type=float,\
+            default=[0., 0.1])
+    parser.add_argument("--mass-ratios", nargs="+", type=float,\
+            default=[1., 10.])
+    parser.add_argument("--grid", action="store_true", help="Run "
+            "every combination of the packing parameters rather than "
+            "varying one at a time from the first values given.")
+    parser.add_argument("--box-aspect", nargs="+", type=float,\
+            default=None, help="Relative lengths of the sides of the box "
+            "for the packing cases with that many dimensions (e.g. 40 1 "
+            "for a long, narrow channel).")
+    parser.add_argument("--broadphase", nargs="+", default=["cell_grid"],\
+            choices=["none", *MultiBallSimulation.broadphase_options],\
+            help="Broadphases to compare, each case being run with "
+            "each of these.")
+    parser.add_argument("--event-queues", nargs="+", default=["heap"],\
+            choices=list(MultiBallSimulation.event_queue_options),\
+            help="Event queues to compare, each case being run with "
+            "each of these.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-events", type=int, default=20000)
+    parser.add_argument("--max-seconds", type=float, default=10.)
+    parser.add_argument("--check-overlap", action="store_true")
+    parser.add_argument("--reduced-precision", action="store_true",\
+            help="Store the states of the balls of the packing cases in "
+            "single precision (see MultiBallSimulation).")
+    parser.add_argument("--no-memory", action="store_true",\
+            help="Skip the (separate) tracemalloc measurement.")
+    parser.add_argument("--cache-dir", default=None, help="Directory "
+            "in which to cache generated packings.")
+    parser.add_argument("--output", "-o", default=None, help="Path of "
+            "the JSON file to which results are written.")
+    parser.add_argument("--baseline", default=None, help="Path of a "
+            "JSON file written by a previous run to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--ball-micro", action="store_true", help="Run "
+            "only the per-ball memory footprint and attribute access "
+            "benchmarks (for each of --n-dims) instead of the "
+            "simulation cases.")
+    parser.add_argument("--micro-n-balls", type=int, default=100000,\
+            help="Number of balls for --ball-micro.")
+    return parser.parse_args(argv)
+
+def _ballMicroMain(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Runs and prints the per-ball benchmarks for the command line
+    option --ball-micro, returning their results.
+    """
+    results = []
+    for n_dims in args.n_dims:
+        mem = ballMemoryFootprint(args.micro_n_balls, n_dims=n_dims)
+        access = ballAttributeAccessBenchmark(\
+                min(args.micro_n_balls, 10000), n_dims=n_dims)
+        results.append({"memory": mem, "access_ns": access})
+        print(f"{n_dims}D, {mem['n_balls']} balls: "
+                f"{mem['bytes_per_ball']:.0f} B/ball "
+                f"({mem['bytes_per_ball_cached']:.0f} B/ball with "
+                f"cached states; Ball object "
+                f"{mem['ball_object_bytes']} B, state arrays "
+                f"{mem['state_array_bytes_per_ball']:.0f} B/ball)",\
+                flush=True)
+        print("    " + ", ".join(f"{name} {ns:.0f} ns" for name, ns in\
+                access.items()), flush=True)
+    return results
+
+def main(argv: Optional[List[str]]=None) -> int:
+    args = parseArgs(argv)
+    if args.ball_micro:
+        results = _ballMicroMain(args)
+        if args.output is not None:
+            with open(args.output, "w") as f:
+                json.dump({"ball_micro": results}, f, indent=2)
+        return 0
+    results = []
+    for name, params, build in benchmarkCases(args):
+        res = benchmarkSimulation(build, min_events=args.min_events,\
+                max_seconds=args.max_seconds,\
+                check_overlap=args.check_overlap,\
+                measure_memory=not args.no_memory)
+        results.append({"name": name, "params": params, **res})
+        mem_str = f", {res['memory_bytes_per_ball']:.0f} B/ball" if\
+                "memory_bytes_per_ball" in res else ""
+        print(f"{name}: {res['n_balls']} balls, {res['events']} events "
+                f"in {res['run_seconds']:.2f}s = "
+                f"{res['events_per_sec']:.0f} events/s (init "
+                f"{res['init_seconds']:.2f}s{mem_str}, energy drift "
+                f"{res['energy_rel_drift']:.1e})", flush=True)
+    output = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2)
+    if args.baseline is None: return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    lines, n_regressions = compareResults(results, baseline,\
+            args.tolerance)
+    print("\nComparison against baseline:")
+    for line in lines:
+        print(line)
+    print(f"{n_regressions} regression(s) beyond tolerance "
+            f"{args.tolerance}")
+    return 1 if n_regressions and args.fail_on_regression else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
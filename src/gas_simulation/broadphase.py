@@ -0,0 +1,1143 @@
+#!/usr/bin/env python3
+
+from typing import (
+    Optional,
+    Tuple,
+    List,
+)
+
+import itertools
+import math
+
+import numpy as np
+from sortedcontainers import SortedList
+
+from gas_simulation.utils import Real
+
+def timeToLeaveInterval(
+    r: Real,
+    v: Real,
+    a: Real,
+    lo: Optional[Real],
+    hi: Optional[Real],
+) -> Tuple[Real, int]:
+    """
+    For a point moving along the real line under a constant
+    acceleration, currently at position r with velocity v and
+    acceleration a, finds the time interval after which it will next
+    leave the closed interval with lower bound lo and upper bound hi
+    (passing outwards through one of these bounds).
+    
+    Only crossings in which the point is moving outwards are
+    considered, so a point that is currently exactly on (or due to
+    rounding, marginally beyond) a bound but moving back into the
+    interval is not treated as leaving it.
+    
+    Args:
+        Required positional:
+        r (real numeric value): The current position of the point.
+        v (real numeric value): The current velocity of the point.
+        a (real numeric value): The constant acceleration of the
+                point.
+        lo (real numeric value or None): The lower bound of the
+                interval. If given as None, the interval is treated
+                as being unbounded below.
+        hi (real numeric value or None): The upper bound of the
+                interval. If given as None, the interval is treated
+                as being unbounded above.
+    
+    Returns:
+    2-tuple whose index 0 contains a non-negative real numeric value
+    giving the time interval after which the point leaves the interval
+    and whose index 1 contains 0 if it leaves through the lower bound
+    and 1 if it leaves through the upper bound. If the point never
+    leaves the interval, then (float("inf"), -1) is returned.
+    """
+    res = (float("inf"), -1)
+    # The time of an outward crossing of a bound at displacement d from
+    # the point is the root of r + v * t + a * t ** 2 / 2 = r + d at
+    # which the velocity is directed outwards, namely
+    # (-v +/- sqrt(discr)) / a for the upper and lower bound
+    # respectively. To avoid catastrophic cancellation, for small
+    # accelerations (or a point on the bound) this is calculated in
+    # the equivalent form 2 * d / (v +/- sqrt(discr)) when v is
+    # directed outwards (so that the terms of the denominator do not
+    # cancel), and otherwise in the original form (where the terms of
+    # the numerator do not cancel and a is necessarily non-zero if the
+    # bound is reached). Note that both forms are required, as a point
+    # on (or, due to rounding, marginally beyond) a bound moving
+    # inwards may still return to it under the acceleration.
+    if hi is not None:
+        d = hi - r
+        discr = v ** 2 + 2 * a * d
+        if discr >= 0:
+            if v >= 0:
+                denom = v + math.sqrt(discr)
+                dt = 2 * d / denom if denom > 0 else float("inf")
+            else:
+                dt = (math.sqrt(discr) - v) / a if a > 0 else\
+                        float("inf")
+            if dt < 0:
+                dt = 0 if v > 0 else float("inf")
+            if dt < res[0]:
+                res = (dt, 1)
+    if lo is not None:
+        d = lo - r
+        discr = v ** 2 + 2 * a * d
+        if discr >= 0:
+            if v <= 0:
+                denom = v - math.sqrt(discr)
+                dt = 2 * d / denom if denom < 0 else float("inf")
+            else:
+                dt = -(v + math.sqrt(discr)) / a if a < 0 else\
+                        float("inf")
+            if dt < 0:
+                dt = 0 if v < 0 else float("inf")
+            if dt < res[0]:
+                res = (dt, 0)
+    return res
+
+def findOverlappingPairs(
+    positions: np.ndarray,
+    radii: np.ndarray,
+) -> Tuple[np.ndarray]:
+    """
+    Finds every pair of balls that overlap with each other (i.e. for
+    which the distance between their centres is strictly less than the
+    sum of their radii) using a vectorised sort-and-sweep.
+    
+    The balls are sorted by the lower end of their extent along the
+    basis vector along which their centres are most spread out, so that
+    the only balls that can overlap with a given ball are those that
+    follow it in this order and whose extent along that basis vector
+    starts before the end of the extent of the given ball. Only these
+    candidate pairs are examined, so for balls that are not heavily
+    clustered along that basis vector, far fewer than all pairs of
+    balls need to be examined.
+    
+    Args:
+        Required positional:
+        positions (2D numpy array of floats): Array whose rows are the
+                position vectors of the centres of the balls.
+        radii (1D numpy array of floats): The radius of each ball (in
+                the same order as the rows of positions).
+    
+    Returns:
+    4-tuple of 1D numpy arrays, each containing one element for each
+    overlapping pair, where index 0 and index 1 contain the row indices
+    in positions of the two balls in the pair (with that in index 0
+    being smaller), index 2 contains the sum of their radii and index 3
+    contains the square of the distance between their centres. The
+    pairs are sorted by the index in index 0 then that in index 1.
+    """
+    n = len(radii)
+    if n < 2:
+        empty_int = np.zeros(0, dtype=np.intp)
+        empty_float = np.zeros(0, dtype=float)
+        return empty_int, empty_int, empty_float, empty_float
+    axis_idx = int(np.argmax(np.ptp(positions, axis=0)))
+    x = positions[:, axis_idx]
+    order = np.argsort(x - radii, kind="stable")
+    lo = (x - radii)[order]
+    hi = (x + radii)[order]
+    # For the ball at each position in the sorted order, the candidates
+    # are the subsequent balls up to (but not including) the first
+    # ball whose extent starts at or after the end of its extent
+    end = np.searchsorted(lo, hi, side="left")
+    counts = np.maximum(end - np.arange(1, n + 1), 0)
+    k1 = np.repeat(np.arange(n), counts)
+    starts = np.cumsum(counts) - counts
+    k2 = np.arange(len(k1)) - np.repeat(starts, counts) + k1 + 1
+    idx1, idx2 = order[k1], order[k2]
+    rad_sum = radii[idx1] + radii[idx2]
+    d_sq = ((positions[idx1] - positions[idx2]) ** 2).sum(axis=1)
+    keep = np.flatnonzero(d_sq < rad_sum ** 2)
+    idx1, idx2 = idx1[keep], idx2[keep]
+    idx1, idx2 = np.minimum(idx1, idx2), np.maximum(idx1, idx2)
+    sort_inds = np.lexsort((idx2, idx1))
+    return idx1[sort_inds], idx2[sort_inds], rad_sum[keep][sort_inds],\
+            d_sq[keep][sort_inds]
+
+class UniformCellGrid(object):
+    """
+    Broadphase for a MultiBallSimulation that partitions the
+    n-hyperrectangular box of the simulation into a uniform grid of
+    n-hyperrectangular cells and tracks which cell the centre of each
+    Ball object in the simulation is in.
+    
+    The cells are chosen so that along every basis vector their width
+    is no less than the sum of the radii of any pair of Ball objects
+    in the simulation. As such, two Ball objects can only be in
+    contact if the cells containing their centres are either the same
+    or adjacent (including diagonally), so the candidates for the next
+    collision of a Ball object with another Ball object need only be
+    sought among the Ball objects whose centres are in the 3 ** n
+    cells surrounding (and including) its own cell, as long as those
+    candidates are re-examined whenever it or any other Ball object
+    moves from one cell to another (referred to as a cell crossing).
+    The times of the cell crossings are calculated from the
+    trajectories of the Ball objects so that they can be scheduled
+    alongside the collisions in the simulation.
+    
+    The cells are labelled by n-tuples of non-negative integers, where
+    the cell with label (c_0, c_1, ..., c_(n - 1)) is the set of points
+    whose position vectors have component along the i:th basis vector
+    between c_i and (c_i + 1) multiples of the width of the cells along
+    that basis vector.
+    
+    Initialisation args:
+        
+        Required positional:
+        
+        sim (MultiBallSimulation): The simulation whose Ball objects
+                are to be tracked.
+        
+        Optional named:
+        
+        min_cell_width (real numeric value or None): If given as a
+                real numeric value, the minimum width of the cells
+                along any basis vector in terms of the simulation's
+                distance units. The width actually used is the larger
+                of this and twice the largest radius of any Ball
+                object in the simulation.
+            Default: None
+    
+    Attributes:
+        
+        sim (MultiBallSimulation): The simulation whose Ball objects
+                are tracked.
+        n_cells (n-tuple of strictly positive ints): The number of
+                cells along each basis vector.
+        cell_dims (n-tuple of strictly positive real numeric values):
+                The width of the cells along each basis vector in
+                terms of the simulation's distance units.
+        cells (dict): Dictionary whose keys are labels of the cells
+                containing the centre of at least one Ball object,
+                with corresponding value the set of indices in the
+                attribute balls of the simulation of the Ball objects
+                whose centre is in that cell.
+        ball_cells (list of n-tuples of ints): The label of the cell
+                containing the centre of each Ball object in the
+                simulation (in the same order as the attribute balls of
+                the simulation).
+        next_crossings (list of tuples): For each Ball object in the
+                simulation (in the same order as the attribute balls of
+                the simulation), either a 3-tuple containing the time
+                of the next cell crossing of that Ball object on its
+                current trajectory (index 0), the index of the basis
+                vector normal to the cell boundary crossed (index 1)
+                and 0 or 1 depending on whether the crossing is
+                antiparallel or parallel to that basis vector
+                respectively (index 2), or an empty tuple if the Ball
+                object is never due to leave its current cell.
+    
+    Methods:
+        (For full description, see documentation of the method itself)
+        
+        initialise(): Sets up the grid based on the current state of
+                the simulation.
+        cellOfPosition(): Finds the label of the cell containing a
+                given position vector.
+        calculateNextCellCrossing(): Calculates the details of the next
+                cell crossing of a Ball object on its current
+                trajectory.
+        updateBall(): Recalculates the next cell crossing of a Ball
+                object following a change in its trajectory.
+        applyNextCellCrossing(): Moves a Ball object into the cell it
+                is next due to enter.
+        candidates(): Gives the indices of the Ball objects whose
+                centres are in the cells neighbouring that of a given
+                Ball object.
+    """
+    def __init__(
+        self,
+        sim: "MultiBallSimulation",
+        min_cell_width: Optional[Real]=None,
+    ):
+        self._sim = sim
+        self._min_cell_width = min_cell_width
+        self.initialise()
+    
+    @property
+    def sim(self):
+        return self._sim
+    
+    @property
+    def n_cells(self):
+        return self._n_cells
+    
+    @property
+    def cell_dims(self):
+        return self._cell_dims
+    
+    def initialise(self) -> None:
+        """
+        Sets (or resets) the dimensions of the cells and the cell
+        of every Ball object in the simulation, and calculates the
+        next cell crossing of each, based on their trajectories at the
+        current time of the simulation.
+        
+        Returns:
+        None
+        """
+        sim = self.sim
+        max_rad = max((ball.radius for ball in sim.balls), default=0)
+        width = max(2 * max_rad, self._min_cell_width or 0)
+        self._n_cells = tuple(max(1, int(x // width)) if width > 0\
+                else 1 for x in sim.box_dims)
+        self._cell_dims = tuple(x / n for x, n in\
+                zip(sim.box_dims, self._n_cells))
+        self._neighbour_offsets = tuple(itertools.product(\
+                (-1, 0, 1), repeat=sim.n_dims))
+        self.cells = {}
+        self.ball_cells = []
+        self.next_crossings = []
+        for idx, ball in enumerate(sim.balls):
+            cell = self.cellOfPosition(ball.positionAtTime(sim.t))
+            self.ball_cells.append(cell)
+            self.cells.setdefault(cell, set()).add(idx)
+            self.next_crossings.append(\
+                    self.calculateNextCellCrossing(idx, sim.t))
+        return
+    
+    def cellOfPosition(self, r: Tuple[Real]) -> Tuple[int]:
+        """
+        Finds the label of the cell containing the point with position
+        vector r.
+        
+        Args:
+            Required positional:
+            r (n-tuple of real numeric values): The position vector
+                    of the point in question.
+        
+        Returns:
+        n-tuple of ints giving the label of the cell containing the
+        point. Points outside the box are treated as belonging to the
+        nearest cell.
+        """
+        return tuple(min(n - 1, max(0, int(x // w))) for x, w, n in\
+                zip(r, self._cell_dims, self._n_cells))
+    
+    def calculateNextCellCrossing(
+        self,
+        idx: int,
+        t: Real,
+    ) -> Tuple[Real]:
+        """
+        Calculates the details of the next cell crossing after time t
+        of the Ball object at index idx of the attribute balls of the
+        simulation, assuming it follows its current trajectory.
+        
+        Args:
+            Required positional:
+            idx (int): The index of the Ball object in question in the
+                    attribute balls of the simulation.
+            t (real numeric value): The time (in terms of the
+                    simulation's time measure) from which the next
+                    cell crossing is to be found.
+        
+        Returns:
+        If the Ball object is due to leave its current cell, a 3-tuple
+        containing the time of the crossing (index 0), the index of the
+        basis vector normal to the cell boundary crossed (index 1) and
+        0 or 1 depending on whether the crossing is antiparallel or
+        parallel to that basis vector respectively (index 2).
+        Otherwise, an empty tuple.
+        """
+        ball = self.sim.balls[idx]
+        r, v = ball.positionAndVelocityAtTime(t)
+        cell = self.ball_cells[idx]
+        res = (float("inf"), -1, -1)
+        for i, (x, u, a, c, w, n) in enumerate(zip(r, v, ball.g, cell,\
+                self._cell_dims, self._n_cells)):
+            if n == 1: continue
+            lo = c * w if c else None
+            hi = (c + 1) * w if c < n - 1 else None
+            dt, side = timeToLeaveInterval(x, u, a, lo, hi)
+            if dt < res[0]:
+                res = (dt, i, side)
+        if res[1] < 0: return ()
+        return (t + res[0], res[1], res[2])
+    
+    def updateBall(self, idx: int) -> None:
+        """
+        Recalculates the next cell crossing of the Ball object at index
+        idx of the attribute balls of the simulation. This should be
+        used whenever the trajectory of that Ball object changes.
+        
+        Args:
+            Required positional:
+            idx (int): The index of the Ball object in question in the
+                    attribute balls of the simulation.
+        
+        Returns:
+        None
+        """
+        self.next_crossings[idx] = self.calculateNextCellCrossing(idx,\
+                self.sim.balls[idx]._t0)
+        return
+    
+    def applyNextCellCrossing(self, idx: int) -> Real:
+        """
+        Moves the Ball object at index idx of the attribute balls of
+        the simulation into the cell it is next due to enter and
+        calculates its subsequent cell crossing.
+        
+        Args:
+            Required positional:
+            idx (int): The index of the Ball object in question in the
+                    attribute balls of the simulation.
+        
+        Returns:
+        Real numeric value giving the time of the cell crossing (in
+        terms of the simulation's time measure).
+        """
+        t, axis_idx, side = self.next_crossings[idx]
+        cell = self.ball_cells[idx]
+        cell_set = self.cells[cell]
+        cell_set.discard(idx)
+        if not cell_set: self.cells.pop(cell)
+        cell = list(cell)
+        cell[axis_idx] += 1 if side else -1
+        cell = tuple(cell)
+        self.ball_cells[idx] = cell
+        self.cells.setdefault(cell, set()).add(idx)
+        self.next_crossings[idx] = self.calculateNextCellCrossing(idx, t)
+        return t
+    
+    def candidates(self, idx: int) -> List[int]:
+        """
+        Gives the indices in the attribute balls of the simulation of
+        the Ball objects (other than the one at index idx) whose
+        centres are in the same cell as or a cell adjacent to the cell
+        containing the centre of the Ball object at index idx. These
+        are the only Ball objects that can collide with that Ball
+        object before either undergoes a cell crossing.
+        
+        Args:
+            Required positional:
+            idx (int): The index of the Ball object in question in the
+                    attribute balls of the simulation.
+        
+        Returns:
+        List of ints giving the indices of the candidate Ball objects.
+        """
+        cell = self.ball_cells[idx]
+        res = []
+        for offset in self._neighbour_offsets:
+            cell2 = tuple(x + y for x, y in zip(cell, offset))
+            cell_set = self.cells.get(cell2)
+            if cell_set: res.extend(cell_set)
+        res.remove(idx)
+        return res
+
+class HierarchicalCellGrid(object):
+    """
+    Broadphase for a MultiBallSimulation containing Ball objects of
+    widely differing radii, which partitions the n-hyperrectangular box
+    of the simulation into several uniform grids of n-hyperrectangular
+    cells (the levels of the grid), with the width of the cells
+    doubling from each level to the next, and tracks which cell of
+    its level the centre of each Ball object is in.
+    
+    Each Ball object is assigned to the level with the smallest cells
+    whose width along every basis vector is no less than its diameter,
+    so that the number of Ball objects per cell (and so the number of
+    candidates for its collisions) reflects the local density of Ball
+    objects of comparable size, rather than the cells being sized for
+    the largest Ball object as for UniformCellGrid. For a Ball object
+    in a given cell, the candidates on each level are the Ball objects
+    in the cells of that level closer to its cell than the sum of its
+    radius and the largest radius of any Ball object on that level, as
+    any other Ball object on that level cannot be in contact with it
+    before one of the two undergoes a cell crossing. On its own level
+    (and in a simulation whose Ball objects all have the same radius),
+    these are the cells adjacent to (or the same as) its own cell, as
+    for UniformCellGrid.
+    
+    The cells of each level are labelled as for UniformCellGrid.
+    
+    Initialisation args:
+        
+        Required positional:
+        
+        sim (MultiBallSimulation): The simulation whose Ball objects
+                are to be tracked.
+        
+        Optional named:
+        
+        min_cell_width (real numeric value or None): If given as a
+                real numeric value, the minimum width of the cells of
+                the lowest level along any basis vector in terms of
+                the simulation's distance units. The width actually
+                used is the larger of this and twice the smallest
+                radius of any Ball object in the simulation.
+            Default: None
+    
+    Attributes:
+        
+        sim (MultiBallSimulation): The simulation whose Ball objects
+                are tracked.
+        levels (tuple of ints): The levels containing at least one
+                Ball object, in increasing order, where level l has
+                cells of width (before rounding to fit the box) 2 ** l
+                times that of level 0.
+        n_cells (dict): Dictionary whose keys are the levels in the
+                attribute levels, with corresponding value the number
+                of cells of that level along each basis vector (as an
+                n-tuple of strictly positive ints).
+        cell_dims (dict): Dictionary whose keys are the levels in the
+                attribute levels, with corresponding value the width of
+                the cells of that level along each basis vector (as an
+                n-tuple of strictly positive real numeric values).
+        cells (dict): Dictionary whose keys are the levels in the
+                attribute levels, with corresponding value a dictionary
+                whose keys are labels of the cells of that level
+                containing the centre of at least one Ball object on
+                that level, with corresponding value the set of indices
+                in the attribute balls of the simulation of those Ball
+                objects.
+        ball_levels (list of ints): The level of each Ball object in
+                the simulation (in the same order as the attribute
+                balls of the simulation).
+        ball_cells (list of n-tuples of ints): The label of the cell
+                of its level containing the centre of each Ball object
+                in the simulation (in the same order as the attribute
+                balls of the simulation).
+        next_crossings (list of tuples): For each Ball object in the
+                simulation, the details of its next cell crossing in
+                the same format as for UniformCellGrid.
+    
+    Methods:
+        (For full description, see documentation of the method itself)
+        
+        initialise(): Sets up the grid based on the current state of
+                the simulation.
+        cellOfPosition(): Finds the label of the cell of a given level
+                containing a given position vector.
+        calculateNextCellCrossing(): Calculates the details of the next
+                cell crossing of a Ball object on its current
+                trajectory.
+        updateBall(): Recalculates the next cell crossing of a Ball
+                object following a change in its trajectory.
+        applyNextCellCrossing(): Moves a Ball object into the cell it
+                is next due to enter.
+        candidates(): Gives the indices of the Ball objects on any
+                level that may come into contact with a given Ball
+                object before either undergoes a cell crossing.
+    """
+    def __init__(
+        self,
+        sim: "MultiBallSimulation",
+        min_cell_width: Optional[Real]=None,
+    ):
+        self._sim = sim
+        self._min_cell_width = min_cell_width
+        self.initialise()
+    
+    @property
+    def sim(self):
+        return self._sim
+    
+    @property
+    def levels(self):
+        return self._levels
+    
+    @property
+    def n_cells(self):
+        return self._n_cells
+    
+    @property
+    def cell_dims(self):
+        return self._cell_dims
+    
+    def initialise(self) -> None:
+        """
+        Sets (or resets) the levels of the grid, the level and cell of
+        every Ball object in the simulation, and calculates the next
+        cell crossing of each, based on their trajectories at the
+        current time of the simulation.
+        
+        Returns:
+        None
+        """
+        sim = self.sim
+        radii = sim.ball_state_arrays.radius.tolist()
+        width0 = max(2 * min(radii, default=0), self._min_cell_width or 0)
+        self.ball_levels = []
+        self._max_radius = {}
+        for rad in radii:
+            level = 0
+            if width0 > 0:
+                while width0 * 2 ** level < 2 * rad:
+                    level += 1
+            self.ball_levels.append(level)
+            self._max_radius[level] = max(rad,\
+                    self._max_radius.get(level, 0))
+        self._levels = tuple(sorted(self._max_radius.keys()))
+        self._n_cells = {}
+        self._cell_dims = {}
+        for level in self._levels:
+            width = width0 * 2 ** level
+            n_cells = tuple(max(1, int(x // width)) if width > 0 else 1\
+                    for x in sim.box_dims)
+            self._n_cells[level] = n_cells
+            self._cell_dims[level] = tuple(x / n for x, n in\
+                    zip(sim.box_dims, n_cells))
+        self.cells = {level: {} for level in self._levels}
+        self.ball_cells = []
+        self.next_crossings = []
+        for idx, ball in enumerate(sim.balls):
+            level = self.ball_levels[idx]
+            cell = self.cellOfPosition(ball.positionAtTime(sim.t), level)
+            self.ball_cells.append(cell)
+            self.cells[level].setdefault(cell, set()).add(idx)
+            self.next_crossings.append(\
+                    self.calculateNextCellCrossing(idx, sim.t))
+        return
+    
+    def cellOfPosition(self, r: Tuple[Real], level: int) -> Tuple[int]:
+        """
+        Finds the label of the cell of a given level containing the
+        point with position vector r.
+        
+        Args:
+            Required positional:
+            r (n-tuple of real numeric values): The position vector
+                    of the point in question.
+            level (int): The level in question, which must be one of
+                    those in the attribute levels.
+        
+        Returns:
+        n-tuple of ints giving the label of the cell containing the
+        point. Points outside the box are treated as belonging to the
+        nearest cell.
+        """
+        return tuple(min(n - 1, max(0, int(x // w))) for x, w, n in\
+                zip(r, self._cell_dims[level], self._n_cells[level]))
+    
+    def calculateNextCellCrossing(
+        self,
+        idx: int,
+        t: Real,
+    ) -> Tuple[Real]:
+        """
+        Calculates the details of the next cell crossing after time t
+        of the Ball object at index idx of the attribute balls of the
+        simulation, assuming it follows its current trajectory.
+        
+        Args:
+            Required positional:
+            idx (int): The index of the Ball object in question in the
+                    attribute balls of the simulation.
+            t (real numeric value): The time (in terms of the
+                    simulation's time measure) from which the next
+                    cell crossing is to be found.
+        
+        Returns:
+        The details of the next cell crossing in the same format as
+        the method calculateNextCellCrossing() of UniformCellGrid.
+        """
+        ball = self.sim.balls[idx]
+        r, v = ball.positionAndVelocityAtTime(t)
+        level = self.ball_levels[idx]
+        cell = self.ball_cells[idx]
+        res = (float("inf"), -1, -1)
+        for i, (x, u, a, c, w, n) in enumerate(zip(r, v, ball.g, cell,\
+                self._cell_dims[level], self._n_cells[level])):
+            if n == 1: continue
+            lo = c * w if c else None
+            hi = (c + 1) * w if c < n - 1 else None
+            dt, side = timeToLeaveInterval(x, u, a, lo, hi)
+            if dt < res[0]:
+                res = (dt, i, side)
+        if res[1] < 0: return ()
+        return (t + res[0], res[1], res[2])
+    
+    def updateBall(self, idx: int) -> None:
+        """
+        Recalculates the next cell crossing of the Ball object at index
+        idx of the attribute balls of the simulation. This should be
+        used whenever the trajectory of that Ball object changes.
+        
+        Args:
+            Required positional:
+            idx (int): The index of the Ball object in question in the
+                    attribute balls of the simulation.
+        
+        Returns:
+        None
+        """
+        self.next_crossings[idx] = self.calculateNextCellCrossing(idx,\
+                self.sim.balls[idx]._t0)
+        return
+    
+    def applyNextCellCrossing(self, idx: int) -> Real:
+        """
+        Moves the Ball object at index idx of the attribute balls of
+        the simulation into the cell of its level it is next due to
+        enter and calculates its subsequent cell crossing.
+        
+        Args:
+            Required positional:
+            idx (int): The index of the Ball object in question in the
+                    attribute balls of the simulation.
+        
+        Returns:
+        Real numeric value giving the time of the cell crossing (in
+        terms of the simulation's time measure).
+        """
+        t, axis_idx, side = self.next_crossings[idx]
+        level_cells = self.cells[self.ball_levels[idx]]
+        cell = self.ball_cells[idx]
+        cell_set = level_cells[cell]
+        cell_set.discard(idx)
+        if not cell_set: level_cells.pop(cell)
+        cell = list(cell)
+        cell[axis_idx] += 1 if side else -1
+        cell = tuple(cell)
+        self.ball_cells[idx] = cell
+        level_cells.setdefault(cell, set()).add(idx)
+        self.next_crossings[idx] = self.calculateNextCellCrossing(idx, t)
+        return t
+    
+    def candidates(self, idx: int) -> List[int]:
+        """
+        Gives the indices in the attribute balls of the simulation of
+        the Ball objects (other than the one at index idx), on any
+        level, whose centres are in cells closer to the cell containing
+        the centre of the Ball object at index idx than the sum of the
+        radius of that Ball object and the largest radius of any Ball
+        object on their level. These are the only Ball objects that can
+        collide with that Ball object before either undergoes a cell
+        crossing.
+        
+        Args:
+            Required positional:
+            idx (int): The index of the Ball object in question in the
+                    attribute balls of the simulation.
+        
+        Returns:
+        List of ints giving the indices of the candidate Ball objects.
+        """
+        level = self.ball_levels[idx]
+        cell = self.ball_cells[idx]
+        dims = self._cell_dims[level]
+        rad = self.sim.balls[idx].radius
+        res = []
+        for level2 in self._levels:
+            dist = rad + self._max_radius[level2]
+            ranges = []
+            n_cells_tot = 1
+            for c, w, w2, n2 in zip(cell, dims, self._cell_dims[level2],\
+                    self._n_cells[level2]):
+                lo = max(0, int((c * w - dist) // w2))
+                hi = min(n2 - 1, int(((c + 1) * w + dist) // w2))
+                ranges.append(range(lo, hi + 1))
+                n_cells_tot *= hi - lo + 1
+            level_cells = self.cells[level2]
+            if n_cells_tot <= len(level_cells):
+                for cell2 in itertools.product(*ranges):
+                    cell_set = level_cells.get(cell2)
+                    if cell_set: res.extend(cell_set)
+            else:
+                # Fewer occupied cells on this level than cells in
+                # range, so the occupied cells are examined instead
+                for cell2, cell_set in level_cells.items():
+                    if all(x in rng for x, rng in zip(cell2, ranges)):
+                        res.extend(cell_set)
+        res.remove(idx)
+        return res
+
+class SweepAndPrune(object):
+    """
+    Broadphase for a MultiBallSimulation that maintains, for each basis
+    vector, a sorted list of the extents along that basis vector of the
+    regions swept out by the Ball objects in the simulation, and
+    restricts the candidates for the next collision of a Ball object
+    with another Ball object to those whose swept regions overlap its
+    own along every basis vector.
+    
+    The swept region of each Ball object is an n-hyperrectangle
+    consisting of the points within its radius of an n-hypercube of
+    width w (the anchor of the Ball object), which is centred on the
+    centre of the Ball object at the time the anchor was last set.
+    As long as the centre of each Ball object remains within its
+    anchor, each Ball object remains within its swept region, so
+    two Ball objects can only be in contact if their swept regions
+    overlap. The anchor of a Ball object is therefore reset (centred
+    on its current position, with the sorted lists updated
+    accordingly) whenever its centre is due to leave the anchor,
+    which, as for UniformCellGrid, is referred to as a cell crossing
+    and is scheduled alongside the collisions in the simulation.
+    Unlike the cells of UniformCellGrid, the anchors move with the
+    Ball objects, so the number of candidates for each Ball object
+    reflects the local density of Ball objects regardless of the
+    shape of the box, making this suitable for highly anisotropic
+    boxes and dilute gases.
+    
+    When finding the candidates for a Ball object, the sorted list
+    used is that of the basis vector along which the fewest swept
+    regions can overlap that of the Ball object (as found by bisection
+    of each sorted list), with the remaining basis vectors then
+    checked for each of those Ball objects.
+    
+    Initialisation args:
+        
+        Required positional:
+        
+        sim (MultiBallSimulation): The simulation whose Ball objects
+                are to be tracked.
+        
+        Optional named:
+        
+        min_cell_width (strictly positive real numeric value or None):
+                If given as a real numeric value, the width w of the
+                anchors in terms of the simulation's distance units.
+                Otherwise, w is 8 times the largest radius of any
+                Ball object in the simulation. Since the swept regions
+                extend beyond the anchors by the radius of the Ball
+                object, any width is valid, with larger widths giving
+                more candidates but less frequent cell crossings.
+            Default: None
+    
+    Attributes:
+        
+        sim (MultiBallSimulation): The simulation whose Ball objects
+                are tracked.
+        anchor_width (real numeric value): The width w of the anchors
+                in terms of the simulation's distance units.
+        lo (2D numpy array of floats): Array with one row for each Ball
+                object in the simulation (in the same order as the
+                attribute balls of the simulation) giving the lower
+                bound of its swept region along each basis vector.
+        hi (2D numpy array of floats): Array of the same form as lo
+                giving the upper bound of the swept region of each
+                Ball object along each basis vector.
+        next_crossings (list of tuples): For each Ball object in the
+                simulation (in the same order as the attribute balls of
+                the simulation), either a 3-tuple containing the time
+                its centre is next due to leave its anchor on its
+                current trajectory (index 0), the index of the basis
+                vector normal to the face of the anchor crossed
+                (index 1) and 0 or 1 depending on whether the crossing
+                is antiparallel or parallel to that basis vector
+                respectively (index 2), or an empty tuple if the
+                centre is never due to leave its anchor.
+    
+    Methods:
+        (For full description, see documentation of the method itself)
+        
+        initialise(): Sets up the sorted lists based on the current
+                state of the simulation.
+        calculateNextCellCrossing(): Calculates the details of the next
+                time the centre of a Ball object is due to leave its
+                anchor on its current trajectory.
+        updateBall(): Recalculates the next cell crossing of a Ball
+                object following a change in its trajectory.
+        applyNextCellCrossing(): Resets the anchor of a Ball object
+                at the time its centre is due to leave it.
+        candidates(): Gives the indices of the Ball objects whose swept
+                regions overlap that of a given Ball object.
+    """
+    # The default width of the anchors as a multiple of the largest
+    # radius of any Ball object in the simulation
+    _default_width_radii = 8
+    
+    def __init__(
+        self,
+        sim: "MultiBallSimulation",
+        min_cell_width: Optional[Real]=None,
+    ):
+        self._sim = sim
+        self._min_cell_width = min_cell_width
+        self.initialise()
+    
+    @property
+    def sim(self):
+        return self._sim
+    
+    @property
+    def anchor_width(self):
+        return self._anchor_width
+    
+    def initialise(self) -> None:
+        """
+        Sets (or resets) the width of the anchors and the anchor of
+        every Ball object in the simulation, and calculates the next
+        cell crossing of each, based on their trajectories at the
+        current time of the simulation.
+        
+        Returns:
+        None
+        """
+        sim = self.sim
+        n_dims = sim.n_dims
+        radii = sim.ball_state_arrays.radius
+        max_rad = float(radii.max()) if len(radii) else 0.
+        self._anchor_width = self._min_cell_width\
+                if self._min_cell_width else\
+                self._default_width_radii * max_rad
+        # The largest width of any swept region, which bounds how far
+        # below the lower bound of a given swept region the lower
+        # bounds of the swept regions overlapping it may be
+        self._max_extent = self._anchor_width + 2 * max_rad
+        half_width = self._anchor_width / 2
+        positions = sim.ball_state_arrays.positionsAtTime(sim.t, sim.g)
+        self._anchors = positions.copy()
+        self.lo = positions - half_width - radii[:, np.newaxis]
+        self.hi = positions + half_width + radii[:, np.newaxis]
+        self._sorted_lo = [SortedList(zip(self.lo[:, i].tolist(),\
+                range(len(radii)))) for i in range(n_dims)]
+        self.next_crossings = [self.calculateNextCellCrossing(idx, sim.t)\
+                for idx in range(len(radii))]
+        return
+    
+    def calculateNextCellCrossing(
+        self,
+        idx: int,
+        t: Real,
+    ) -> Tuple[Real]:
+        """
+        Calculates the details of the next time after time t that the
+        centre of the Ball object at index idx of the attribute balls
+        of the simulation is due to leave its anchor, assuming it
+        follows its current trajectory.
+        
+        Args:
+            Required positional:
+            idx (int): The index of the Ball object in question in the
+                    attribute balls of the simulation.
+            t (real numeric value): The time (in terms of the
+                    simulation's time measure) from which the next
+                    cell crossing is to be found.
+        
+        Returns:
+        If the centre of the Ball object is due to leave its anchor, a
+        3-tuple containing the time of the crossing (index 0), the
+        index of the basis vector normal to the face of the anchor
+        crossed (index 1) and 0 or 1 depending on whether the crossing
+        is antiparallel or parallel to that basis vector respectively
+        (index 2). Otherwise, an empty tuple.
+        """
+        ball = self.sim.balls[idx]
+        r, v = ball.positionAndVelocityAtTime(t)
+        half_width = self._anchor_width / 2
+        res = (float("inf"), -1, -1)
+        for i, (x, u, a, c) in enumerate(zip(r, v, ball.g,\
+                self._anchors[idx].tolist())):
+            dt, side = timeToLeaveInterval(x, u, a, c - half_width,\
+                    c + half_width)
+            if dt < res[0]:
+                res = (dt, i, side)
+        if res[1] < 0: return ()
+        return (t + res[0], res[1], res[2])
+    
+    def updateBall(self, idx: int) -> None:
+        """
+        Recalculates the next cell crossing of the Ball object at index
+        idx of the attribute balls of the simulation. This should be
+        used whenever the trajectory of that Ball object changes.
+        
+        Args:
+            Required positional:
+            idx (int): The index of the Ball object in question in the
+                    attribute balls of the simulation.
+        
+        Returns:
+        None
+        """
+        self.next_crossings[idx] = self.calculateNextCellCrossing(idx,\
+                self.sim.balls[idx]._t0)
+        return
+    
+    def applyNextCellCrossing(self, idx: int) -> Real:
+        """
+        Resets the anchor of the Ball object at index idx of the
+        attribute balls of the simulation so that it is centred on the
+        position of its centre at the time it is next due to leave its
+        current anchor, updating its swept region in the sorted lists
+        accordingly, and calculates its subsequent cell crossing.
+        
+        Args:
+            Required positional:
+            idx (int): The index of the Ball object in question in the
+                    attribute balls of the simulation.
+        
+        Returns:
+        Real numeric value giving the time of the cell crossing (in
+        terms of the simulation's time measure).
+        """
+        t = self.next_crossings[idx][0]
+        ball = self.sim.balls[idx]
+        r = ball.positionAtTime(t)
+        extent = self._anchor_width / 2 + ball.radius
+        for i, x in enumerate(r):
+            sorted_lo = self._sorted_lo[i]
+            sorted_lo.remove((float(self.lo[idx, i]), idx))
+            self.lo[idx, i] = x - extent
+            self.hi[idx, i] = x + extent
+            sorted_lo.add((float(self.lo[idx, i]), idx))
+        self._anchors[idx] = r
+        self.next_crossings[idx] = self.calculateNextCellCrossing(idx, t)
+        return t
+    
+    def candidates(self, idx: int) -> List[int]:
+        """
+        Gives the indices in the attribute balls of the simulation of
+        the Ball objects (other than the one at index idx) whose swept
+        regions overlap that of the Ball object at index idx. These are
+        the only Ball objects that can collide with that Ball object
+        before either undergoes a cell crossing.
+        
+        Args:
+            Required positional:
+            idx (int): The index of the Ball object in question in the
+                    attribute balls of the simulation.
+        
+        Returns:
+        List of ints giving the indices of the candidate Ball objects.
+        """
+        lo, hi = self.lo[idx].tolist(), self.hi[idx].tolist()
+        # Along each basis vector, the swept regions that can overlap
+        # are those whose lower bound is within the following range
+        best = None
+        for i, sorted_lo in enumerate(self._sorted_lo):
+            start = sorted_lo.bisect_left((lo[i] - self._max_extent,))
+            stop = sorted_lo.bisect_right((hi[i], float("inf")))
+            if best is None or stop - start < best[2] - best[1]:
+                best = (i, start, stop)
+        i, start, stop = best
+        cand = np.fromiter((idx2 for _, idx2 in\
+                self._sorted_lo[i].islice(start, stop)), dtype=np.intp,\
+                count=stop - start)
+        mask = np.all((self.lo[cand] <= self.hi[idx]) &\
+                (self.hi[cand] >= self.lo[idx]), axis=1)
+        mask &= cand != idx
+        return cand[mask].tolist()
+
+class OrderedNeighbours(object):
+    """
+    Broadphase for a MultiBallSimulation in one spatial dimension,
+    which keeps the Ball objects in the simulation in order of the
+    positions of their centres and restricts the candidates for the
+    next collision of a Ball object with another Ball object to its
+    immediate neighbours in this order.
+    
+    In one dimension, Ball objects cannot pass each other, so this
+    order never changes and each Ball object can only collide with
+    the Ball objects either side of it (or the walls). This is
+    therefore exact, with no cell crossings to be scheduled, and the
+    number of candidates examined after each collision is at most two
+    regardless of the number of Ball objects in the simulation.
+    
+    Initialisation args:
+        
+        Required positional:
+        
+        sim (MultiBallSimulation): The simulation whose Ball objects
+                are to be tracked. Must have exactly one spatial
+                dimension.
+        
+        Optional named:
+        
+        min_cell_width (real numeric value or None): Not used, accepted
+                for consistency with the other broadphases.
+            Default: None
+    
+    Attributes:
+        
+        sim (MultiBallSimulation): The simulation whose Ball objects
+                are tracked.
+        order (list of ints): The indices in the attribute balls of
+                the simulation of the Ball objects in increasing order
+                of the positions of their centres.
+        ranks (list of ints): For each Ball object in the simulation
+                (in the same order as the attribute balls of the
+                simulation), its index in the attribute order.
+        next_crossings (list of tuples): An empty tuple for each Ball
+                object in the simulation, as the Ball objects never
+                change order (included for consistency with the other
+                broadphases).
+    
+    Methods:
+        (For full description, see documentation of the method itself)
+        
+        initialise(): Sets up the order of the Ball objects based on
+                the current state of the simulation.
+        updateBall(): Included for consistency with the other
+                broadphases, with no effect.
+        candidates(): Gives the indices of the Ball objects either side
+                of a given Ball object.
+    """
+    def __init__(
+        self,
+        sim: "MultiBallSimulation",
+        min_cell_width: Optional[Real]=None,
+    ):
+        if sim.n_dims != 1:
+            raise ValueError("OrderedNeighbours can only be used for "\
+                    f"simulations with one spatial dimension, got "\
+                    f"{sim.n_dims}")
+        self._sim = sim
+        self.initialise()
+    
+    @property
+    def sim(self):
+        return self._sim
+    
+    def initialise(self) -> None:
+        """
+        Sets (or resets) the order of the Ball objects in the
+        simulation based on the positions of their centres at the
+        current time of the simulation.
+        
+        Returns:
+        None
+        """
+        sim = self.sim
+        positions = sim.ball_state_arrays.positionsAtTime(sim.t, sim.g)
+        self.order = np.argsort(positions[:, 0], kind="stable").tolist()
+        self.ranks = [0] * len(self.order)
+        for rank, idx in enumerate(self.order):
+            self.ranks[idx] = rank
+        self.next_crossings = [()] * len(self.order)
+        return
+    
+    def updateBall(self, idx: int) -> None:
+        """
+        Included for consistency with the other broadphases. As a
+        change in the trajectory of a Ball object does not change the
+        order of the Ball objects, this has no effect.
+        
+        Args:
+            Required positional:
+            idx (int): The index of the Ball object in question in the
+                    attribute balls of the simulation.
+        
+        Returns:
+        None
+        """
+        return
+    
+    def candidates(self, idx: int) -> List[int]:
+        """
+        Gives the indices in the attribute balls of the simulation of
+        the Ball objects immediately either side of the Ball object at
+        index idx, which are the only Ball objects it can collide with.
+        
+        Args:
+            Required positional:
+            idx (int): The index of the Ball object in question in the
+                    attribute balls of the simulation.
+        
+        Returns:
+        List of ints giving the indices of the candidate Ball objects
+        (with at most two elements).
+        """
+        rank = self.ranks[idx]
+        order = self.order
+        res = [order[rank - 1]] if rank else []
+        if rank + 1 < len(order):
+            res.append(order[rank + 1])
+        return res
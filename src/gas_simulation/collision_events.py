@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+from typing import (
+    NamedTuple,
+    Tuple,
+)
+
+class CollisionEvent(NamedTuple):
+    """
+    Description of a collision processed by a MultiBallSimulation, as
+    passed to the observers of the simulation (see the method
+    addObserver() of MultiBallSimulation) and yielded by its method
+    events().
+    
+    Attributes:
+        
+        t (float): The time of the collision in terms of the
+                simulation's time measure (which is the new reference
+                time of the Ball objects involved).
+        idx1 (int): The index in the attribute balls of the simulation
+                of the (first) Ball object involved.
+        idx2 (int): For a collision between two Ball objects, the
+                index of the second Ball object involved. For a
+                collision between a Ball object and a wall, -1.
+        wall (int): For a collision between a Ball object and a wall,
+                the index of the wall, which for the walls normal to
+                the basis vector with index i is 2 * i for the wall
+                at which that component of position is 0 and 2 * i + 1
+                for the opposite wall. For a collision between two Ball
+                objects, -1.
+        impulse (tuple of floats): The change in the momentum of the
+                Ball object with index idx1 due to the collision in
+                terms of the simulation's momentum units. The change
+                in the momentum of the other participant (the Ball
+                object with index idx2 or the wall) is equal in
+                magnitude and opposite in direction.
+        rejected (bool): Whether the collision was rejected on
+                re-validation (only for simulations with
+                reduced_precision True), in which case the Ball
+                objects continue on their current trajectories from
+                time t and impulse is zero.
+    """
+    t: float
+    idx1: int
+    idx2: int
+    wall: int
+    impulse: Tuple[float]
+    rejected: bool=False
@@ -0,0 +1,637 @@
+#!/usr/bin/env python3
+
+from typing import (
+    Tuple,
+    Optional,
+    Any,
+)
+
+import json
+import os
+import queue
+import struct
+import threading
+
+import numpy as np
+
+from gas_simulation.utils import Real
+
+# The layout of an event log file is:
+# - The 8 bytes of _MAGIC.
+# - The length of the header in bytes (a little-endian 4-byte unsigned
+#   integer).
+# - The header, a JSON object giving the parameters of the simulation,
+#   the number of Ball objects, the time at which the log was started
+#   and the offsets of the initial states and of the records.
+# - The initial states of the Ball objects (see _INITIAL_FIELDS) as
+#   little-endian double precision arrays, starting at an offset
+#   divisible by 8.
+# - The records, each of the type given by eventRecordDtype(), starting
+#   at an offset divisible by 8 and continuing to the end of the file.
+_MAGIC = b"GASEVLOG"
+_VERSION = 1
+_INITIAL_FIELDS = ("m", "radius", "t0", "r0", "v0")
+
+def eventRecordDtype(n_dims: int) -> np.dtype:
+    """
+    Gives the numpy data type of the records of an event log for a
+    simulation with n_dims spatial dimensions.
+    
+    Each record describes an event in which the reference state of
+    one or two Ball objects changed, and has the fields:
+    - "t": The time of the event (which is the new reference time of
+       the Ball objects involved).
+    - "idx1": The index of the (first) Ball object involved.
+    - "idx2": The index of the second Ball object involved for a
+       collision between two Ball objects, or -1 for a collision of
+       a Ball object with a wall.
+    - "r1", "v1": The position and velocity vectors of the Ball object
+       with index idx1 immediately after the event.
+    - "r2", "v2": The position and velocity vectors of the Ball object
+       with index idx2 immediately after the event (zero if idx2 is
+       -1).
+    
+    Args:
+        Required positional:
+        n_dims (strictly positive int): The number of spatial
+                dimensions of the simulation.
+    
+    Returns:
+    Structured numpy dtype with the fields described above, in
+    little-endian byte order and with no padding.
+    """
+    vec = ("<f8", (n_dims,))
+    return np.dtype([("t", "<f8"), ("idx1", "<i4"), ("idx2", "<i4"),\
+            ("r1", vec), ("v1", vec), ("r2", vec), ("v2", vec)])
+
+class EventLogWriter(object):
+    """
+    Writes the events of a MultiBallSimulation to an event log file
+    (see eventRecordDtype() for the contents of each record and
+    EventLog for reading the file).
+    
+    As the trajectory of each Ball object between events is determined
+    by its state immediately after the previous event, the states of
+    the Ball objects when the log is started together with the records
+    are sufficient to reconstruct the full history of the simulation
+    from that time.
+    
+    The records are collected into batches of buffer_size records, each
+    of which is written to the file by a background thread once it is
+    full, so that recording an event never waits for the file to be
+    written. Any error raised while writing is raised again by the next
+    call of record(), flush() or close().
+    
+    This is normally created by the method startEventLog() of the
+    simulation, rather than directly.
+    
+    Initialisation args:
+        
+        Required positional:
+        
+        path (str): The path of the file to be written (which is
+                overwritten if it exists).
+        box_dims (n-tuple of strictly positive real numeric values):
+                The dimensions of the box of the simulation.
+        g (n-tuple of real numeric values): The uniform gravitational
+                field of the simulation.
+        t (real numeric value): The time of the simulation when the log
+                is started.
+        m (1D array-like of real numeric values): The mass of each Ball
+                object in the simulation.
+        radius (1D array-like of real numeric values): The radius of
+                each Ball object in the simulation.
+        t0 (1D array-like of real numeric values): The reference time
+                of each Ball object in the simulation.
+        r0 (2D array-like of real numeric values): The position vector
+                of each Ball object at its reference time.
+        v0 (2D array-like of real numeric values): The velocity vector
+                of each Ball object at its reference time.
+        
+        Optional named:
+        
+        buffer_size (strictly positive int): The number of records in
+                each batch passed to the background thread.
+            Default: 4096
+    
+    Attributes:
+        
+        path (str): The path of the file being written.
+        n_dims (strictly positive int): The number of spatial
+                dimensions of the simulation.
+        dtype (numpy dtype): The type of the records (see
+                eventRecordDtype()).
+        n_records (int): The number of records recorded so far
+                (including those not yet written to the file).
+        closed (bool): Whether the log has been closed.
+    
+    Methods:
+        (For full description, see documentation of the method itself)
+        
+        record(): Records an event.
+        flush(): Passes any records not yet in a full batch to the
+                background thread and waits for all records to be
+                written.
+        close(): Writes any remaining records and closes the file.
+    """
+    def __init__(
+        self,
+        path: str,
+        box_dims: Tuple[Real],
+        g: Tuple[Real],
+        t: Real,
+        m: np.ndarray,
+        radius: np.ndarray,
+        t0: np.ndarray,
+        r0: np.ndarray,
+        v0: np.ndarray,
+        buffer_size: int=4096,
+    ):
+        if buffer_size < 1:
+            raise ValueError(f"buffer_size must be a strictly positive "\
+                    f"integer, got {buffer_size!r}")
+        self._path = path
+        self._n_dims = len(box_dims)
+        self._dtype = eventRecordDtype(self._n_dims)
+        self._buffer_size = buffer_size
+        # The number of values in each record, and the values used for
+        # the second Ball object when only one is involved
+        self._record_len = 3 + 4 * self._n_dims
+        self._zero_vecs = (0.,) * (2 * self._n_dims)
+        
+        n_balls = len(m)
+        initial = {"m": m, "radius": radius, "t0": t0, "r0": r0, "v0": v0}
+        initial = {name: np.ascontiguousarray(arr, dtype="<f8")\
+                for name, arr in initial.items()}
+        header = {
+            "version": _VERSION,
+            "n_dims": self._n_dims,
+            "box_dims": [float(x) for x in box_dims],
+            "g": [float(x) for x in g],
+            "t_start": float(t),
+            "n_balls": n_balls,
+            "record_dtype": self._dtype.descr,
+        }
+        # The offsets depend on the length of the header, which itself
+        # contains them, so the header is padded with spaces to leave
+        # room for their digits
+        header["initial_offset"] = 0
+        header["records_offset"] = 0
+        header_len = len(json.dumps(header)) + 40
+        initial_offset = _align8(len(_MAGIC) + 4 + header_len)
+        records_offset = _align8(initial_offset +\
+                sum(arr.nbytes for arr in initial.values()))
+        header["initial_offset"] = initial_offset
+        header["records_offset"] = records_offset
+        header_bytes = json.dumps(header).encode().ljust(header_len)
+        
+        self._file = open(path, "wb")
+        self._file.write(_MAGIC + struct.pack("<I", header_len) +\
+                header_bytes)
+        self._file.write(b"\0" * (initial_offset - self._file.tell()))
+        for name in _INITIAL_FIELDS:
+            self._file.write(initial[name].tobytes())
+        self._file.write(b"\0" * (records_offset - self._file.tell()))
+        # So that the log can be read while it is being recorded
+        self._file.flush()
+        
+        # The values of the records of the current batch, in order
+        self._buffer = []
+        self._n_buffered = 0
+        self._n_records = 0
+        self._closed = False
+        self._error = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._writeLoop,\
+                name="EventLogWriter", daemon=True)
+        self._thread.start()
+    
+    @property
+    def path(self):
+        return self._path
+    
+    @property
+    def n_dims(self):
+        return self._n_dims
+    
+    @property
+    def dtype(self):
+        return self._dtype
+    
+    @property
+    def n_records(self):
+        return self._n_records
+    
+    @property
+    def closed(self):
+        return self._closed
+    
+    def _writeLoop(self) -> None:
+        """
+        The target of the background thread, which writes each batch of
+        records taken from the attribute _queue to the file until None
+        is taken from it. Each batch is either a flat list of the
+        values of the records in order (see record()) or, to request
+        that the thread signals once all of the preceding batches are
+        written, a threading.Event.
+        """
+        n_dims = self._n_dims
+        while True:
+            batch = self._queue.get()
+            if batch is None: return
+            if isinstance(batch, threading.Event):
+                self._file.flush()
+                batch.set()
+                continue
+            if self._error is not None: continue
+            try:
+                # Converting the flat list to a 2D array and then
+                # assigning its columns to the fields is much faster
+                # than converting a list of nested tuples directly
+                arr = np.array(batch, dtype=float)\
+                        .reshape(-1, self._record_len)
+                records = np.empty(len(arr), dtype=self._dtype)
+                records["t"] = arr[:, 0]
+                records["idx1"] = arr[:, 1]
+                records["idx2"] = arr[:, 2]
+                for j, name in enumerate(("r1", "v1", "r2", "v2")):
+                    records[name] = arr[:, 3 + j * n_dims:\
+                            3 + (j + 1) * n_dims]
+                self._file.write(records.tobytes())
+            except Exception as e:
+                self._error = e
+    
+    def _raiseError(self) -> None:
+        """
+        Raises any error that occurred in the background thread.
+        """
+        if self._error is not None:
+            raise RuntimeError(f"Writing the event log {self._path!r} "\
+                    f"failed") from self._error
+        return
+    
+    def record(
+        self,
+        t: Real,
+        idx1: int,
+        idx2: int,
+        r1: Tuple[Real],
+        v1: Tuple[Real],
+        r2: Optional[Tuple[Real]]=None,
+        v2: Optional[Tuple[Real]]=None,
+    ) -> None:
+        """
+        Records an event, in which the reference state of one or two
+        Ball objects changed (see eventRecordDtype()).
+        
+        Args:
+            Required positional:
+            t (real numeric value): The time of the event.
+            idx1 (int): The index of the (first) Ball object involved.
+            idx2 (int): The index of the second Ball object involved,
+                    or -1 if only one Ball object was involved.
+            r1 (n-tuple of real numeric values): The position vector
+                    of the Ball object with index idx1 immediately
+                    after the event.
+            v1 (n-tuple of real numeric values): The velocity vector
+                    of the Ball object with index idx1 immediately
+                    after the event.
+            
+            Optional named:
+            r2 (n-tuple of real numeric values or None): The position
+                    vector of the Ball object with index idx2
+                    immediately after the event, or None if idx2 is -1.
+                Default: None
+            v2 (n-tuple of real numeric values or None): The velocity
+                    vector of the Ball object with index idx2
+                    immediately after the event, or None if idx2 is -1.
+                Default: None
+        
+        Returns:
+        None
+        """
+        if self._closed:
+            raise ValueError("The event log has been closed")
+        buffer = self._buffer
+        buffer += (t, idx1, idx2)
+        buffer += r1
+        buffer += v1
+        if r2 is None:
+            buffer += self._zero_vecs
+        else:
+            buffer += r2
+            buffer += v2
+        self._n_records += 1
+        self._n_buffered += 1
+        if self._n_buffered >= self._buffer_size:
+            self._raiseError()
+            self._queue.put(buffer)
+            self._buffer = []
+            self._n_buffered = 0
+        return
+    
+    def flush(self) -> None:
+        """
+        Passes any records not yet passed to the background thread to
+        it, and waits until every record has been written to the file.
+        
+        Returns:
+        None
+        """
+        if self._closed: return
+        if self._buffer:
+            self._queue.put(self._buffer)
+            self._buffer = []
+            self._n_buffered = 0
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+        self._raiseError()
+        return
+    
+    def close(self) -> None:
+        """
+        Writes any remaining records to the file, stops the background
+        thread and closes the file. Has no effect if the log has
+        already been closed.
+        
+        Returns:
+        None
+        """
+        if self._closed: return
+        if self._buffer:
+            self._queue.put(self._buffer)
+            self._buffer = []
+            self._n_buffered = 0
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+        self._closed = True
+        self._raiseError()
+        return
+    
+    def __enter__(self) -> "EventLogWriter":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+        return
+
+def _align8(n: int) -> int:
+    """
+    Gives the smallest multiple of 8 no less than n.
+    """
+    return -(-n // 8) * 8
+
+class EventLog(object):
+    """
+    Read-only view of an event log file written by EventLogWriter (for
+    instance using the method startEventLog() of MultiBallSimulation),
+    with the records and the initial states of the Ball objects memory
+    mapped, so that any part of the log can be accessed without reading
+    the whole file.
+    
+    The records are in the order in which the events were processed by
+    the simulation, which is in order of increasing time. Any
+    incomplete record at the end of the file (for instance of a log
+    still being written) is ignored.
+    
+    Initialisation args:
+        
+        Required positional:
+        
+        path (str): The path of the event log file.
+    
+    Attributes:
+        
+        path (str): The path of the event log file.
+        n_dims (strictly positive int): The number of spatial
+                dimensions of the simulation.
+        box_dims (n-tuple of floats): The dimensions of the box of the
+                simulation.
+        g (n-tuple of floats): The uniform gravitational field of the
+                simulation.
+        t_start (float): The time of the simulation when the log was
+                started.
+        n_balls (int): The number of Ball objects in the simulation.
+        m, radius, t0 (1D numpy arrays of floats): The mass, radius and
+                reference time of each Ball object when the log was
+                started.
+        r0, v0 (2D numpy arrays of floats): Arrays with n_dims columns
+                whose rows are the position and velocity vectors of
+                each Ball object at its reference time when the log was
+                started.
+        records (1D numpy structured array): The records, with the type
+                given by eventRecordDtype().
+        t (1D numpy array of floats): The time of each record (the
+                field "t" of records).
+    
+    Methods:
+        (For full description, see documentation of the method itself)
+        
+        indexAtTime(): Gives the number of records of events occurring
+                no later than a given time.
+        eventsBetween(): Gives the records of the events occurring
+                within a time interval.
+        ballEvents(): Gives the indices of the records of the events
+                involving a given Ball object.
+        statesAtTime(): Reconstructs the positions and velocities of
+                every Ball object at a given time.
+    """
+    def __init__(self, path: str):
+        self._path = path
+        with open(path, "rb") as f:
+            magic = f.read(len(_MAGIC))
+            if magic != _MAGIC:
+                raise ValueError(f"{path!r} is not an event log file")
+            header_len, = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_len).decode())
+        if header["version"] != _VERSION:
+            raise ValueError(f"Unsupported event log version "\
+                    f"{header['version']!r}")
+        self._header = header
+        n_dims = header["n_dims"]
+        n_balls = header["n_balls"]
+        self._dtype = eventRecordDtype(n_dims)
+        
+        offset = header["initial_offset"]
+        self._initial = {}
+        for name in _INITIAL_FIELDS:
+            shape = (n_balls, n_dims) if name in ("r0", "v0") else\
+                    (n_balls,)
+            size = int(np.prod(shape)) * 8
+            self._initial[name] = np.memmap(path, dtype="<f8", mode="r",\
+                    offset=offset, shape=shape) if size else\
+                    np.zeros(shape, dtype="<f8")
+            offset += size
+        
+        records_offset = header["records_offset"]
+        n_records = (os.path.getsize(path) - records_offset) //\
+                self._dtype.itemsize
+        self._records = np.memmap(path, dtype=self._dtype, mode="r",\
+                offset=records_offset, shape=(n_records,)) if n_records\
+                else np.zeros(0, dtype=self._dtype)
+    
+    @property
+    def path(self):
+        return self._path
+    
+    @property
+    def n_dims(self):
+        return self._header["n_dims"]
+    
+    @property
+    def box_dims(self):
+        return tuple(self._header["box_dims"])
+    
+    @property
+    def g(self):
+        return tuple(self._header["g"])
+    
+    @property
+    def t_start(self):
+        return self._header["t_start"]
+    
+    @property
+    def n_balls(self):
+        return self._header["n_balls"]
+    
+    @property
+    def m(self):
+        return self._initial["m"]
+    
+    @property
+    def radius(self):
+        return self._initial["radius"]
+    
+    @property
+    def t0(self):
+        return self._initial["t0"]
+    
+    @property
+    def r0(self):
+        return self._initial["r0"]
+    
+    @property
+    def v0(self):
+        return self._initial["v0"]
+    
+    @property
+    def records(self):
+        return self._records
+    
+    @property
+    def t(self):
+        return self._records["t"]
+    
+    def __len__(self) -> int:
+        return len(self._records)
+    
+    def __getitem__(self, key: Any) -> Any:
+        return self._records[key]
+    
+    def indexAtTime(self, t: Real) -> int:
+        """
+        Gives the number of records of events occurring no later than
+        time t (i.e. the index of the first record of an event
+        occurring after t).
+        
+        Args:
+            Required positional:
+            t (real numeric value): The time in terms of the
+                    simulation's time measure.
+        
+        Returns:
+        Integer (int) giving the number of such records.
+        """
+        return int(np.searchsorted(self.t, t, side="right"))
+    
+    def eventsBetween(self, t1: Real, t2: Real) -> np.ndarray:
+        """
+        Gives the records of the events occurring after time t1 and no
+        later than time t2.
+        
+        Args:
+            Required positional:
+            t1 (real numeric value): The start of the time interval in
+                    terms of the simulation's time measure.
+            t2 (real numeric value): The end of the time interval in
+                    terms of the simulation's time measure.
+        
+        Returns:
+        1D numpy structured array (a view of the attribute records)
+        containing those records in order.
+        """
+        return self._records[self.indexAtTime(t1):self.indexAtTime(t2)]
+    
+    def ballEvents(self, idx: int) -> np.ndarray:
+        """
+        Gives the indices of the records of the events involving the
+        Ball object with index idx.
+        
+        Args:
+            Required positional:
+            idx (int): The index of the Ball object in the simulation.
+        
+        Returns:
+        1D numpy array of ints giving the indices in the attribute
+        records of the records involving that Ball object, in
+        increasing order.
+        """
+        records = self._records
+        return np.flatnonzero((records["idx1"] == idx) |\
+                (records["idx2"] == idx))
+    
+    def statesAtTime(self, t: Real) -> Tuple[np.ndarray]:
+        """
+        Reconstructs the position and velocity vectors of every Ball
+        object at time t from their states when the log was started and
+        the records of the events occurring no later than t, with each
+        Ball object following its trajectory under the uniform
+        gravitational field from the last of these involving it.
+        
+        Args:
+            Required positional:
+            t (real numeric value): The time in terms of the
+                    simulation's time measure, which should be no
+                    earlier than the attribute t_start and no later
+                    than the time at which the log was stopped.
+        
+        Returns:
+        2-tuple of 2D numpy arrays of floats with n_dims columns, whose
+        index 0 contains the array whose rows are the position vectors
+        and whose index 1 contains the array whose rows are the
+        velocity vectors of the Ball objects (in order of their
+        indices).
+        """
+        if t < self.t_start:
+            raise ValueError(f"t must be no earlier than the start of "\
+                    f"the log ({self.t_start}), got {t!r}")
+        t0 = np.array(self.t0)
+        r0 = np.array(self.r0)
+        v0 = np.array(self.v0)
+        records = self._records[:self.indexAtTime(t)]
+        if len(records):
+            # The state of each Ball object following each event
+            # involving it, in the order of the events, of which the
+            # last for each Ball object is its reference state at t
+            second = records["idx2"] >= 0
+            idx = np.concatenate([records["idx1"],\
+                    records["idx2"][second]])
+            order = np.concatenate([np.arange(len(records)),\
+                    np.flatnonzero(second)])
+            ts = np.concatenate([records["t"], records["t"][second]])
+            rs = np.concatenate([records["r1"], records["r2"][second]])
+            vs = np.concatenate([records["v1"], records["v2"][second]])
+            # Sorting by Ball object and then by event, so the last
+            # entry for each Ball object is its latest state
+            srt = np.lexsort((order, idx))
+            idx = idx[srt]
+            last = np.flatnonzero(np.append(idx[1:] != idx[:-1], True))
+            sel = srt[last]
+            t0[idx[last]] = ts[sel]
+            r0[idx[last]] = rs[sel]
+            v0[idx[last]] = vs[sel]
+        dt = (t - t0)[:, np.newaxis]
+        g = np.asarray(self.g, dtype=float)
+        return r0 + v0 * dt + g * dt ** 2 / 2, v0 + g * dt
@@ -0,0 +1,653 @@
+#!/usr/bin/env python3
+
+from typing import (
+    Optional,
+    Tuple,
+    List,
+    Iterable,
+)
+
+import bisect
+import heapq
+import math
+
+from sortedcontainers import SortedList
+
+from gas_simulation.utils import Real
+
+# Labels for the kinds of event that may be stored in an event queue,
+# occupying index 1 of each event. Where several events are due at
+# exactly the same time, those whose kind has the smaller label are
+# processed first.
+BALLS_COLLISION_EVENT = 0
+WALL_COLLISION_EVENT = 1
+CELL_CROSSING_EVENT = 2
+REPREDICT_EVENT = 3
+
+class HeapEventQueue(object):
+    """
+    Priority queue of the events scheduled in a MultiBallSimulation,
+    implemented as a binary min-heap using the heapq package. This
+    queue persists for the lifetime of the simulation, so that
+    progressing the simulation only requires the events due before
+    the end of the time interval in question to be examined.
+    
+    Each event is represented by a 6-tuple where:
+    - Index 0 contains a real numeric value giving the time the event
+       is projected to occur (in terms of the simulation's time
+       measure).
+    - Index 1 contains an int giving the kind of event, being one of
+       BALLS_COLLISION_EVENT, WALL_COLLISION_EVENT, CELL_CROSSING_EVENT
+       or REPREDICT_EVENT (the last of which is only used by
+       simulations storing a limited number of projected collisions
+       for each Ball object).
+    - Indices 2 and 3 contain non-negative integers giving the index
+       in the attribute balls of the simulation of the (first) Ball
+       object involved in the event and the state of that Ball object
+       when the event was scheduled respectively.
+    - Indices 4 and 5 contain, for collisions between two Ball objects,
+       the index of the other Ball object and its state when the event
+       was scheduled respectively, and for all other events the
+       integer -1.
+    The events are ordered by these tuples, so that the event at the
+    front of the queue is the (joint) soonest, with ties broken by the
+    kind of event and then the indices of the Ball objects.
+    
+    Events whose Ball objects have since changed state are not removed
+    from the queue when that change occurs, but are instead discarded
+    by the simulation when they reach the front of the queue (or when
+    the queue is compacted).
+    
+    Initialisation args:
+        
+        Optional named:
+        
+        events (iterable of 6-tuples or None): If given, the events
+                with which the queue is initially populated.
+            Default: None
+    
+    Methods:
+        (For full description, see documentation of the method itself)
+        
+        push(): Inserts an event into the queue.
+        peek(): Gives the event at the front of the queue without
+                removing it.
+        pop(): Removes and returns the event at the front of the queue.
+        replaceFront(): Removes the event at the front of the queue and
+                inserts another event.
+        events(): Gives all of the events currently in the queue.
+        rebuild(): Replaces the contents of the queue.
+    """
+    # Whether the queue supports removing the events involving a given
+    # Ball object (see SortedEventQueue)
+    supports_cancellation = False
+    
+    def __init__(
+        self,
+        events: Optional[Iterable[Tuple[Real]]]=None,
+    ):
+        self.rebuild(() if events is None else events)
+    
+    def __len__(self) -> int:
+        return len(self._heap)
+    
+    def push(self, event: Tuple[Real]) -> None:
+        """
+        Inserts an event into the queue.
+        
+        Args:
+            Required positional:
+            event (6-tuple): The event to be inserted, with the
+                    structure described in the documentation of the
+                    class.
+        
+        Returns:
+        None
+        """
+        heapq.heappush(self._heap, event)
+        return
+    
+    def peek(self) -> Tuple[Real]:
+        """
+        Gives the (joint) soonest event in the queue without removing
+        it from the queue. The queue must be non-empty.
+        
+        Returns:
+        6-tuple representing the event at the front of the queue.
+        """
+        return self._heap[0]
+    
+    def pop(self) -> Tuple[Real]:
+        """
+        Removes the (joint) soonest event in the queue and returns it.
+        The queue must be non-empty.
+        
+        Returns:
+        6-tuple representing the event removed from the front of the
+        queue.
+        """
+        return heapq.heappop(self._heap)
+    
+    def replaceFront(self, event: Tuple[Real]) -> Tuple[Real]:
+        """
+        Removes the (joint) soonest event in the queue and then inserts
+        the event given. This is equivalent to, but more efficient
+        than, using pop() followed by push(). The queue must be
+        non-empty.
+        
+        Args:
+            Required positional:
+            event (6-tuple): The event to be inserted.
+        
+        Returns:
+        6-tuple representing the event removed from the front of the
+        queue.
+        """
+        return heapq.heapreplace(self._heap, event)
+    
+    def events(self) -> List[Tuple[Real]]:
+        """
+        Gives all of the events currently in the queue, in no
+        particular order.
+        
+        Returns:
+        List of 6-tuples representing the events.
+        """
+        return list(self._heap)
+    
+    def rebuild(self, events: Iterable[Tuple[Real]]) -> None:
+        """
+        Replaces the contents of the queue with the events given.
+        
+        Args:
+            Required positional:
+            events (iterable of 6-tuples): The events with which the
+                    queue is to be populated.
+        
+        Returns:
+        None
+        """
+        self._heap = list(events)
+        heapq.heapify(self._heap)
+        return
+
+class SortedEventQueue(object):
+    """
+    Priority queue of the events scheduled in a MultiBallSimulation,
+    implemented as a sorted list (using the SortedList class of the
+    sortedcontainers package) alongside an index of the events
+    involving each Ball object. This allows every event involving a
+    given Ball object to be removed from the queue as soon as that
+    Ball object changes trajectory, in O(log m) time per event (where
+    m is the number of events in the queue), rather than being
+    discarded when it reaches the front of the queue.
+    
+    As such, when used by a simulation that cancels the events of
+    each Ball object whenever its state changes, the queue contains
+    no stale events and so remains of a size bounded by a fixed
+    multiple of the number of Ball objects, at the cost of a larger
+    constant factor for each operation than HeapEventQueue.
+    
+    The events have the same format and ordering as for
+    HeapEventQueue (see the documentation of that class).
+    
+    Initialisation args:
+        
+        Optional named:
+        
+        events (iterable of 6-tuples or None): If given, the events
+                with which the queue is initially populated.
+            Default: None
+    
+    Methods:
+        (For full description, see documentation of the method itself)
+        
+        push(): Inserts an event into the queue.
+        peek(): Gives the event at the front of the queue without
+                removing it.
+        pop(): Removes and returns the event at the front of the queue.
+        replaceFront(): Removes the event at the front of the queue and
+                inserts another event.
+        cancelBall(): Removes and returns all events involving a given
+                Ball object.
+        events(): Gives all of the events currently in the queue.
+        rebuild(): Replaces the contents of the queue.
+    """
+    supports_cancellation = True
+    
+    def __init__(
+        self,
+        events: Optional[Iterable[Tuple[Real]]]=None,
+    ):
+        self.rebuild(() if events is None else events)
+    
+    def __len__(self) -> int:
+        return len(self._sorted)
+    
+    def _indexEvent(self, event: Tuple[Real]) -> None:
+        """
+        Adds an event to the index of the events involving each Ball
+        object.
+        
+        Args:
+            Required positional:
+            event (6-tuple): The event to be added.
+        
+        Returns:
+        None
+        """
+        self._ball_events.setdefault(event[2], set()).add(event)
+        if event[4] >= 0:
+            self._ball_events.setdefault(event[4], set()).add(event)
+        return
+    
+    def _unindexEvent(self, event: Tuple[Real]) -> None:
+        """
+        Removes an event from the index of the events involving each
+        Ball object.
+        
+        Args:
+            Required positional:
+            event (6-tuple): The event to be removed.
+        
+        Returns:
+        None
+        """
+        for idx in (event[2], event[4]):
+            if idx < 0: continue
+            ball_events = self._ball_events.get(idx)
+            if ball_events is None: continue
+            ball_events.discard(event)
+            if not ball_events:
+                self._ball_events.pop(idx)
+        return
+    
+    def push(self, event: Tuple[Real]) -> None:
+        """
+        Inserts an event into the queue.
+        
+        Args:
+            Required positional:
+            event (6-tuple): The event to be inserted, with the
+                    structure described in the documentation of
+                    HeapEventQueue.
+        
+        Returns:
+        None
+        """
+        self._sorted.add(event)
+        self._indexEvent(event)
+        return
+    
+    def peek(self) -> Tuple[Real]:
+        """
+        Gives the (joint) soonest event in the queue without removing
+        it from the queue. The queue must be non-empty.
+        
+        Returns:
+        6-tuple representing the event at the front of the queue.
+        """
+        return self._sorted[0]
+    
+    def pop(self) -> Tuple[Real]:
+        """
+        Removes the (joint) soonest event in the queue and returns it.
+        The queue must be non-empty.
+        
+        Returns:
+        6-tuple representing the event removed from the front of the
+        queue.
+        """
+        event = self._sorted.pop(0)
+        self._unindexEvent(event)
+        return event
+    
+    def replaceFront(self, event: Tuple[Real]) -> Tuple[Real]:
+        """
+        Removes the (joint) soonest event in the queue and then inserts
+        the event given. The queue must be non-empty.
+        
+        Args:
+            Required positional:
+            event (6-tuple): The event to be inserted.
+        
+        Returns:
+        6-tuple representing the event removed from the front of the
+        queue.
+        """
+        res = self.pop()
+        self.push(event)
+        return res
+    
+    def cancelBall(self, idx: int) -> List[Tuple[Real]]:
+        """
+        Removes every event involving the Ball object with index idx
+        in the attribute balls of the simulation from the queue.
+        
+        Args:
+            Required positional:
+            idx (int): Non-negative integer giving the index of the
+                    Ball object in question.
+        
+        Returns:
+        List of 6-tuples representing the events removed, in no
+        particular order.
+        """
+        ball_events = self._ball_events.pop(idx, None)
+        if not ball_events: return []
+        for event in ball_events:
+            self._sorted.discard(event)
+            idx2 = event[4] if event[2] == idx else event[2]
+            if idx2 < 0 or idx2 == idx: continue
+            other_events = self._ball_events.get(idx2)
+            if other_events is None: continue
+            other_events.discard(event)
+            if not other_events:
+                self._ball_events.pop(idx2)
+        return list(ball_events)
+    
+    def events(self) -> List[Tuple[Real]]:
+        """
+        Gives all of the events currently in the queue, in order.
+        
+        Returns:
+        List of 6-tuples representing the events.
+        """
+        return list(self._sorted)
+    
+    def rebuild(self, events: Iterable[Tuple[Real]]) -> None:
+        """
+        Replaces the contents of the queue with the events given.
+        
+        Args:
+            Required positional:
+            events (iterable of 6-tuples): The events with which the
+                    queue is to be populated.
+        
+        Returns:
+        None
+        """
+        self._sorted = SortedList(events)
+        self._ball_events = {}
+        for event in self._sorted:
+            self._indexEvent(event)
+        return
+
+class CalendarEventQueue(object):
+    """
+    Priority queue of the events scheduled in a MultiBallSimulation,
+    implemented as a calendar queue (R. Brown, Communications of the
+    ACM 31(10), 1988). The time axis is divided into intervals of
+    equal width (days), which are assigned cyclically to a fixed
+    number of buckets (so that one cycle through the buckets covers a
+    year), with each bucket holding its events as a sorted list. The
+    front of the queue is found by scanning the buckets from the
+    position of the previous front for an event falling in the
+    current year.
+    
+    Whenever the number of events exceeds twice or falls below half
+    of the number of buckets, the number of buckets is doubled or
+    halved respectively and the width of the days is recalculated
+    from the separation of the soonest events in the queue, so that
+    each bucket holds a small number of events and the front of the
+    queue is typically found within a few buckets. This gives
+    amortised constant expected time for both insertion and removal
+    of the front, as opposed to the logarithmic time of
+    HeapEventQueue, which benefits simulations with very large
+    numbers of Ball objects.
+    
+    Events whose time is not finite are held separately in a binary
+    min-heap, since they cannot be assigned to a day.
+    
+    The events have the same format and ordering as for
+    HeapEventQueue (see the documentation of that class).
+    
+    Initialisation args:
+        
+        Optional named:
+        
+        events (iterable of 6-tuples or None): If given, the events
+                with which the queue is initially populated.
+            Default: None
+    
+    Attributes:
+        
+        n_buckets (int): The current number of buckets.
+        bucket_width (float): The current width of each day in terms
+                of the simulation's time measure.
+    
+    Methods:
+        (For full description, see documentation of the method itself)
+        
+        push(): Inserts an event into the queue.
+        peek(): Gives the event at the front of the queue without
+                removing it.
+        pop(): Removes and returns the event at the front of the queue.
+        replaceFront(): Removes the event at the front of the queue and
+                inserts another event.
+        events(): Gives all of the events currently in the queue.
+        rebuild(): Replaces the contents of the queue.
+    """
+    supports_cancellation = False
+    
+    # The least number of buckets and the number of the soonest events
+    # sampled when recalculating the width of the days
+    _min_n_buckets = 2
+    _n_width_samples = 25
+    
+    def __init__(
+        self,
+        events: Optional[Iterable[Tuple[Real]]]=None,
+    ):
+        self._width = 1.
+        self.rebuild(() if events is None else events)
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    @property
+    def n_buckets(self):
+        return len(self._buckets)
+    
+    @property
+    def bucket_width(self):
+        return self._width
+    
+    def _estimateWidth(self, events: List[Tuple[Real]]) -> float:
+        """
+        Estimates a suitable width for the days from the average
+        separation between the times of the soonest events given,
+        ignoring separations more than twice the initial average (as
+        in Brown's algorithm). If no estimate can be made (for
+        instance, if all of those events occur at the same time), the
+        current width is retained.
+        
+        Args:
+            Required positional:
+            events (list of 6-tuples): The events on which the estimate
+                    is based.
+        
+        Returns:
+        Float giving the width.
+        """
+        times = heapq.nsmallest(self._n_width_samples,\
+                (event[0] for event in events if math.isfinite(event[0])))
+        if len(times) < 2: return self._width
+        seps = [t2 - t1 for t1, t2 in zip(times, times[1:])]
+        avg = sum(seps) / len(seps)
+        if avg <= 0: return self._width
+        seps = [sep for sep in seps if sep <= 2 * avg]
+        avg = sum(seps) / len(seps)
+        return 3 * avg if avg > 0 else self._width
+    
+    def _resize(self, n_buckets: int, events: List[Tuple[Real]]) -> None:
+        """
+        Replaces the contents of the queue with the events given, using
+        n_buckets buckets and recalculating the width of the days.
+        
+        Args:
+            Required positional:
+            n_buckets (int): The number of buckets to use.
+            events (list of 6-tuples): The events with which the queue
+                    is to be populated.
+        
+        Returns:
+        None
+        """
+        self._width = self._estimateWidth(events)
+        self._buckets = [[] for _ in range(n_buckets)]
+        self._overflow = []
+        self._size = 0
+        # The day (as an integer multiple of the width) from which the
+        # search for the front of the queue starts, or None if unknown
+        self._day = None
+        for event in events:
+            self._insert(event)
+        return
+    
+    def _insert(self, event: Tuple[Real]) -> None:
+        """
+        Inserts an event into the queue without resizing.
+        
+        Args:
+            Required positional:
+            event (6-tuple): The event to be inserted.
+        
+        Returns:
+        None
+        """
+        self._size += 1
+        t = event[0]
+        if not math.isfinite(t):
+            heapq.heappush(self._overflow, event)
+            return
+        day = int(t // self._width)
+        bisect.insort(self._buckets[day % len(self._buckets)], event)
+        if self._day is not None and day < self._day:
+            self._day = day
+        return
+    
+    def _frontBucket(self) -> Optional[List[Tuple[Real]]]:
+        """
+        Finds the bucket containing the (joint) soonest event with
+        finite time in the queue, updating the day from which the next
+        search starts.
+        
+        Returns:
+        The list representing that bucket, with the event in question
+        at index 0, or None if the queue contains no events with finite
+        time.
+        """
+        if self._size == len(self._overflow): return None
+        buckets = self._buckets
+        n_buckets = len(buckets)
+        width = self._width
+        day = self._day
+        if day is not None:
+            for _ in range(n_buckets):
+                bucket = buckets[day % n_buckets]
+                if bucket and int(bucket[0][0] // width) == day:
+                    self._day = day
+                    return bucket
+                day += 1
+        # No event in the year following the previous front, so the
+        # soonest event is found by direct search
+        bucket = min((bucket for bucket in buckets if bucket),\
+                key=lambda bucket: bucket[0])
+        self._day = int(bucket[0][0] // width)
+        return bucket
+    
+    def push(self, event: Tuple[Real]) -> None:
+        """
+        Inserts an event into the queue.
+        
+        Args:
+            Required positional:
+            event (6-tuple): The event to be inserted, with the
+                    structure described in the documentation of
+                    HeapEventQueue.
+        
+        Returns:
+        None
+        """
+        self._insert(event)
+        if self._size > 2 * len(self._buckets):
+            self._resize(2 * len(self._buckets), self.events())
+        return
+    
+    def peek(self) -> Tuple[Real]:
+        """
+        Gives the (joint) soonest event in the queue without removing
+        it from the queue. The queue must be non-empty.
+        
+        Returns:
+        6-tuple representing the event at the front of the queue.
+        """
+        bucket = self._frontBucket()
+        return self._overflow[0] if bucket is None else bucket[0]
+    
+    def pop(self) -> Tuple[Real]:
+        """
+        Removes the (joint) soonest event in the queue and returns it.
+        The queue must be non-empty.
+        
+        Returns:
+        6-tuple representing the event removed from the front of the
+        queue.
+        """
+        bucket = self._frontBucket()
+        event = heapq.heappop(self._overflow) if bucket is None else\
+                bucket.pop(0)
+        self._size -= 1
+        if len(self._buckets) > self._min_n_buckets and\
+                2 * self._size < len(self._buckets):
+            self._resize(len(self._buckets) // 2, self.events())
+        return event
+    
+    def replaceFront(self, event: Tuple[Real]) -> Tuple[Real]:
+        """
+        Removes the (joint) soonest event in the queue and then inserts
+        the event given. The queue must be non-empty.
+        
+        Args:
+            Required positional:
+            event (6-tuple): The event to be inserted.
+        
+        Returns:
+        6-tuple representing the event removed from the front of the
+        queue.
+        """
+        res = self.pop()
+        self.push(event)
+        return res
+    
+    def events(self) -> List[Tuple[Real]]:
+        """
+        Gives all of the events currently in the queue, in no
+        particular order.
+        
+        Returns:
+        List of 6-tuples representing the events.
+        """
+        res = [event for bucket in self._buckets for event in bucket]
+        res.extend(self._overflow)
+        return res
+    
+    def rebuild(self, events: Iterable[Tuple[Real]]) -> None:
+        """
+        Replaces the contents of the queue with the events given.
+        
+        Args:
+            Required positional:
+            events (iterable of 6-tuples): The events with which the
+                    queue is to be populated.
+        
+        Returns:
+        None
+        """
+        events = list(events)
+        n_buckets = self._min_n_buckets
+        while n_buckets < len(events):
+            n_buckets <<= 1
+        self._resize(n_buckets, events)
+        return
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+
+from typing import (
+    Union,
+    Tuple,
+    Optional,
+    Any,
+)
+
+import hashlib
+import json
+import math
+import os
+
+import numpy as np
+
+from gas_simulation.utils import Real
+from gas_simulation.ball_collision_simulator import MultiBallSimulation
+
+# Incremented whenever a change is made that alters the output of
+# generateRandomPacking() for given parameters, so that previously
+# cached results are not reused.
+_PACKING_CACHE_VERSION = 1
+
+def nBallVolume(radius: Real, n_dims: int) -> Real:
+    """
+    Calculates the volume (i.e. the n-dimensional Lebesgue measure) of
+    an n-dimensional ball.
+    
+    Args:
+        Required positional:
+        radius (non-negative real numeric value): The radius of the
+                ball.
+        n_dims (strictly positive int): The number of dimensions n.
+    
+    Returns:
+    Real numeric value giving the volume of the ball (in terms of the
+    units of radius raised to the power of n_dims).
+    """
+    return math.pi ** (n_dims / 2) / math.gamma(n_dims / 2 + 1) *\
+            radius ** n_dims
+
+def _packingCacheKey(params: dict) -> str:
+    """
+    Gives the hexadecimal SHA-256 digest identifying a set of
+    parameters of generateRandomPacking() in its disk cache.
+    """
+    return hashlib.sha256(json.dumps(\
+            {"version": _PACKING_CACHE_VERSION, **params},\
+            sort_keys=True).encode("utf-8")).hexdigest()
+
+def _randomSequentialAddition(
+    radius: np.ndarray,
+    box_dims: Tuple[Real],
+    rng: np.random.Generator,
+    max_attempts: int,
+) -> np.ndarray:
+    """
+    Places balls with the given radii one at a time (in the order
+    given) at uniformly random positions within the box, with any
+    position at which the new ball would overlap with a ball already
+    placed being rejected and another drawn in its place.
+    
+    Overlaps are checked using a uniform grid of n-hyperrectangular
+    cells of width no less than the largest diameter, so that a new
+    ball only needs to be checked against the balls in the 3 ** n cells
+    surrounding (and including) the cell containing its centre.
+    
+    Args:
+        Required positional:
+        radius (1D numpy array of floats): The radius of each ball.
+        box_dims (n-tuple of strictly positive real numeric values):
+                The dimensions of the box.
+        rng (numpy.random.Generator): The random number generator used.
+        max_attempts (int): The maximum number of positions drawn for
+                any one ball before giving up.
+    
+    Returns:
+    2D numpy array of floats whose rows are the position vectors of
+    the centres of the balls (in the same order as radius).
+    
+    Raises:
+    ValueError if any ball cannot be placed within max_attempts
+    attempts.
+    """
+    n_balls = len(radius)
+    n_dims = len(box_dims)
+    positions = np.zeros((n_balls, n_dims), dtype=float)
+    if not n_balls: return positions
+    width = 2 * float(radius.max())
+    n_cells = tuple(max(1, int(x // width)) for x in box_dims)
+    cell_dims = tuple(x / n for x, n in zip(box_dims, n_cells))
+    offsets = [()]
+    for _ in range(n_dims):
+        offsets = [offset + (x,) for offset in offsets for x in (-1, 0, 1)]
+    cells = {}
+    for idx in range(n_balls):
+        rad = float(radius[idx])
+        lo = np.full(n_dims, rad)
+        hi = np.asarray(box_dims, dtype=float) - rad
+        if np.any(hi < lo):
+            raise ValueError(f"A ball of radius {rad} does not fit in "
+                    f"a box of dimensions {box_dims}.")
+        for _ in range(max_attempts):
+            r = rng.uniform(lo, hi).tolist()
+            cell = tuple(min(n - 1, int(x // w)) for x, w, n in\
+                    zip(r, cell_dims, n_cells))
+            overlap = False
+            for offset in offsets:
+                for idx2 in cells.get(tuple(x + y for x, y in\
+                        zip(cell, offset)), ()):
+                    r2 = positions[idx2]
+                    rad_sum = rad + radius[idx2]
+                    if sum((x - y) ** 2 for x, y in zip(r, r2)) <\
+                            rad_sum ** 2:
+                        overlap = True
+                        break
+                if overlap: break
+            if not overlap: break
+        else:
+            raise ValueError(f"Unable to place ball {idx} of {n_balls} "
+                    f"after {max_attempts} attempts. The requested "
+                    "packing fraction may be too close to or above the "
+                    "jamming limit of random sequential addition "
+                    "(approximately 0.547 in 2 dimensions and 0.38 in "
+                    "3 dimensions for equal radii).")
+        positions[idx] = r
+        cells.setdefault(cell, []).append(idx)
+    return positions
+
+def maxwellBoltzmannVelocities(
+    m: np.ndarray,
+    n_dims: int,
+    kT: Real,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """
+    Draws velocities for a collection of balls from the
+    Maxwell-Boltzmann distribution at a given temperature, then
+    removes the velocity of the centre of mass (so that the total
+    momentum is exactly zero) and rescales the velocities so that the
+    total kinetic energy is exactly that which corresponds to the given
+    temperature by equipartition (allowing for the n_dims degrees of
+    freedom removed by fixing the total momentum).
+    
+    Args:
+        Required positional:
+        m (1D numpy array of floats): The mass of each ball.
+        n_dims (strictly positive int): The number of spatial
+                dimensions.
+        kT (non-negative real numeric value): The temperature
+                multiplied by the Boltzmann constant, in terms of the
+                energy units of the masses and velocities.
+        rng (numpy.random.Generator): The random number generator used.
+    
+    Returns:
+    2D numpy array of floats with n_dims columns whose rows are the
+    velocity vectors of the balls (in the same order as m).
+    """
+    n_balls = len(m)
+    v = rng.standard_normal((n_balls, n_dims)) *\
+            np.sqrt(kT / m)[:, np.newaxis]
+    if n_balls < 2:
+        return np.zeros((n_balls, n_dims), dtype=float)
+    v -= (m[:, np.newaxis] * v).sum(axis=0) / m.sum()
+    ke = 0.5 * (m[:, np.newaxis] * v ** 2).sum()
+    ke_target = 0.5 * n_dims * (n_balls - 1) * kT
+    if ke > 0:
+        v *= math.sqrt(ke_target / ke)
+    return v
+
+def generateRandomPacking(
+    n_balls: int,
+    n_dims: int,
+    packing_fraction: Real,
+    radius: Union[Real, Tuple[Real, Real]]=1,
+    m: Real=1,
+    kT: Real=1,
+    box_aspect: Optional[Tuple[Real]]=None,
+    seed: Optional[int]=None,
+    max_attempts: int=10 ** 4,
+    cache_dir: Optional[str]=None,
+) -> Tuple[Any]:
+    """
+    Generates initial conditions for n_balls non-overlapping balls in
+    an n-hyperrectangular box whose size is chosen so that the balls
+    occupy the proportion packing_fraction of its volume, with
+    velocities drawn from the Maxwell-Boltzmann distribution at the
+    temperature kT with zero total momentum. These may be added to a
+    MultiBallSimulation using its method addBalls() (with check_overlap
+    given as False, as the conditions are already guaranteed to be
+    valid), or a simulation may be constructed directly using
+    randomPackingSimulation().
+    
+    The balls are placed by random sequential addition (see
+    _randomSequentialAddition()) in order of decreasing radius, using
+    a uniform cell grid as a spatial index so that placing each ball
+    takes time independent of the number of balls. Random sequential
+    addition cannot exceed its jamming limit (approximately 0.547 in 2
+    dimensions and 0.38 in 3 dimensions for equal radii), and becomes
+    slow as that limit is approached, so higher packing fractions
+    should be reached by compressing or otherwise evolving the
+    resulting state.
+    
+    If seed and cache_dir are both given, then the result is cached
+    on disk in cache_dir as a .npz file whose name is derived from a
+    hash of the parameters, and subsequent calls with the same
+    parameters load that file rather than regenerating the result.
+    
+    Args:
+        Required positional:
+        n_balls (non-negative int): The number of balls.
+        n_dims (strictly positive int): The number of spatial
+                dimensions.
+        packing_fraction (real numeric value strictly between 0 and
+                1): The proportion of the volume of the box occupied
+                by the balls.
+        
+        Optional named:
+        radius (strictly positive real numeric value or 2-tuple of
+                such values): If a single value, the radius of every
+                ball. If a 2-tuple, the radii of the balls are drawn
+                independently from the uniform distribution between
+                the two values.
+            Default: 1
+        m (strictly positive real numeric value): The mass of every
+                ball.
+            Default: 1
+        kT (non-negative real numeric value): The temperature
+                multiplied by the Boltzmann constant, in terms of the
+                simulation's energy units.
+            Default: 1
+        box_aspect (n-tuple of strictly positive real numeric values
+                or None): If given, the relative lengths of the sides
+                of the box. Otherwise, the box is an n-hypercube.
+            Default: None
+        seed (int or None): If given, the seed of the random number
+                generator used, making the result reproducible.
+            Default: None
+        max_attempts (strictly positive int): The maximum number of
+                random positions attempted for any one ball before
+                raising a ValueError.
+            Default: 10 ** 4
+        cache_dir (str or None): If given along with seed, the
+                directory in which results are cached.
+            Default: None
+    
+    Returns:
+    5-tuple whose index 0 contains an n-tuple of floats giving the
+    dimensions of the box, and whose indices 1 to 4 contain numpy
+    arrays with one row for each ball giving respectively the masses
+    (1D), radii (1D), position vectors of the centres (2D with n_dims
+    columns) and velocity vectors (2D with n_dims columns) of the
+    balls, in the order of the arguments of the method addBalls() of
+    MultiBallSimulation.
+    
+    Raises:
+    ValueError if the balls cannot be packed at the requested
+    packing fraction (see above).
+    """
+    if not 0 < packing_fraction < 1:
+        raise ValueError("packing_fraction must be strictly between 0 "
+                "and 1")
+    if box_aspect is None:
+        box_aspect = (1,) * n_dims
+    params = {"n_balls": n_balls, "n_dims": n_dims,\
+            "packing_fraction": packing_fraction,\
+            "radius": list(radius) if isinstance(radius, tuple) else\
+            radius, "m": m, "kT": kT, "box_aspect": list(box_aspect),\
+            "seed": seed}
+    cache_path = None
+    if cache_dir is not None and seed is not None:
+        cache_path = os.path.join(cache_dir,\
+                f"packing_{_packingCacheKey(params)}.npz")
+        if os.path.isfile(cache_path):
+            with np.load(cache_path) as data:
+                return (tuple(data["box_dims"].tolist()), data["m"],\
+                        data["radius"], data["r0"], data["v0"])
+    
+    rng = np.random.default_rng(seed)
+    if isinstance(radius, tuple):
+        radius_arr = rng.uniform(radius[0], radius[1], n_balls)
+    else:
+        radius_arr = np.full(n_balls, float(radius))
+    # Place the largest balls first, as these are the hardest to fit
+    radius_arr = -np.sort(-radius_arr)
+    m_arr = np.full(n_balls, float(m))
+    
+    ball_volume = sum(nBallVolume(x, n_dims) for x in radius_arr.tolist())
+    aspect_volume = math.prod(box_aspect)
+    scale = (ball_volume / (packing_fraction * aspect_volume)) **\
+            (1 / n_dims)
+    box_dims = tuple(float(x * scale) for x in box_aspect)
+    
+    r0 = _randomSequentialAddition(radius_arr, box_dims, rng,\
+            max_attempts)
+    v0 = maxwellBoltzmannVelocities(m_arr, n_dims, kT, rng)
+    
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Written to a temporary file then moved, so that an
+        # interrupted write does not leave a corrupted cache entry
+        tmp_path = f"{cache_path[:-4]}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, box_dims=np.asarray(box_dims), m=m_arr,\
+                radius=radius_arr, r0=r0, v0=v0)
+        os.replace(tmp_path, cache_path)
+    return box_dims, m_arr, radius_arr, r0, v0
+
+def randomPackingSimulation(
+    n_balls: int,
+    n_dims: int,
+    packing_fraction: Real,
+    g: Union[Real, Tuple[Real]]=0,
+    broadphase: Optional[str]="cell_grid",
+    **kwargs,
+) -> MultiBallSimulation:
+    """
+    Creates a MultiBallSimulation populated with balls whose initial
+    conditions are generated by generateRandomPacking().
+    
+    Args:
+        Required positional:
+        n_balls (non-negative int): The number of balls.
+        n_dims (strictly positive int): The number of spatial
+                dimensions.
+        packing_fraction (real numeric value strictly between 0 and
+                1): The proportion of the volume of the box occupied
+                by the balls.
+        
+        Optional named:
+        g (real numeric value or n-tuple of real numeric values): The
+                uniform gravitational field of the simulation (see
+                the documentation of MultiBallSimulation).
+            Default: 0
+        broadphase (str or None): The broadphase used by the
+                simulation (see the documentation of
+                MultiBallSimulation).
+            Default: "cell_grid"
+        Any further named arguments are passed to
+        generateRandomPacking().
+    
+    Returns:
+    MultiBallSimulation object containing the generated balls.
+    """
+    box_dims, m, radius, r0, v0 = generateRandomPacking(n_balls,\
+            n_dims, packing_fraction, **kwargs)
+    sim = MultiBallSimulation(box_dims, g=g, broadphase=broadphase)
+    sim.addBalls(m, radius, r0, v0, check_overlap=False)
+    return sim
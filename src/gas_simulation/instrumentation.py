@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+from typing import (
+    Dict,
+    Optional,
+    Any,
+)
+
+import time
+
+from gas_simulation.utils import Real
+
+class SimulationStats(object):
+    """
+    Counters and (optionally) timers describing the work done by the
+    event engine of a MultiBallSimulation, for use in diagnosing and
+    profiling simulations.
+    
+    An instance is attached to a simulation using the simulation's
+    method enableStats() and is then updated by the simulation as it
+    runs, so that its attributes can be read at any point (including
+    between calls of progressTime()). When no instance is attached
+    (the default), the simulation performs no instrumentation work
+    beyond checking that its attribute stats is None.
+    
+    Initialisation args:
+        
+        Optional named:
+        
+        timings (bool): If True, the time spent in each phase of the
+                simulation is accumulated in the attribute timings.
+                As this requires reading the clock several times per
+                event, it has a noticeable cost of its own.
+            Default: False
+    
+    Attributes:
+        
+        ball_collisions (int): The number of collisions between pairs
+                of Ball objects processed.
+        wall_collisions (int): The number of collisions between Ball
+                objects and walls processed.
+        rejected_collisions (int): The number of projected collisions
+                between pairs of Ball objects discarded when they were
+                due to occur because re-validation found the Ball
+                objects not to be approaching each other (only for
+                simulations with reduced_precision True).
+        cell_crossings (int): The number of cell crossings of the
+                broadphase processed.
+        repredictions (int): The number of times the projected
+                collisions of a Ball object have been recalculated
+                because only some of them were stored (see the
+                initialisation argument compact_events of
+                MultiBallSimulation).
+        pair_predictions (int): The number of pairs of Ball objects
+                examined for a projected collision.
+        pair_rejections (int): The number of those pairs found not to
+                be on course to collide (before either is due to
+                collide with a wall).
+        heap_resets (int): The number of times the projected collisions
+                of a Ball object have been recalculated.
+        stale_events_popped (int): The number of events discarded from
+                the front of the event queue because a Ball object
+                involved had changed state since they were scheduled.
+        stale_heap_entries_popped (int): The number of projected
+                collisions discarded from the tops of the per-ball
+                collision min-heaps for the same reason.
+        cancelled_events (int): The number of events removed from the
+                event queue when a Ball object involved changed state
+                (only for event queues supporting this, such as
+                SortedEventQueue).
+        compactions (int): The number of times the event queue has been
+                compacted.
+        compacted_events_removed (int): The total number of events
+                removed by those compactions.
+        peak_event_queue_size (int): The largest size of the event
+                queue observed.
+        peak_balls_collision_heap_size (int): The largest size of any
+                one per-ball collision min-heap observed when it was
+                reset.
+        timings (dict or None): If timings is True, dictionary whose
+                keys are the names of phases of the simulation and
+                whose values are the total time in seconds spent in
+                those phases. The phases are:
+                - "init": Initialising the event structures.
+                - "queue": Finding the next valid event.
+                - "ball_collision", "wall_collision", "cell_crossing",
+                   "repredict": Processing the respective kinds of
+                   event, including the recalculation of projected
+                   collisions.
+                - "prediction": Calculating projected collisions
+                   between pairs of Ball objects (a part of the time
+                   counted in "init" and the four phases above).
+                - "audit": Checking for overlaps after progressTime().
+                Otherwise, None.
+    
+    Methods:
+        (For full description, see documentation of the method itself)
+        
+        reset(): Sets all counters and timers to zero.
+        addTime(): Adds to the time spent in a phase.
+        summary(): Gives the counters, timers and derived ratios as a
+                dictionary.
+    """
+    _counter_names = (
+        "ball_collisions",
+        "wall_collisions",
+        "rejected_collisions",
+        "cell_crossings",
+        "repredictions",
+        "pair_predictions",
+        "pair_rejections",
+        "heap_resets",
+        "stale_events_popped",
+        "stale_heap_entries_popped",
+        "cancelled_events",
+        "compactions",
+        "compacted_events_removed",
+        "peak_event_queue_size",
+        "peak_balls_collision_heap_size",
+    )
+    
+    _phase_names = (
+        "init",
+        "queue",
+        "ball_collision",
+        "wall_collision",
+        "cell_crossing",
+        "repredict",
+        "prediction",
+        "audit",
+    )
+    
+    def __init__(self, timings: bool=False):
+        self._timings_enabled = timings
+        self.reset()
+    
+    def reset(self) -> None:
+        """
+        Sets all of the counters and timers to zero.
+        
+        Returns:
+        None
+        """
+        for name in self._counter_names:
+            setattr(self, name, 0)
+        self.timings = {name: 0. for name in self._phase_names}\
+                if self._timings_enabled else None
+        return
+    
+    @staticmethod
+    def clock() -> Real:
+        """
+        Gives the current value of the clock used for the timers, in
+        seconds.
+        """
+        return time.perf_counter()
+    
+    def addTime(self, phase: str, seconds: Real) -> None:
+        """
+        Adds to the time spent in a phase of the simulation. Has no
+        effect if timings are not enabled.
+        
+        Args:
+            Required positional:
+            phase (str): The name of the phase (see the documentation
+                    of the attribute timings).
+            seconds (real numeric value): The time to be added in
+                    seconds.
+        
+        Returns:
+        None
+        """
+        if self.timings is not None:
+            self.timings[phase] += seconds
+        return
+    
+    @property
+    def events(self) -> int:
+        return self.ball_collisions + self.wall_collisions
+    
+    @property
+    def stale_pop_fraction(self) -> Real:
+        """
+        The proportion of all entries removed from the front of the
+        event queue that were stale, or 0 if none have been removed.
+        """
+        n_popped = self.stale_events_popped + self.events +\
+                self.rejected_collisions + self.cell_crossings +\
+                self.repredictions
+        return self.stale_events_popped / n_popped if n_popped else 0.
+    
+    def summary(self) -> Dict[str, Any]:
+        """
+        Gives the values of all of the counters and timers, along with
+        the total number of events (ball collisions plus wall
+        collisions), the proportion of pair predictions that were
+        rejections and the attribute stale_pop_fraction.
+        
+        Returns:
+        Dictionary mapping the names of the counters to their values,
+        with the timers (if enabled) under the key "timings".
+        """
+        res = {name: getattr(self, name) for name in self._counter_names}
+        res["events"] = self.events
+        res["pair_rejection_fraction"] =\
+                self.pair_rejections / self.pair_predictions\
+                if self.pair_predictions else 0.
+        res["stale_pop_fraction"] = self.stale_pop_fraction
+        if self.timings is not None:
+            res["timings"] = dict(self.timings)
+        return res
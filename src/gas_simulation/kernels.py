@@ -0,0 +1,527 @@
+#!/usr/bin/env python3
+
+from typing import (
+    Union,
+    Tuple,
+)
+
+import math
+
+import numpy as np
+
+from gas_simulation.utils import Real
+
+def positionAndVelocityAfterTimeIncrement(
+    r0: Tuple[Real],
+    v0: Tuple[Real],
+    g: Tuple[Real],
+    dt: Real,
+) -> Tuple[Tuple[Real]]:
+    """
+    Calculates the position and velocity vectors of a point after a
+    time interval dt, given its position and velocity vectors at the
+    start of that interval, assuming it moves under the uniform
+    acceleration g.
+    
+    Args:
+        Required positional:
+        r0 (n-tuple of real numeric values): The position vector at the
+                start of the time interval.
+        v0 (n-tuple of real numeric values): The velocity vector at the
+                start of the time interval.
+        g (n-tuple of real numeric values): The acceleration vector.
+        dt (real numeric value): The time interval.
+    
+    Returns:
+    2-tuple of n-tuples of real numeric values representing the
+    position (index 0) and velocity (index 1) vectors after the time
+    interval dt.
+    """
+    return (tuple(r + v * dt + a * dt ** 2 / 2 for r, v, a in\
+            zip(r0, v0, g)), tuple(v + a * dt for v, a in zip(v0, g)))
+
+def _positionAndVelocityAfterTimeIncrementZeroG(
+    r0: Tuple[Real],
+    v0: Tuple[Real],
+    g: Tuple[Real],
+    dt: Real,
+) -> Tuple[Tuple[Real]]:
+    # Zero gravity version of positionAndVelocityAfterTimeIncrement()
+    return (tuple(r + v * dt for r, v in zip(r0, v0)), v0)
+
+def _positionAndVelocityAfterTimeIncrement2D(
+    r0: Tuple[Real],
+    v0: Tuple[Real],
+    g: Tuple[Real],
+    dt: Real,
+) -> Tuple[Tuple[Real]]:
+    # 2D version of positionAndVelocityAfterTimeIncrement()
+    (x, y), (u, w), (a, b) = r0, v0, g
+    h = dt * dt / 2
+    return ((x + u * dt + a * h, y + w * dt + b * h),\
+            (u + a * dt, w + b * dt))
+
+def _positionAndVelocityAfterTimeIncrement2DZeroG(
+    r0: Tuple[Real],
+    v0: Tuple[Real],
+    g: Tuple[Real],
+    dt: Real,
+) -> Tuple[Tuple[Real]]:
+    # 2D zero gravity version of positionAndVelocityAfterTimeIncrement()
+    (x, y), (u, w) = r0, v0
+    return ((x + u * dt, y + w * dt), v0)
+
+def _positionAndVelocityAfterTimeIncrement3D(
+    r0: Tuple[Real],
+    v0: Tuple[Real],
+    g: Tuple[Real],
+    dt: Real,
+) -> Tuple[Tuple[Real]]:
+    # 3D version of positionAndVelocityAfterTimeIncrement()
+    (x, y, z), (u, v, w), (a, b, c) = r0, v0, g
+    h = dt * dt / 2
+    return ((x + u * dt + a * h, y + v * dt + b * h, z + w * dt + c * h),\
+            (u + a * dt, v + b * dt, w + c * dt))
+
+def _positionAndVelocityAfterTimeIncrement3DZeroG(
+    r0: Tuple[Real],
+    v0: Tuple[Real],
+    g: Tuple[Real],
+    dt: Real,
+) -> Tuple[Tuple[Real]]:
+    # 3D zero gravity version of positionAndVelocityAfterTimeIncrement()
+    (x, y, z), (u, v, w) = r0, v0
+    return ((x + u * dt, y + v * dt, z + w * dt), v0)
+
+def nextCollision(
+    r1: Tuple[Real],
+    v1: Tuple[Real],
+    r2: Tuple[Real],
+    v2: Tuple[Real],
+    t0: Real,
+    rad_sum: Real,
+    t_max: Real,
+    m1: Real,
+    m2: Real,
+) -> Tuple[Union[Real, Tuple[Real]]]:
+    """
+    Given the positions and velocities at time t0 of the centres of two
+    balls moving in the same uniform gravitational field (which, as
+    explained in the documentation of the method
+    identifyOtherBallNextCollision() of Ball, does not affect the
+    calculation), finds if and when they next collide before time
+    t_max, along with the details needed to calculate the outcome of
+    the collision.
+    
+    Args:
+        Required positional:
+        r1 (n-tuple of real numeric values): The position vector of the
+                centre of the first ball at time t0.
+        v1 (n-tuple of real numeric values): The velocity vector of the
+                first ball at time t0.
+        r2 (n-tuple of real numeric values): The position vector of the
+                centre of the second ball at time t0.
+        v2 (n-tuple of real numeric values): The velocity vector of the
+                second ball at time t0.
+        t0 (real numeric value): The time at which the positions and
+                velocities are given.
+        rad_sum (real numeric value): The sum of the radii of the
+                balls.
+        t_max (real numeric value): The time before which the
+                collision must occur.
+        m1 (real numeric value): The mass of the first ball.
+        m2 (real numeric value): The mass of the second ball.
+    
+    Returns:
+    If the balls will not collide before time t_max, an empty tuple.
+    Otherwise, a 3-tuple in the same format as the output of the method
+    identifyOtherBallNextCollision() of Ball.
+    """
+    v_net = tuple(x - y for x, y in zip(v1, v2))
+    
+    # Check whether balls are separating along any dimension along
+    # which they are already too far apart to collide
+    for x1, x2, u in zip(r1, r2, v_net):
+        if (x1 - x2 > rad_sum and u >= 0) or\
+                x2 - x1 > rad_sum and u <= 0:
+            return ()
+    # Check that balls are moving such that (at least initially)
+    # their relative distance is decreasing
+    if sum((x1 - x2) * u for x1, x2, u in zip(r1, r2, v_net)) >= 0:
+        return ()
+    v_net_sq = sum(u * u for u in v_net)
+    # Closest approach (see closestApproachVector() in the module
+    # ball_collision_simulator)
+    t2 = sum(u * (x2 - x1) for u, x2, x1 in zip(v_net, r2, r1)) /\
+            v_net_sq
+    approach_vec = tuple(x2 - (x1 + u * t2) for x1, x2, u in\
+            zip(r1, r2, v_net))
+    approach_vec_sq = sum(x * x for x in approach_vec)
+    # Check whether closest approach is less than the sum of the
+    # radii of the two balls
+    rad_sum_sq = rad_sum * rad_sum
+    if approach_vec_sq >= rad_sum_sq:
+        return ()
+    dt2 = math.sqrt((rad_sum_sq - approach_vec_sq) / v_net_sq)
+    t2 += t0 - dt2
+    if not t2 < t_max:
+        return ()
+    contact_displ_vec = tuple(x + u * dt2 for x, u in\
+            zip(approach_vec, v_net))
+    m_tot = m1 + m2
+    v1_zmf = tuple(x - (m1 * x + m2 * y) / m_tot for x, y in zip(v1, v2))
+    return t2, contact_displ_vec, v1_zmf
+
+def _nextCollision2D(
+    r1: Tuple[Real],
+    v1: Tuple[Real],
+    r2: Tuple[Real],
+    v2: Tuple[Real],
+    t0: Real,
+    rad_sum: Real,
+    t_max: Real,
+    m1: Real,
+    m2: Real,
+) -> Tuple[Union[Real, Tuple[Real]]]:
+    # 2D version of nextCollision()
+    (x1, y1), (u1, w1), (x2, y2), (u2, w2) = r1, v1, r2, v2
+    u, w = u1 - u2, w1 - w2
+    dx, dy = x1 - x2, y1 - y2
+    if (dx > rad_sum and u >= 0) or (-dx > rad_sum and u <= 0) or\
+            (dy > rad_sum and w >= 0) or (-dy > rad_sum and w <= 0):
+        return ()
+    if dx * u + dy * w >= 0:
+        return ()
+    v_net_sq = u * u + w * w
+    t2 = (u * (x2 - x1) + w * (y2 - y1)) / v_net_sq
+    ax, ay = x2 - (x1 + u * t2), y2 - (y1 + w * t2)
+    approach_vec_sq = ax * ax + ay * ay
+    rad_sum_sq = rad_sum * rad_sum
+    if approach_vec_sq >= rad_sum_sq:
+        return ()
+    dt2 = math.sqrt((rad_sum_sq - approach_vec_sq) / v_net_sq)
+    t2 += t0 - dt2
+    if not t2 < t_max:
+        return ()
+    m_tot = m1 + m2
+    return t2, (ax + u * dt2, ay + w * dt2),\
+            (u1 - (m1 * u1 + m2 * u2) / m_tot,\
+            w1 - (m1 * w1 + m2 * w2) / m_tot)
+
+def _nextCollision3D(
+    r1: Tuple[Real],
+    v1: Tuple[Real],
+    r2: Tuple[Real],
+    v2: Tuple[Real],
+    t0: Real,
+    rad_sum: Real,
+    t_max: Real,
+    m1: Real,
+    m2: Real,
+) -> Tuple[Union[Real, Tuple[Real]]]:
+    # 3D version of nextCollision()
+    (x1, y1, z1), (u1, v1_, w1) = r1, v1
+    (x2, y2, z2), (u2, v2_, w2) = r2, v2
+    u, v, w = u1 - u2, v1_ - v2_, w1 - w2
+    dx, dy, dz = x1 - x2, y1 - y2, z1 - z2
+    if (dx > rad_sum and u >= 0) or (-dx > rad_sum and u <= 0) or\
+            (dy > rad_sum and v >= 0) or (-dy > rad_sum and v <= 0) or\
+            (dz > rad_sum and w >= 0) or (-dz > rad_sum and w <= 0):
+        return ()
+    if dx * u + dy * v + dz * w >= 0:
+        return ()
+    v_net_sq = u * u + v * v + w * w
+    t2 = (u * (x2 - x1) + v * (y2 - y1) + w * (z2 - z1)) / v_net_sq
+    ax, ay, az = x2 - (x1 + u * t2), y2 - (y1 + v * t2),\
+            z2 - (z1 + w * t2)
+    approach_vec_sq = ax * ax + ay * ay + az * az
+    rad_sum_sq = rad_sum * rad_sum
+    if approach_vec_sq >= rad_sum_sq:
+        return ()
+    dt2 = math.sqrt((rad_sum_sq - approach_vec_sq) / v_net_sq)
+    t2 += t0 - dt2
+    if not t2 < t_max:
+        return ()
+    m_tot = m1 + m2
+    return t2, (ax + u * dt2, ay + v * dt2, az + w * dt2),\
+            (u1 - (m1 * u1 + m2 * u2) / m_tot,\
+            v1_ - (m1 * v1_ + m2 * v2_) / m_tot,\
+            w1 - (m1 * w1 + m2 * w2) / m_tot)
+
+def collisionVelocities(
+    v1: Tuple[Real],
+    v2: Tuple[Real],
+    m1: Real,
+    m2: Real,
+    contact_displ_vec: Tuple[Real],
+    v1_zmf: Tuple[Real],
+    rad_sum_sq: Real,
+) -> Tuple[Tuple[Real]]:
+    """
+    Calculates the velocities of two balls immediately after an elastic
+    collision between them (see the method
+    progressToNextOtherBallCollision() of Ball).
+    
+    Args:
+        Required positional:
+        v1 (n-tuple of real numeric values): The velocity vector of the
+                first ball immediately before the collision.
+        v2 (n-tuple of real numeric values): The velocity vector of the
+                second ball immediately before the collision.
+        m1 (real numeric value): The mass of the first ball.
+        m2 (real numeric value): The mass of the second ball.
+        contact_displ_vec (n-tuple of real numeric values): The
+                displacement vector from the centre of the first ball
+                to the centre of the second ball at the collision.
+        v1_zmf (n-tuple of real numeric values): The velocity vector of
+                the first ball in the zero momentum frame of the two
+                balls at the collision.
+        rad_sum_sq (real numeric value): The square of the sum of the
+                radii of the balls.
+    
+    Returns:
+    2-tuple of n-tuples of real numeric values representing the
+    velocity vectors of the first (index 0) and second (index 1) balls
+    immediately after the collision.
+    """
+    # The component of the velocity of each ball in the zero momentum
+    # frame along the line of centres is reversed, with the velocity of
+    # the second ball in that frame being -m1 / m2 times that of the
+    # first
+    mult = -m1 / m2
+    dv1_sz = 2 * sum(x * y for x, y in zip(contact_displ_vec, v1_zmf)) /\
+            rad_sum_sq
+    dv2_sz = 2 * sum(x * (mult * y) for x, y in\
+            zip(contact_displ_vec, v1_zmf)) / rad_sum_sq
+    return (tuple(x - dv1_sz * y for x, y in zip(v1, contact_displ_vec)),\
+            tuple(x - dv2_sz * y for x, y in zip(v2, contact_displ_vec)))
+
+def _collisionVelocities2D(
+    v1: Tuple[Real],
+    v2: Tuple[Real],
+    m1: Real,
+    m2: Real,
+    contact_displ_vec: Tuple[Real],
+    v1_zmf: Tuple[Real],
+    rad_sum_sq: Real,
+) -> Tuple[Tuple[Real]]:
+    # 2D version of collisionVelocities()
+    (cx, cy), (zx, zy) = contact_displ_vec, v1_zmf
+    mult = -m1 / m2
+    dv1_sz = 2 * (cx * zx + cy * zy) / rad_sum_sq
+    dv2_sz = 2 * (cx * (mult * zx) + cy * (mult * zy)) / rad_sum_sq
+    return ((v1[0] - dv1_sz * cx, v1[1] - dv1_sz * cy),\
+            (v2[0] - dv2_sz * cx, v2[1] - dv2_sz * cy))
+
+def _collisionVelocities3D(
+    v1: Tuple[Real],
+    v2: Tuple[Real],
+    m1: Real,
+    m2: Real,
+    contact_displ_vec: Tuple[Real],
+    v1_zmf: Tuple[Real],
+    rad_sum_sq: Real,
+) -> Tuple[Tuple[Real]]:
+    # 3D version of collisionVelocities()
+    (cx, cy, cz), (zx, zy, zz) = contact_displ_vec, v1_zmf
+    mult = -m1 / m2
+    dv1_sz = 2 * (cx * zx + cy * zy + cz * zz) / rad_sum_sq
+    dv2_sz = 2 * (cx * (mult * zx) + cy * (mult * zy) +\
+            cz * (mult * zz)) / rad_sum_sq
+    return ((v1[0] - dv1_sz * cx, v1[1] - dv1_sz * cy,\
+            v1[2] - dv1_sz * cz), (v2[0] - dv2_sz * cx,\
+            v2[1] - dv2_sz * cy, v2[2] - dv2_sz * cz))
+
+def timeToNextWall(
+    r: Real,
+    v: Real,
+    a: Real,
+    lo: Real,
+    hi: Real,
+) -> Real:
+    """
+    For the centre of a ball moving along one basis vector under a
+    constant acceleration inside a box, currently at position r with
+    velocity v and acceleration a along that basis vector, finds the
+    time interval after which the ball will next collide with one of
+    the walls normal to that basis vector, where lo and hi are the
+    smallest and largest values the component of the position of the
+    centre along that basis vector may take without the ball
+    extending beyond those walls.
+    
+    Args:
+        Required positional:
+        r (real numeric value): The current component of the position
+                of the centre along the basis vector.
+        v (real numeric value): The current component of the velocity
+                along the basis vector.
+        a (real numeric value): The component of the acceleration
+                along the basis vector.
+        lo (real numeric value): The smallest allowed component of the
+                position of the centre along the basis vector.
+        hi (real numeric value): The largest allowed component of the
+                position of the centre along the basis vector.
+    
+    Returns:
+    Non-negative real numeric value giving the time interval after
+    which the ball next collides with one of the walls, or
+    float("inf") if it never will (due to the velocity and
+    acceleration along the basis vector both being exactly zero).
+    """
+    neg = (v < 0)
+    if not a:
+        wall = lo if neg else hi
+        if not v: return float("inf")
+        return (wall - r) / v
+    vg_align = ((a > 0) == (v >= 0))
+    # No root is found only for a ball (invalidly) outside the box
+    # that never reaches either wall from within
+    res = float("inf")
+    for j in range(2):
+        wall = lo if neg ^ j else hi
+        d = wall - r
+        discr = v ** 2 + 2 * a * d
+        if discr < 0: continue
+        s = math.sqrt(discr)
+        res_lst = sorted([(s - v) / a, (-v - s) / a])
+        res = res_lst[1] if vg_align or j else res_lst[0]
+        break
+    return res
+
+def timesToNextWalls(
+    r: np.ndarray,
+    v: np.ndarray,
+    g: Tuple[Real],
+    lo: np.ndarray,
+    hi: np.ndarray,
+) -> np.ndarray:
+    """
+    Vectorised version of timeToNextWall() which, for a collection of
+    balls, finds the time interval after which each ball will next
+    collide with one of the walls normal to each basis vector, giving
+    identical results.
+    
+    Args:
+        Required positional:
+        r (2D numpy array of floats): Array with one row for each ball
+                and one column for each basis vector giving the
+                current position vectors of the centres of the balls.
+        v (2D numpy array of floats): Array of the same shape as r
+                giving the current velocity vectors of the balls.
+        g (n-tuple of real numeric values): The acceleration vector
+                (the same for every ball).
+        lo (2D numpy array of floats): Array of the same shape as r
+                giving for each ball and basis vector the corresponding
+                argument lo of timeToNextWall().
+        hi (2D numpy array of floats): Array of the same shape as r
+                giving for each ball and basis vector the corresponding
+                argument hi of timeToNextWall().
+    
+    Returns:
+    2D numpy array of floats of the same shape as r whose elements are
+    the outputs of timeToNextWall() for the corresponding ball and
+    basis vector.
+    """
+    shape = np.shape(r)
+    r, v, lo, hi = (np.asarray(x, dtype=float).ravel() for x in\
+            (r, v, lo, hi))
+    a = np.broadcast_to(np.asarray(g, dtype=float), shape).ravel()
+    res = np.full(len(r), np.inf)
+    neg = v < 0
+    # Zero acceleration
+    inds = np.flatnonzero((a == 0) & (v != 0))
+    res[inds] = (np.where(neg[inds], lo[inds], hi[inds]) - r[inds]) /\
+            v[inds]
+    # Non-zero acceleration, trying first the wall towards which the
+    # ball is moving and, if it never reaches that wall, the other
+    inds = np.flatnonzero(a != 0)
+    for j in range(2):
+        r_, v_, a_ = r[inds], v[inds], a[inds]
+        wall = np.where(neg[inds] ^ bool(j), lo[inds], hi[inds])
+        discr = v_ ** 2 + 2 * a_ * (wall - r_)
+        found = discr >= 0
+        s = np.sqrt(discr[found])
+        r_, v_, a_ = r_[found], v_[found], a_[found]
+        roots1, roots2 = (s - v_) / a_, (-v_ - s) / a_
+        take_max = ((a_ > 0) == (v_ >= 0)) | bool(j)
+        res[inds[found]] = np.where(take_max,\
+                np.maximum(roots1, roots2), np.minimum(roots1, roots2))
+        inds = inds[~found]
+    return res.reshape(shape)
+
+class KinematicKernels(object):
+    """
+    The set of functions used by a MultiBallSimulation and its Ball
+    objects for the calculations performed for every event (the motion
+    of a Ball object under gravity, the prediction of the collision of
+    a pair of Ball objects and the outcome of such a collision).
+    
+    These are chosen once, when the simulation is created, from
+    versions of each function written for 2 and 3 dimensions using
+    fixed-arity arithmetic on the components (avoiding the overhead of
+    zip() and generator expressions for the commonest simulations) and
+    from versions of the motion under gravity for simulations with no
+    gravitational field, with the versions for arbitrary numbers of
+    dimensions used otherwise. All versions of a function give
+    identical results.
+    
+    Initialisation args:
+        
+        Required positional:
+        
+        n_dims (strictly positive int): The number of spatial
+                dimensions of the simulation.
+        g (n-tuple of real numeric values): The uniform gravitational
+                field of the simulation.
+    
+    Attributes:
+        
+        n_dims (strictly positive int): The number of spatial
+                dimensions the functions are for.
+        zero_g (bool): Whether the functions assume that there is no
+                gravitational field.
+        positionAndVelocityAfterTimeIncrement (function): Version of
+                positionAndVelocityAfterTimeIncrement() to be used.
+        nextCollision (function): Version of nextCollision() to be
+                used.
+        collisionVelocities (function): Version of
+                collisionVelocities() to be used.
+    """
+    _pos_vel_options = {
+        (2, False): _positionAndVelocityAfterTimeIncrement2D,
+        (2, True): _positionAndVelocityAfterTimeIncrement2DZeroG,
+        (3, False): _positionAndVelocityAfterTimeIncrement3D,
+        (3, True): _positionAndVelocityAfterTimeIncrement3DZeroG,
+        (None, False): positionAndVelocityAfterTimeIncrement,
+        (None, True): _positionAndVelocityAfterTimeIncrementZeroG,
+    }
+    
+    _next_collision_options = {
+        2: _nextCollision2D,
+        3: _nextCollision3D,
+        None: nextCollision,
+    }
+    
+    _collision_velocities_options = {
+        2: _collisionVelocities2D,
+        3: _collisionVelocities3D,
+        None: collisionVelocities,
+    }
+    
+    def __init__(self, n_dims: int, g: Tuple[Real]):
+        self._n_dims = n_dims
+        self._zero_g = not any(g)
+        dims_key = n_dims if n_dims in (2, 3) else None
+        self.positionAndVelocityAfterTimeIncrement =\
+                self._pos_vel_options[(dims_key, self._zero_g)]
+        self.nextCollision = self._next_collision_options[dims_key]
+        self.collisionVelocities =\
+                self._collision_velocities_options[dims_key]
+    
+    @property
+    def n_dims(self):
+        return self._n_dims
+    
+    @property
+    def zero_g(self):
+        return self._zero_g
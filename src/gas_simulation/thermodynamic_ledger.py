@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+
+from typing import (
+    Tuple,
+    Optional,
+)
+
+import math
+
+import numpy as np
+
+from gas_simulation.utils import Real
+from gas_simulation.collision_events import CollisionEvent
+
+class _CompensatedSum(object):
+    """
+    Running sum of floats using Neumaier's variant of Kahan summation,
+    so that the rounding error of the sum does not grow with the number
+    of terms added.
+    """
+    __slots__ = ("_sum", "_comp")
+    
+    def __init__(self, value: Real=0.):
+        self._sum = float(value)
+        self._comp = 0.
+    
+    @property
+    def value(self):
+        return self._sum + self._comp
+    
+    def add(self, x: Real) -> None:
+        s = self._sum
+        t = s + x
+        if abs(s) >= abs(x):
+            self._comp += (s - t) + x
+        else:
+            self._comp += (x - t) + s
+        self._sum = t
+        return
+
+class ThermodynamicLedger(object):
+    """
+    Accumulator of the thermodynamic quantities of a MultiBallSimulation
+    (the total kinetic, potential and mechanical energy, the
+    temperature and the momentum transferred to each wall, and so the
+    pressure on each wall), updated with a constant amount of work per
+    collision so that reading these quantities does not require a sum
+    over every Ball object.
+    
+    The ledger is updated from the CollisionEvent of each collision
+    processed by the simulation (see the method addObserver() of
+    MultiBallSimulation), using the following:
+    - The mechanical energy of each Ball object (its kinetic energy
+       plus its gravitational potential energy) is constant between
+       the events involving it, so the total mechanical energy changes
+       only by the changes in the mechanical energies of the Ball
+       objects involved in each event. These are accumulated with
+       compensated summation, so that the total stays accurate over
+       any number of events, and any change in it reflects only the
+       rounding of the states of the Ball objects by the simulation
+       (see energy_drift).
+    - Collisions between two Ball objects do not change the total
+       momentum, so between collisions with the walls the centre of
+       mass of the Ball objects moves freely under the uniform
+       gravitational field. The total momentum and the mass-weighted
+       sum of the positions are therefore only updated at collisions
+       with the walls (by the impulse of the collision), and give the
+       total gravitational potential energy at any time from which the
+       kinetic energy is found.
+    
+    This is normally created by the method enableLedger() of the
+    simulation, rather than directly. The values of the ledger are
+    given in the simulation's units, with temperatures in energy units
+    (i.e. with the Boltzmann constant taken as 1).
+    
+    Initialisation args:
+        
+        Required positional:
+        
+        sim (MultiBallSimulation): The simulation whose quantities are
+                accumulated.
+    
+    Attributes:
+        
+        sim (MultiBallSimulation): The simulation whose quantities are
+                accumulated.
+        n_events (int): The number of collisions recorded since the
+                ledger was started or last reset.
+        t_start (float): The time from which the momentum transferred
+                to the walls is accumulated.
+        wall_impulse (tuple of floats): The total magnitude of the
+                momentum transferred to each wall since t_start (for
+                the indexing of the walls, see the attribute wall of
+                CollisionEvent).
+        mechanical_energy (float): The current total mechanical energy
+                of the Ball objects.
+        kinetic_energy (float): The total translational kinetic energy
+                of the Ball objects at the current time of the
+                simulation.
+        potential_energy (float): The total gravitational potential
+                energy of the Ball objects at the current time of the
+                simulation (measured relative to the spatial origin).
+        temperature (float): The kinetic temperature of the Ball
+                objects at the current time of the simulation (their
+                mean kinetic energy per degree of freedom times 2).
+        energy_drift (float): The change in the total mechanical energy
+                since the ledger was started or last reset (other than
+                that due to Ball objects being added).
+    
+    Methods:
+        (For full description, see documentation of the method itself)
+        
+        reset(): Recalculates the quantities from the states of the
+                Ball objects and restarts the accumulation.
+        resetWallImpulse(): Restarts the accumulation of the momentum
+                transferred to the walls.
+        recordEvent(): Updates the ledger for a collision.
+        addBalls(): Includes newly added Ball objects in the ledger.
+        potentialEnergyAtTime(): Gives the total gravitational
+                potential energy at a given time.
+        kineticEnergyAtTime(): Gives the total kinetic energy at a
+                given time.
+        temperatureAtTime(): Gives the kinetic temperature at a given
+                time.
+        pressures(): Gives the mean pressure on each wall since
+                t_start.
+        checkEnergyConservation(): Checks whether the energy drift is
+                within a given tolerance.
+    """
+    def __init__(self, sim: "MultiBallSimulation"):
+        self._sim = sim
+        self._n_dims = sim.n_dims
+        self._g = tuple(float(x) for x in sim.g)
+        # The area of each wall (the product of the dimensions of the
+        # box other than along the basis vector normal to it)
+        box_dims = sim.box_dims
+        self._wall_areas = tuple(math.prod(x for j, x in\
+                enumerate(box_dims) if j != i)\
+                for i in range(self._n_dims) for _ in range(2))
+        self.reset()
+    
+    @property
+    def sim(self):
+        return self._sim
+    
+    @property
+    def n_events(self):
+        return self._n_events
+    
+    @property
+    def t_start(self):
+        return self._t_start
+    
+    @property
+    def wall_impulse(self):
+        return tuple(acc.value for acc in self._wall_impulse)
+    
+    @property
+    def mechanical_energy(self):
+        return self._energy.value
+    
+    @property
+    def kinetic_energy(self):
+        return self.kineticEnergyAtTime()
+    
+    @property
+    def potential_energy(self):
+        return self.potentialEnergyAtTime()
+    
+    @property
+    def temperature(self):
+        return self.temperatureAtTime()
+    
+    @property
+    def energy_drift(self):
+        return self._energy.value - self._energy_start
+    
+    def _ballEnergy(self, idx: int) -> float:
+        """
+        Calculates the mechanical energy of the Ball object at index
+        idx of the attribute balls of the simulation from its reference
+        state.
+        """
+        ball = self._sim.balls[idx]
+        m = ball.m
+        return 0.5 * m * sum(x * x for x in ball._v0) -\
+                m * sum(x * y for x, y in zip(ball._r0, self._g))
+    
+    def _advance(self, t: Real) -> None:
+        """
+        Moves the reference time of the total momentum and the
+        mass-weighted sum of the positions of the Ball objects to time
+        t, assuming no collisions with the walls in between.
+        
+        Returns:
+        None
+        """
+        dt = t - self._t_ref
+        if not dt: return
+        mass = self._mass
+        for mr, p, a in zip(self._mr, self._p, self._g):
+            mr.add(dt * (p.value + 0.5 * mass * a * dt))
+            p.add(mass * a * dt)
+        self._t_ref = t
+        return
+    
+    def reset(self) -> None:
+        """
+        Recalculates all of the quantities of the ledger from the
+        states of the Ball objects of the simulation, and restarts the
+        accumulation of the momentum transferred to the walls and of
+        the energy drift from the current time of the simulation.
+        
+        Returns:
+        None
+        """
+        sim = self._sim
+        arrs = sim.ball_state_arrays
+        m = arrs.m
+        g = np.array(self._g)
+        energies = 0.5 * m * (arrs.v0.astype(float) ** 2).sum(axis=1) -\
+                m * (arrs.r0.astype(float) @ g)
+        self._ball_energies = energies.tolist()
+        self._energy = _CompensatedSum(math.fsum(self._ball_energies))
+        self._energy_start = self._energy.value
+        self._mass = math.fsum(m.tolist())
+        self._t_ref = max(sim.t, arrs.t0.max()) if len(arrs) else sim.t
+        r, v = arrs.statesAtTime(self._t_ref, self._g)
+        self._mr = [_CompensatedSum(math.fsum(col))\
+                for col in (m[:, np.newaxis] * r).T.tolist()]
+        self._p = [_CompensatedSum(math.fsum(col))\
+                for col in (m[:, np.newaxis] * v).T.tolist()]
+        self._n_events = 0
+        self.resetWallImpulse()
+        return
+    
+    def resetWallImpulse(self) -> None:
+        """
+        Sets the momentum transferred to each wall to zero, so that it
+        is accumulated (and the pressures calculated) from the current
+        time of the simulation.
+        
+        Returns:
+        None
+        """
+        self._t_start = self._sim.t
+        self._wall_impulse = [_CompensatedSum()\
+                for _ in range(2 * self._n_dims)]
+        return
+    
+    def recordEvent(self, event: CollisionEvent) -> None:
+        """
+        Updates the ledger for a collision just processed by the
+        simulation (this is the observer registered with the
+        simulation by its method enableLedger()).
+        
+        Args:
+            Required positional:
+            event (CollisionEvent): The collision.
+        
+        Returns:
+        None
+        """
+        ball_energies = self._ball_energies
+        for idx in (event.idx1, event.idx2):
+            if idx < 0: continue
+            e = self._ballEnergy(idx)
+            self._energy.add(e - ball_energies[idx])
+            ball_energies[idx] = e
+        if event.wall >= 0:
+            self._advance(event.t)
+            axis = event.wall >> 1
+            impulse = event.impulse[axis]
+            self._p[axis].add(impulse)
+            self._wall_impulse[event.wall].add(abs(impulse))
+        self._n_events += 1
+        return
+    
+    def addBalls(self) -> None:
+        """
+        Includes any Ball objects added to the simulation since the
+        ledger was last started, reset or updated by this method
+        (which must have been added with reference time equal to the
+        current time of the simulation) in the ledger. Their energy is
+        included in the baseline of the energy drift.
+        
+        Returns:
+        None
+        """
+        sim = self._sim
+        self._advance(sim.t)
+        for idx in range(len(self._ball_energies), len(sim.balls)):
+            e = self._ballEnergy(idx)
+            self._ball_energies.append(e)
+            self._energy.add(e)
+            self._energy_start += e
+            ball = sim.balls[idx]
+            m = ball.m
+            self._mass += m
+            for mr, p, x, u in zip(self._mr, self._p, ball._r0,\
+                    ball._v0):
+                mr.add(m * x)
+                p.add(m * u)
+        return
+    
+    def potentialEnergyAtTime(self, t: Optional[Real]=None) -> float:
+        """
+        Gives the total gravitational potential energy of the Ball
+        objects at time t (measured relative to the spatial origin, as
+        for the method calculateTotalPotentialEnergy() of
+        MultiBallSimulation).
+        
+        Args:
+            Optional named:
+            t (real numeric value or None): If specified, the time (in
+                    terms of the simulation's time measure), which
+                    should not be later than the next collision of a
+                    Ball object with a wall. Otherwise, the current
+                    time of the simulation.
+                Default: None
+        
+        Returns:
+        Float giving the total gravitational potential energy.
+        """
+        if t is None: t = self._sim.t
+        dt = t - self._t_ref
+        mass = self._mass
+        return -sum(a * (mr.value + dt * (p.value + 0.5 * mass * a * dt))\
+                for mr, p, a in zip(self._mr, self._p, self._g))
+    
+    def kineticEnergyAtTime(self, t: Optional[Real]=None) -> float:
+        """
+        Gives the total translational kinetic energy of the Ball
+        objects at time t (the total mechanical energy less the total
+        gravitational potential energy).
+        
+        Args:
+            Optional named:
+            t (real numeric value or None): If specified, the time (in
+                    terms of the simulation's time measure), which
+                    should not be later than the next collision of a
+                    Ball object with a wall. Otherwise, the current
+                    time of the simulation.
+                Default: None
+        
+        Returns:
+        Float giving the total kinetic energy.
+        """
+        return self._energy.value - self.potentialEnergyAtTime(t)
+    
+    def temperatureAtTime(self, t: Optional[Real]=None) -> float:
+        """
+        Gives the kinetic temperature of the Ball objects at time t,
+        being twice their total kinetic energy divided by the total
+        number of translational degrees of freedom (n_dims times the
+        number of Ball objects), in the simulation's energy units.
+        
+        Args:
+            Optional named:
+            t (real numeric value or None): If specified, the time (in
+                    terms of the simulation's time measure), which
+                    should not be later than the next collision of a
+                    Ball object with a wall. Otherwise, the current
+                    time of the simulation.
+                Default: None
+        
+        Returns:
+        Float giving the temperature, or 0 if there are no Ball
+        objects.
+        """
+        n = len(self._ball_energies)
+        if not n: return 0.
+        return 2 * self.kineticEnergyAtTime(t) / (self._n_dims * n)
+    
+    def pressures(self, t: Optional[Real]=None) -> Tuple[float]:
+        """
+        Gives the mean pressure on each wall between the time t_start
+        and time t, being the momentum transferred to the wall in that
+        time divided by the length of that time and the area of the
+        wall (the product of the dimensions of the box other than that
+        along the basis vector normal to it).
+        
+        Args:
+            Optional named:
+            t (real numeric value or None): If specified, the end time
+                    (in terms of the simulation's time measure), which
+                    should be no earlier than the latest collision
+                    recorded. Otherwise, the current time of the
+                    simulation.
+                Default: None
+        
+        Returns:
+        Tuple of floats giving the mean pressure on each wall (with the
+        walls indexed as for the attribute wall of CollisionEvent), or
+        zeros if t is equal to t_start.
+        """
+        if t is None: t = self._sim.t
+        dt = t - self._t_start
+        if dt <= 0: return (0.,) * (2 * self._n_dims)
+        return tuple(acc.value / (dt * area) for acc, area in\
+                zip(self._wall_impulse, self._wall_areas))
+    
+    def checkEnergyConservation(
+        self,
+        rtol: Real=1e-9,
+        atol: Real=0.,
+    ) -> bool:
+        """
+        Checks whether the total mechanical energy has been conserved
+        since the ledger was started or last reset, to within the given
+        tolerances.
+        
+        Args:
+            Optional named:
+            rtol (non-negative real numeric value): The largest
+                    permitted magnitude of the energy drift relative to
+                    the magnitude of the initial total mechanical
+                    energy.
+                Default: 1e-9
+            atol (non-negative real numeric value): An additional
+                    absolute tolerance for the energy drift.
+                Default: 0
+        
+        Returns:
+        Boolean (bool), True if the magnitude of the energy drift is no
+        more than atol + rtol times the magnitude of the initial total
+        mechanical energy, otherwise False.
+        """
+        return abs(self.energy_drift) <=\
+                atol + rtol * abs(self._energy_start)
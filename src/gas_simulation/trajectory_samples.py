@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+
+from typing import (
+    Tuple,
+    Generator,
+)
+
+import glob
+import os
+
+import numpy as np
+
+from gas_simulation.utils import Real
+
+# Each chunk of samples written by TrajectoryChunkWriter consists of
+# three .npy files in the same directory, with the names given by
+# _CHUNK_FILE_FORMAT with field equal to each of _CHUNK_FIELDS and k
+# the index of the chunk (starting from 0):
+# - "times": 1D array of the times of the samples.
+# - "positions": 3D array whose element [i, j, k] is component k of the
+#   position vector of the centre of the Ball object with index j at
+#   the time of sample i.
+# - "velocities": 3D array of the velocity vectors in the same format.
+_CHUNK_FILE_FORMAT = "{field}_{k:06d}.npy"
+_CHUNK_FIELDS = ("times", "positions", "velocities")
+
+class TrajectoryChunkWriter(object):
+    """
+    Writes samples of the positions and velocities of the Ball objects
+    of a MultiBallSimulation to a directory as a sequence of chunks,
+    each consisting of .npy files holding up to chunk_size samples
+    (see TrajectoryChunks for reading them).
+    
+    Each chunk is written through a numpy memory map of its files, so
+    that only the chunk currently being written is held in memory and
+    a run of any length can be sampled in constant memory. The files of
+    a chunk are complete once it is full or the writer is closed (at
+    which point the files of a partially filled last chunk are
+    shortened to the number of samples it contains).
+    
+    This is normally created by the method sampleStates() of the
+    simulation, rather than directly.
+    
+    Initialisation args:
+        
+        Required positional:
+        
+        directory (str): The path of an existing directory to which the
+                chunks are written (overwriting any chunk files already
+                present with the same names).
+        n_balls (int): The number of Ball objects in each sample.
+        n_dims (strictly positive int): The number of spatial
+                dimensions of the simulation.
+        
+        Optional named:
+        
+        chunk_size (strictly positive int): The largest number of
+                samples in each chunk.
+            Default: 1024
+    
+    Attributes:
+        
+        directory (str): The path of the directory to which the chunks
+                are written.
+        n_samples (int): The number of samples appended so far.
+        n_chunks (int): The number of chunks begun so far.
+        closed (bool): Whether the writer has been closed.
+    
+    Methods:
+        (For full description, see documentation of the method itself)
+        
+        append(): Adds a sample.
+        close(): Completes the chunk currently being written.
+    """
+    def __init__(
+        self,
+        directory: str,
+        n_balls: int,
+        n_dims: int,
+        chunk_size: int=1024,
+    ):
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be a strictly positive "\
+                    f"integer, got {chunk_size!r}")
+        self._directory = directory
+        self._n_balls = n_balls
+        self._n_dims = n_dims
+        self._chunk_size = chunk_size
+        self._n_samples = 0
+        self._n_chunks = 0
+        # The memory maps of the files of the chunk currently being
+        # written (in the order of _CHUNK_FIELDS), or None if there is
+        # no such chunk, and the number of samples in that chunk
+        self._chunk = None
+        self._n_chunk_samples = 0
+        self._closed = False
+    
+    @property
+    def directory(self):
+        return self._directory
+    
+    @property
+    def n_samples(self):
+        return self._n_samples
+    
+    @property
+    def n_chunks(self):
+        return self._n_chunks
+    
+    @property
+    def closed(self):
+        return self._closed
+    
+    def _chunkPaths(self, k: int) -> Tuple[str]:
+        """
+        Gives the paths of the files of the chunk with index k, in the
+        order of _CHUNK_FIELDS.
+        """
+        return tuple(os.path.join(self._directory,\
+                _CHUNK_FILE_FORMAT.format(field=field, k=k))\
+                for field in _CHUNK_FIELDS)
+    
+    def _startChunk(self) -> None:
+        """
+        Creates the files of a new chunk with space for chunk_size
+        samples and memory maps them.
+        
+        Returns:
+        None
+        """
+        shapes = ((self._chunk_size,),\
+                (self._chunk_size, self._n_balls, self._n_dims),\
+                (self._chunk_size, self._n_balls, self._n_dims))
+        self._chunk = tuple(np.lib.format.open_memmap(path, mode="w+",\
+                dtype=np.float64, shape=shape)\
+                for path, shape in zip(self._chunkPaths(self._n_chunks),\
+                shapes))
+        self._n_chunk_samples = 0
+        self._n_chunks += 1
+        return
+    
+    def _finishChunk(self) -> None:
+        """
+        Completes the chunk currently being written (if any), writing
+        its memory maps to the files and, if it is not full, rewriting
+        the files to contain only the samples it holds.
+        
+        Returns:
+        None
+        """
+        if self._chunk is None: return
+        chunk, self._chunk = self._chunk, None
+        for arr in chunk:
+            arr.flush()
+        n = self._n_chunk_samples
+        if n < self._chunk_size:
+            # The memory maps are released before the files are
+            # rewritten
+            data = [np.array(arr[:n]) for arr in chunk]
+            del chunk, arr
+            paths = self._chunkPaths(self._n_chunks - 1)
+            for path, arr in zip(paths, data):
+                np.save(path, arr)
+        return
+    
+    def append(self, t: Real, r: np.ndarray, v: np.ndarray) -> None:
+        """
+        Adds a sample to the chunk currently being written, beginning a
+        new chunk if that chunk is full.
+        
+        Args:
+            Required positional:
+            t (real numeric value): The time of the sample.
+            r (2D numpy array of real numeric values): Array with
+                    shape (n_balls, n_dims) whose rows are the
+                    position vectors of the centres of the Ball
+                    objects at time t.
+            v (2D numpy array of real numeric values): Array with
+                    shape (n_balls, n_dims) whose rows are the
+                    velocity vectors of the Ball objects at time t.
+        
+        Returns:
+        None
+        """
+        if self._closed:
+            raise ValueError("The writer has been closed")
+        shape = (self._n_balls, self._n_dims)
+        if r.shape != shape or v.shape != shape:
+            raise ValueError(f"The positions and velocities must be "\
+                    f"arrays with shape {shape}, got {r.shape} and "\
+                    f"{v.shape}")
+        if self._n_chunk_samples == self._chunk_size:
+            self._finishChunk()
+        if self._chunk is None:
+            self._startChunk()
+        i = self._n_chunk_samples
+        times, positions, velocities = self._chunk
+        times[i] = t
+        positions[i] = r
+        velocities[i] = v
+        self._n_chunk_samples += 1
+        self._n_samples += 1
+        return
+    
+    def close(self) -> None:
+        """
+        Completes the chunk currently being written (if any). Has no
+        effect if the writer has already been closed.
+        
+        Returns:
+        None
+        """
+        if self._closed: return
+        self._finishChunk()
+        self._closed = True
+        return
+    
+    def __enter__(self) -> "TrajectoryChunkWriter":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+        return
+
+class TrajectoryChunks(object):
+    """
+    Read-only view of the chunks of samples written to a directory by
+    TrajectoryChunkWriter (for instance using the method sampleStates()
+    of MultiBallSimulation), with the files of each chunk memory mapped
+    when accessed, so that the samples can be processed one chunk at a
+    time without reading them all into memory.
+    
+    Initialisation args:
+        
+        Required positional:
+        
+        directory (str): The path of the directory containing the
+                chunks.
+    
+    Attributes:
+        
+        directory (str): The path of the directory containing the
+                chunks.
+        n_chunks (int): The number of chunks.
+        times (1D numpy array of floats): The time of every sample, in
+                order.
+    
+    Methods:
+        (For full description, see documentation of the method itself)
+        
+        chunk(): Gives the times, positions and velocities of the
+                samples in a given chunk.
+        chunks(): Generator yielding the times, positions and
+                velocities of the samples in each chunk in turn.
+        statesAtIndex(): Gives the positions and velocities of a given
+                sample.
+    """
+    def __init__(self, directory: str):
+        self._directory = directory
+        pattern = os.path.join(directory,\
+                _CHUNK_FILE_FORMAT.format(field="times", k=0)\
+                .replace("000000", "[0-9]" * 6))
+        self._n_chunks = len(glob.glob(pattern))
+        times = [np.load(self._chunkPath("times", k))\
+                for k in range(self._n_chunks)]
+        self._chunk_starts = np.cumsum([0] + [len(arr) for arr in times])
+        self._times = np.concatenate(times) if times else np.zeros(0)
+    
+    @property
+    def directory(self):
+        return self._directory
+    
+    @property
+    def n_chunks(self):
+        return self._n_chunks
+    
+    @property
+    def times(self):
+        return self._times
+    
+    def __len__(self) -> int:
+        return len(self._times)
+    
+    def _chunkPath(self, field: str, k: int) -> str:
+        """
+        Gives the path of the file of the chunk with index k for the
+        given field (one of _CHUNK_FIELDS).
+        """
+        return os.path.join(self._directory,\
+                _CHUNK_FILE_FORMAT.format(field=field, k=k))
+    
+    def chunk(self, k: int) -> Tuple[np.ndarray]:
+        """
+        Gives the samples in the chunk with index k, memory mapped from
+        its files.
+        
+        Args:
+            Required positional:
+            k (int): The index of the chunk.
+        
+        Returns:
+        3-tuple whose index 0 contains the 1D numpy array of the times
+        of the samples and whose indices 1 and 2 contain the 3D numpy
+        arrays of the position and velocity vectors respectively (see
+        the comment on _CHUNK_FIELDS for their format).
+        """
+        if not 0 <= k < self._n_chunks:
+            raise IndexError(f"Chunk index {k} out of range for "\
+                    f"{self._n_chunks} chunks")
+        return tuple(np.load(self._chunkPath(field, k), mmap_mode="r")\
+                for field in _CHUNK_FIELDS)
+    
+    def chunks(self) -> Generator[Tuple[np.ndarray], None, None]:
+        """
+        Generator yielding the samples in each chunk in turn (see the
+        method chunk()).
+        
+        Yields:
+        3-tuple giving the times, positions and velocities of the
+        samples in the chunk, as for the method chunk().
+        """
+        for k in range(self._n_chunks):
+            yield self.chunk(k)
+    
+    def statesAtIndex(self, i: int) -> Tuple[np.ndarray]:
+        """
+        Gives the positions and velocities of the Ball objects in the
+        sample with index i (in order of time over all chunks).
+        
+        Args:
+            Required positional:
+            i (int): The index of the sample.
+        
+        Returns:
+        2-tuple of 2D numpy arrays with n_dims columns, whose index 0
+        contains the array whose rows are the position vectors and
+        whose index 1 contains the array whose rows are the velocity
+        vectors of the Ball objects at the time of the sample.
+        """
+        if i < 0: i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"Sample index {i} out of range for "\
+                    f"{len(self)} samples")
+        k = int(np.searchsorted(self._chunk_starts, i, side="right")) - 1
+        _, positions, velocities = self.chunk(k)
+        j = i - self._chunk_starts[k]
+        return (np.array(positions[j]), np.array(velocities[j]))